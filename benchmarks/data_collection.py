@@ -0,0 +1,73 @@
+"""
+Benchmarks DataCollection.create against the previous per element implementation, on a 100k row, 32 fbg table.
+
+Run from the main project directory with:
+    python -m benchmarks.data_collection
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from fbgui.data_container import DataCollection
+
+NUMBER_OF_ROWS = 100000
+NUMBER_OF_FBGS = 32
+
+
+def create_data_frame(number_of_rows: int, number_of_fbgs: int) -> pd.DataFrame:
+    random = np.random.RandomState(0)
+    columns = ["Date Time"]
+    data = {"Date Time": 1500000000. + 60. * np.arange(number_of_rows)}
+    for i in range(number_of_fbgs):
+        wavelength_header = "FBG{} Wavelength (nm.)".format(i)
+        power_header = "FBG{} Power (dBm.)".format(i)
+        data[wavelength_header] = 1530. + i + random.normal(0, .01, number_of_rows)
+        data[power_header] = -10. + random.normal(0, .1, number_of_rows)
+        columns.extend([wavelength_header, power_header])
+    data["Mean Temperature (K)"] = 300. + random.normal(0, .1, number_of_rows)
+    columns.append("Mean Temperature (K)")
+    return pd.DataFrame(data, columns=columns)
+
+
+def legacy_create(df: pd.DataFrame, number_of_fbgs: int):
+    """The nested loop DataCollection.create implementation, kept for comparison."""
+    timestamps = df["Date Time"]
+    start_time = df["Date Time"][0]
+    times = [(time - start_time) / 60 / 60 for time in timestamps]
+    temps = df["Mean Temperature (K)"]
+    first_temp = temps[0]
+    delta_temps = np.array([temp - first_temp for temp in temps])
+    headers = df.columns.values.tolist()
+    wavelengths = [df[head] for head in headers if "Wave" in head]
+    powers = [df[head] for head in headers if "Pow" in head]
+    delta_wavelengths_pm = np.array([np.array([(w - wave[0]) * 1000 for w in wave]) for wave in wavelengths])
+    delta_powers = np.array([np.array([p - power[0] for p in power]) for power in powers])
+    mean_delta_wavelengths_pm = np.array(delta_wavelengths_pm[0])
+    mean_delta_powers = np.array(delta_powers[0])
+    for wave_diff, pow_diff in zip(delta_wavelengths_pm[1:], delta_powers[1:]):
+        mean_delta_wavelengths_pm += wave_diff
+        mean_delta_powers += pow_diff
+    mean_delta_wavelengths_pm /= number_of_fbgs
+    mean_delta_powers /= number_of_fbgs
+    return (times, list(delta_temps), list(delta_wavelengths_pm), list(delta_powers),
+            list(mean_delta_wavelengths_pm), list(mean_delta_powers))
+
+
+def vectorized_create(df: pd.DataFrame, fbg_names):
+    DataCollection().create(False, df.copy(), fbg_names)
+
+
+def main():
+    df = create_data_frame(NUMBER_OF_ROWS, NUMBER_OF_FBGS)
+    fbg_names = ["FBG{}".format(i) for i in range(NUMBER_OF_FBGS)]
+    legacy_time = min(timeit.repeat(lambda: legacy_create(df, NUMBER_OF_FBGS), number=1, repeat=3))
+    vectorized_time = min(timeit.repeat(lambda: vectorized_create(df, fbg_names), number=1, repeat=3))
+    print("DataCollection.create with {} rows, {} fbgs".format(NUMBER_OF_ROWS, NUMBER_OF_FBGS))
+    print("Nested loops: {:.3f} s".format(legacy_time))
+    print("Vectorized:   {:.3f} s".format(vectorized_time))
+    print("Speedup:      {:.1f}x".format(legacy_time / vectorized_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Benchmarks the acquisition, recording, export, and graphing stages against synthetic data, writes the results as
+JSON, and compares them against a stored baseline.
+
+Run from the main project directory with:
+    python -m benchmarks.suite --output results.json --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --full --save-baseline benchmarks/baseline.json
+
+Each result is the best of several repeats in seconds, keyed by stage and size. A stage is reported as a regression
+when it is slower than the baseline by more than the threshold, and the suite then exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from fbgui import database_controller, database_writer, migrate_database
+from fbgui.constants import BAKING
+from fbgui.data_container import DataCollection
+from fbgui.database_controller import DatabaseController
+from fbgui.devices.sm125_laser import parse_peaks_and_levels, LENGTH_PREFIX_SIZE
+from fbgui.laser_data import LaserData
+from fbgui.simulator.servers import create_peaks_and_levels_response
+
+QUICK_FBG_COUNTS = [1, 8, 64]
+QUICK_ROW_COUNTS = [1000, 10000]
+FULL_ROW_COUNTS = [1000, 100000, 1000000]
+#: Largest table exported to Excel, and graphed, the export is too slow for the larger tables to be useful
+MAX_EXPORT_ROWS = 10000
+#: Number of scans accumulated per reading in the LaserData stage, the program's default number of scans
+SCANS_PER_READING = 5
+#: Number of points recorded in the record_point stage
+RECORDED_POINTS = 1000
+#: Number of queries run in the program_exists stage
+QUERIES = 1000
+#: Number of cycles, and of real points per cycle in the calibration_sheet stage
+CALIBRATION_CYCLES = 10
+CALIBRATION_POINTS = 10
+REPEATS = 3
+REGRESSION_THRESHOLD = 1.2
+
+Results = Dict[str, float]
+
+
+def best_time(function: Callable, repeats: int=REPEATS) -> float:
+    """Returns the fastest of repeats runs of the function in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def fbg_names(number_of_fbgs: int) -> List[str]:
+    return ["FBG{}".format(i) for i in range(number_of_fbgs)]
+
+
+def channel_scan(number_of_fbgs: int, random: np.random.RandomState) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """Spreads the fbgs over the 4 SM125 channels, and returns one noisy scan of them."""
+    counts = [len(channel) for channel in np.array_split(np.arange(number_of_fbgs), 4)]
+    wavelengths = [1530. + 4. * np.arange(count) + random.normal(0, .001, count) for count in counts]
+    amplitudes = [-10. + random.normal(0, .05, count) for count in counts]
+    return wavelengths, amplitudes
+
+
+def benchmark_sm125_parse(number_of_fbgs: int) -> float:
+    response = create_peaks_and_levels_response(*channel_scan(number_of_fbgs, np.random.RandomState(0)))
+    response = response[LENGTH_PREFIX_SIZE:]
+    use_positions = [True] * 4
+    return best_time(lambda: [parse_peaks_and_levels(response, use_positions) for _ in range(1000)]) / 1000
+
+
+def benchmark_laser_data(number_of_fbgs: int) -> float:
+    random = np.random.RandomState(0)
+    scans = [channel_scan(number_of_fbgs, random) for _ in range(SCANS_PER_READING)]
+    switch_positions = [[0] * len(channel) for channel in scans[0][0]]
+
+    def accumulate():
+        laser_data = LaserData(switch_positions, 0)
+        for wavelengths, amplitudes in scans:
+            for channel in range(4):
+                if len(switch_positions[channel]):
+                    laser_data.add_wavelengths(channel, wavelengths[channel], 0)
+                    laser_data.add_powers(channel, amplitudes[channel], 0)
+        return laser_data.get_wavelengths(), laser_data.get_powers(), laser_data.get_wavelength_deviations()
+
+    return best_time(lambda: [accumulate() for _ in range(100)]) / 100
+
+
+class BenchmarkDatabase(object):
+    """Points the database controllers, and the shared writer at a temporary database for the benchmark run."""
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "program_data.db")
+        self.patches = [mock.patch.object(database_controller, "DB_PATH", self.path),
+                        mock.patch.object(database_writer, "_writer", database_writer.DatabaseWriter(self.path))]
+        self.tables = 0
+
+    def __enter__(self):
+        for patch in self.patches:
+            patch.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        database_writer.get_writer().close()
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def new_controller(self, number_of_fbgs: int) -> DatabaseController:
+        """Returns a controller for a new, empty baking program."""
+        self.tables += 1
+        file_path = os.path.join(self.directory, "bench{}.xlsx".format(self.tables))
+        return DatabaseController(file_path, fbg_names(number_of_fbgs), queue.Queue(), BAKING)
+
+    def populate(self, number_of_rows: int, number_of_fbgs: int) -> DatabaseController:
+        """Returns a controller for a new baking program run filled with number_of_rows synthetic points."""
+        controller = self.new_controller(number_of_fbgs)
+        controller.record_baking_point(1500000000., 300., [1530.] * number_of_fbgs, [-10.] * number_of_fbgs)
+        random = np.random.RandomState(0)
+        timestamps = 1500000000. + 60. * np.arange(1, number_of_rows)
+        points = [(controller.table_id, timestamp, 300. + random.normal(0, .1), None, None, None)
+                  for timestamp in timestamps]
+        with database_writer.get_writer().cursor() as cursor:
+            cursor.executemany(database_controller.INSERT_POINT, points)
+            cursor.execute("SELECT ID, ts FROM points WHERE run_id = ? AND ID > (SELECT MIN(ID) FROM points "
+                           "WHERE run_id = ?) ORDER BY ID;", (controller.table_id, controller.table_id))
+            readings = [(controller.table_id, point_id, timestamp, fbg_id, 1530. + random.normal(0, .01),
+                         -10. + random.normal(0, .1), 0., 0)
+                        for point_id, timestamp in cursor.fetchall() for fbg_id in controller.fbg_ids]
+            cursor.executemany(migrate_database.INSERT_POINT_READING, readings)
+            migrate_database.build_rollups(cursor, controller.table_id)
+        return controller
+
+
+def benchmark_record_point(database: BenchmarkDatabase, number_of_fbgs: int) -> float:
+    def record():
+        controller = database.new_controller(number_of_fbgs)
+        for i in range(RECORDED_POINTS):
+            controller.record_baking_point(1500000000. + i, 300., [1530.] * number_of_fbgs, [-10.] * number_of_fbgs,
+                                           [.1] * number_of_fbgs, [0] * number_of_fbgs)
+        controller.flush()
+    return best_time(record) / RECORDED_POINTS
+
+
+def benchmark_program_exists(controller: DatabaseController) -> float:
+    """Returns the time of the check every graph update makes before reading the program's new rows."""
+    return best_time(lambda: [controller.program_exists() for _ in range(QUERIES)]) / QUERIES
+
+
+def benchmark_calibration_sheet(number_of_fbgs: int) -> float:
+    """Returns the time of computing the calibration sheet from the real points of a calibration run."""
+    from fbgui.calibration_excel_container import CalibrationExcelContainer
+    random = np.random.RandomState(0)
+    number_of_points = CALIBRATION_CYCLES * CALIBRATION_POINTS
+    temperatures = np.tile(300. + 10. * np.arange(CALIBRATION_POINTS), CALIBRATION_CYCLES)
+    temperatures += random.normal(0, .1, number_of_points)
+    columns = {"Mean Temperature (K)": temperatures,
+               "Cycle Num": np.repeat(np.arange(1, CALIBRATION_CYCLES + 1), CALIBRATION_POINTS)}
+    for name in fbg_names(number_of_fbgs):
+        columns[name + " Wavelength (nm.)"] = 1530. + temperatures / 100. + random.normal(0, .001, number_of_points)
+        columns[name + " Power (dBm.)"] = -10. + random.normal(0, .05, number_of_points)
+    real_point_data_frame = pd.DataFrame(columns)
+    cycles = list(range(1, CALIBRATION_CYCLES + 1))
+    return best_time(lambda: CalibrationExcelContainer(real_point_data_frame, cycles))
+
+
+def benchmark_data_collection(controller: DatabaseController, number_of_fbgs: int) -> float:
+    return best_time(lambda: DataCollection().create(False, controller.to_data_frame(), fbg_names(number_of_fbgs)))
+
+
+def benchmark_create_excel(controller: DatabaseController, number_of_fbgs: int) -> float:
+    from fbgui import excel_file_controller
+    excel_controller = excel_file_controller.ExcelFileController(controller.file_path, fbg_names(number_of_fbgs),
+                                                                 queue.Queue(), BAKING)
+    with mock.patch.object(excel_file_controller.os, "startfile", create=True):
+        return best_time(excel_controller.create_baking_excel, repeats=1)
+
+
+def benchmark_graph_redraw(controller: DatabaseController, number_of_fbgs: int) -> Tuple[float, float]:
+    """Returns the time of a full figure draw, and of a blitted update of the individual wavelengths graph."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from fbgui import graphing
+    from fbgui.data_container import DataCollectionBuffer
+
+    data_buffer = DataCollectionBuffer(False)
+    data_buffer.append(controller.get_new_rows(0))
+    figure = Figure(figsize=(12, 8))
+    canvas = FigureCanvasAgg(figure)
+    with mock.patch.object(graphing.Graphing, "data_coll", data_buffer.snapshot()):
+        graph = graphing.Graph("Wavelength", "Time (hr.)", ("Delta Wavelength", "Wavelength"), graphing.wave_graph,
+                               figure, [111, 211, 212], False, fbg_names(number_of_fbgs), queue.Queue(), controller)
+        graph.show_main()
+        full_draw = best_time(canvas.draw)
+        update = best_time(graph.update)
+        graph.stop()
+    return full_draw, update
+
+
+def run(fbg_counts: List[int], row_counts: List[int], stages: List[str]) -> Tuple[Results, Dict[str, str]]:
+    """
+    Runs the selected stages for every size.
+
+    :returns: stage, and size mapped to the best time in seconds, stages that could not run mapped to the reason
+    """
+    results = {}  # type: Results
+    skipped = {}  # type: Dict[str, str]
+
+    def record(name: str, function: Callable):
+        if name.split("[")[0] not in stages:
+            return
+        try:
+            value = function()
+        except ImportError as error:
+            skipped[name] = str(error)
+            return
+        names = [name + " draw", name + " update"] if isinstance(value, tuple) else [name]
+        values = value if isinstance(value, tuple) else [value]
+        for result_name, seconds in zip(names, values):
+            results[result_name] = seconds
+            print("{:<50} {:.6f} s".format(result_name, seconds))
+
+    with BenchmarkDatabase() as database:
+        for number_of_fbgs in fbg_counts:
+            record("sm125_parse[fbgs={}]".format(number_of_fbgs), lambda: benchmark_sm125_parse(number_of_fbgs))
+            record("laser_data[fbgs={}]".format(number_of_fbgs), lambda: benchmark_laser_data(number_of_fbgs))
+            record("record_point[fbgs={}]".format(number_of_fbgs),
+                   lambda: benchmark_record_point(database, number_of_fbgs))
+            record("program_exists[fbgs={}]".format(number_of_fbgs),
+                   lambda: benchmark_program_exists(database.populate(1, number_of_fbgs)))
+            record("calibration_sheet[fbgs={}]".format(number_of_fbgs),
+                   lambda: benchmark_calibration_sheet(number_of_fbgs))
+            for number_of_rows in row_counts:
+                if not {"data_collection", "create_excel", "graph_redraw"} & set(stages):
+                    break
+                controller = database.populate(number_of_rows, number_of_fbgs)
+                size = "[fbgs={},rows={}]".format(number_of_fbgs, number_of_rows)
+                record("data_collection" + size, lambda: benchmark_data_collection(controller, number_of_fbgs))
+                if number_of_rows <= MAX_EXPORT_ROWS:
+                    record("create_excel" + size, lambda: benchmark_create_excel(controller, number_of_fbgs))
+                    record("graph_redraw" + size, lambda: benchmark_graph_redraw(controller, number_of_fbgs))
+    return results, skipped
+
+
+def compare(results: Results, baseline: Results, threshold: float) -> List[str]:
+    """
+    Compares the results against the baseline.
+
+    :returns: description of each result slower than the baseline by more than the threshold
+    """
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        if name in baseline and seconds > baseline[name] * threshold:
+            regressions.append("{}: {:.6f} s, baseline {:.6f} s ({:.2f}x)".format(name, seconds, baseline[name],
+                                                                                   seconds / baseline[name]))
+    return regressions
+
+
+STAGES = ["sm125_parse", "laser_data", "record_point", "program_exists", "calibration_sheet", "data_collection",
+          "create_excel", "graph_redraw"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FbgUI benchmark suite.")
+    parser.add_argument("--full", action="store_true", help="include the 100k, and 1M row tables")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--output", help="path to write the JSON results to")
+    parser.add_argument("--baseline", help="path of the JSON baseline to compare against")
+    parser.add_argument("--save-baseline", help="path to write the results to as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    row_counts = FULL_ROW_COUNTS if args.full else QUICK_ROW_COUNTS
+    results, skipped = run(QUICK_FBG_COUNTS, row_counts, args.stages)
+    for name, reason in sorted(skipped.items()):
+        print("Skipped {}: {}".format(name, reason))
+
+    report = {"python": platform.python_version(), "platform": platform.platform(), "results": results,
+              "skipped": skipped}
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print("Regression: {}".format(regression))
+        if regressions:
+            sys.exit(1)
+        print("No regressions against {}.".format(args.baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Records a baking point with the asyncio devices, the SM125 scans, and the temperature reads are awaited
+concurrently on the program thread's event loop, instead of sampling the temperature on a background thread.
+"""
+import asyncio
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from fbgui.constants import TEMP_SAMPLE_INTERVAL, DEVICE_TIMEOUT
+from fbgui.devices.async_devices import AsyncSM125, AsyncTemperatureController
+from fbgui.laser_data import LaserData
+from fbgui.temperature_sampler import time_weighted_average
+
+Sample = Tuple[float, float]
+Point = Tuple[float, float, List[float], List[float], List[float], List[int]]
+
+
+def is_unswitched(switch_positions: List[List[int]]) -> bool:
+    """
+    Checks if a run can be recorded without the optical switch.
+
+    :param switch_positions: 2D list with one list for each SM125 channel containing the switch positions on each
+                             channel
+    :returns: True if none of the fbgs are on a switch position, False otherwise
+    """
+    return not any(position for channel_positions in switch_positions for position in channel_positions)
+
+
+async def record_point(laser: AsyncSM125, temperature_controller: AsyncTemperatureController,
+                       switch_positions: List[List[int]], num_pts: int, interval: float=TEMP_SAMPLE_INTERVAL,
+                       timeout: float=DEVICE_TIMEOUT) -> Point:
+    """
+    Takes num_pts scans of the SM125, while reading the temperature every interval seconds, one more temperature
+    reading is taken after the last scan, so the readings span all of the scans. The fbgs must not be on switch
+    positions.
+
+    :param laser: connection to the SM125
+    :param temperature_controller: the temperature controller
+    :param switch_positions: 2D list with one list for each SM125 channel containing the switch positions on each
+                             channel
+    :param num_pts: the number of scans to average
+    :param interval: seconds between temperature readings
+    :param timeout: seconds to wait for each scan, and temperature reading
+    :returns: the middle time of the scans, the time weighted average temperature over the scans, and the mean
+              wavelengths, powers, wavelength deviations in pm., and dropouts of the fbgs, as returned by
+              LaserRecorder.get_wavelength_amplitude_data
+    :raises asyncio.TimeoutError: If a scan, or a temperature reading takes longer than the timeout
+    """
+    use_positions = [bool(len(channel_positions)) for channel_positions in switch_positions]
+    laser_data = LaserData(switch_positions, 0)
+    samples = []  # type: List[Sample]
+    start_time = time.time()
+    sampler = asyncio.ensure_future(_sample_temperatures(temperature_controller, samples, interval, timeout))
+    try:
+        for _ in range(num_pts):
+            wavelengths, powers = await asyncio.wait_for(laser.get_data(use_positions), timeout)
+            for channel, used in enumerate(use_positions):
+                if used:
+                    laser_data.add_wavelengths(channel, wavelengths[channel], 0)
+                    laser_data.add_powers(channel, powers[channel], 0)
+        end_time = time.time()
+    finally:
+        sampler.cancel()
+    await asyncio.wait([sampler])
+    if not sampler.cancelled() and sampler.exception() is not None:
+        raise sampler.exception()
+    await _sample_temperature(temperature_controller, samples, timeout)
+    times, temperatures = zip(*samples)
+    temperature = time_weighted_average(np.array(times), np.array(temperatures), start_time, end_time)
+    return (start_time + end_time) / 2., temperature, np.hstack(laser_data.get_wavelengths()).tolist(), \
+        np.hstack(laser_data.get_powers()).tolist(), \
+        (np.hstack(laser_data.get_wavelength_deviations()) * 1000).tolist(), \
+        np.hstack(laser_data.get_dropouts()).astype(int).tolist()
+
+
+async def _sample_temperatures(temperature_controller: AsyncTemperatureController, samples: List[Sample],
+                               interval: float, timeout: float):
+    """Reads the temperature every interval seconds until cancelled."""
+    while True:
+        await _sample_temperature(temperature_controller, samples, timeout)
+        await asyncio.sleep(interval)
+
+
+async def _sample_temperature(temperature_controller: AsyncTemperatureController, samples: List[Sample],
+                              timeout: float):
+    """Takes one reading, timestamped at the middle of the query."""
+    start = time.time()
+    temperature = float(await asyncio.wait_for(temperature_controller.get_temp_k(), timeout))
+    samples.append(((start + time.time()) / 2., temperature))
@@ -3,11 +3,22 @@ from typing import Iterable, List, Optional
 import pandas as pd
 import numpy.polynomial.polynomial as poly
 
+from fbgui import polynomial_fit
 
-def curve_fit_baking(data_frame: pd.DataFrame, y_index: int, x_index: int=1) -> List[float]:
+
+def curve_fit_baking(data_frame: pd.DataFrame, y_indexes: List[int], x_index: int=1) -> List[List[float]]:
+    """
+    Fits a line to each of the y columns, all of the columns are fit at once.
+
+    :param data_frame: the baking data
+    :param y_indexes: indexes of the columns to fit
+    :param x_index: index of the column the lines are fit against
+    :returns: coefficients of each column's line, highest power first
+    """
     x_values = _get_values(data_frame, x_index)
-    y_values = _get_values(data_frame, y_index)
-    return list(reversed(poly.polyfit(x_values, y_values, 1)))
+    y_values = data_frame.iloc[:, y_indexes].values
+    line_fit = polynomial_fit.fit(x_values, y_values, 1)
+    return [list(reversed(coefficients)) for coefficients in line_fit.coefficients.tolist()]
 
 
 def add_baking_trend_line(data_frame: pd.DataFrame, coefficients: Iterable[float], fbg_name: str, x_index: int=1) -> int:
@@ -1,15 +1,19 @@
 """Module for baking program specific logic."""
+import asyncio
 import math
 import socket
 import time
+from typing import Tuple, List
 from uuid import UUID
 
 import visa
 
-from fbgui import program
-from fbgui.constants import BAKING, TEMP
+from fbgui import program, async_recorder
+from fbgui.constants import BAKING, TEMP, ASYNC_BAKING
+from fbgui.devices.async_devices import AsyncRunner, AsyncSM125, AsyncTemperatureController
 from fbgui.exceptions import ProgramStopped
 from fbgui.main_program import Application
+from fbgui.temperature_sampler import TemperatureSampler
 
 
 class BakingProgram(program.Program):
@@ -23,6 +27,7 @@ class BakingProgram(program.Program):
         """
         baking_type = program.ProgramType(BAKING)
         super().__init__(master, baking_type)
+        self.async_laser = None  # type: AsyncSM125
 
     def check_stable(self, thread_id: UUID) -> bool:
         """
@@ -33,13 +38,13 @@ class BakingProgram(program.Program):
         """
         while True:
             try:
-                self.master.conn_dev(TEMP, thread_id=thread_id)
-                temp1 = float(self.master.temp_controller.get_temp_k())
+                with self.master.device_manager.session(TEMP, thread_id) as temp_controller:
+                    temp1 = float(temp_controller.get_temp_k())
                 start = time.time()
                 time.sleep(60)
-                temp2 = float(self.master.temp_controller.get_temp_k())
+                with self.master.device_manager.session(TEMP, thread_id) as temp_controller:
+                    temp2 = float(temp_controller.get_temp_k())
                 end = time.time()
-                self.disconnect_devices()
                 drift_rate = math.fabs(temp2 - temp1) / ((end - start) / 60)
                 if -self.options.drift_rate.get() * .001 <= drift_rate <= self.options.drift_rate.get() * .001:
                     return True
@@ -58,26 +63,30 @@ class BakingProgram(program.Program):
             stable = self.check_stable(thread_id)
             if not stable:
                 self.set_oven_temp()
-                self.disconnect_devices()
-        else:
-            self.disconnect_devices()
 
+        if ASYNC_BAKING and async_recorder.is_unswitched(self.switches):
+            self.async_runner = AsyncRunner(thread_id, self.master.thread_map)
+        try:
+            self.baking_loop(thread_id)
+        finally:
+            if self.async_runner is not None:
+                self.close_async_laser()
+                self.async_runner.close()
+                self.async_runner = None
+
+    def baking_loop(self, thread_id: UUID):
+        """
+        Records a baking point every primary interval.
+
+        :param thread_id: UUID of the thread this code is running in
+        """
         count = 0
         while self.master.thread_map[thread_id] and self.master.running:
-            temperature = self.get_temperature(thread_id)
-
-            curr_time = time.time()
-            waves, powers = self.get_wave_amp_data(thread_id)
-            curr_time += time.time()
-            curr_time /= 2.
-
-            temperature += self.get_temperature(thread_id)
-            temperature /= 2.
-
-            self.disconnect_devices()
+            curr_time, temperature, waves, powers, deviations, dropouts = self.get_baking_point(thread_id)
 
             if count != 0:
-                self.database_controller.record_baking_point(curr_time, temperature, waves, powers)
+                self.database_controller.record_baking_point(curr_time, temperature, waves, powers, deviations,
+                                                             dropouts)
             count += 1
 
             start_time = time.time()
@@ -85,8 +94,62 @@ class BakingProgram(program.Program):
             while self.master.thread_map[thread_id] and time.time() - start_time < self.options.prim_time.get() \
                     * 60 * 60:
                 count = self.set_oven(count)
-        else:
-            self.disconnect_devices()
+
+    def get_baking_point(self, thread_id: UUID) -> Tuple[float, float, List[float], List[float], List[float],
+                                                        List[int]]:
+        """
+        Takes the optical sweep, while sampling the temperature.
+
+        :param thread_id: UUID of the thread this code is running in
+        :returns: the middle time of the sweep, the average temperature over the sweep, and the wavelengths, powers,
+                  wavelength deviations, and dropouts of the fbgs
+        """
+        if self.async_runner is not None:
+            return self.get_async_baking_point(thread_id)
+        with TemperatureSampler(lambda: self.get_temperature(thread_id)) as sampler:
+            start_time = time.time()
+            waves, powers, deviations, dropouts = self.get_wave_amp_data(thread_id)
+            end_time = time.time()
+        return (start_time + end_time) / 2., sampler.average(start_time, end_time), waves, powers, deviations, \
+            dropouts
+
+    def get_async_baking_point(self, thread_id: UUID) -> Tuple[float, float, List[float], List[float],
+                                                              List[float], List[int]]:
+        """
+        Takes the optical sweep, and samples the temperature concurrently with the asyncio devices, the sweep is
+        cancelled as soon as the program is paused.
+
+        :param thread_id: UUID of the thread this code is running in
+        :returns: the middle time of the sweep, the average temperature over the sweep, and the wavelengths, powers,
+                  wavelength deviations, and dropouts of the fbgs
+        """
+        while True:
+            try:
+                with self.master.device_manager.session(TEMP, thread_id) as temp_controller:
+                    return self.async_runner.run(self.record_async_point(temp_controller))
+            except (AttributeError, visa.VisaIOError, socket.error, asyncio.IncompleteReadError,
+                    asyncio.TimeoutError):
+                self.close_async_laser()
+                self.temp_controller_error()
+
+    async def record_async_point(self, temp_controller) -> Tuple[float, float, List[float], List[float],
+                                                               List[float], List[int]]:
+        """
+        Connects to the SM125 if needed, and records a baking point.
+
+        :param temp_controller: the temperature controller connection
+        """
+        if self.async_laser is None:
+            self.async_laser = await AsyncSM125.connect(self.master.sm125_address.get(),
+                                                        int(self.master.sm125_port.get()))
+        return await async_recorder.record_point(self.async_laser, AsyncTemperatureController(temp_controller),
+                                                 self.switches, self.options.num_pts.get())
+
+    def close_async_laser(self):
+        """Closes the asyncio SM125 connection, it is reconnected on the next baking point."""
+        if self.async_laser is not None:
+            self.async_laser.close()
+            self.async_laser = None
 
     def get_temperature(self, thread_id: UUID) -> float:
         temperature = None
@@ -94,8 +157,8 @@ class BakingProgram(program.Program):
             if not self.master.thread_map[thread_id]:
                 raise ProgramStopped
             try:
-                self.master.conn_dev(TEMP, thread_id=thread_id)
-                temperature = self.master.temp_controller.get_temp_k()
+                with self.master.device_manager.session(TEMP, thread_id) as temp_controller:
+                    temperature = temp_controller.get_temp_k()
             except (visa.VisaIOError, AttributeError, socket.error):
                 self.temp_controller_error()
         return temperature
@@ -7,17 +7,24 @@ from typing import List, Tuple
 from uuid import UUID
 
 import tkinter as tk
+from tkinter import ttk
 import visa
 
-from fbgui.constants import CAL, TEMP
+from fbgui.constants import CAL, TEMP, REAL_POINT_HEADER, TEMPERATURE_HEADER
 from fbgui.exceptions import ProgramStopped
+from fbgui.live_curve_fit import LiveCurveFit, CurveFitView
 from fbgui.main_program import Application
 from fbgui.messages import MessageType, Message
 from fbgui.program import Program, ProgramType
 
 
 class CalProgram(Program):
-    """Contains the logic specific for running a calibration program."""
+    """
+    Contains the logic specific for running a calibration program.
+
+    :ivar LiveCurveFit live_fit: fits of the run's real points, shown on the curve fit tab
+    :ivar CurveFitView curve_fit_view: the curve fit tab
+    """
     def __init__(self, master: Application):
         """
         Creates a new CalProgram object that overrides the Program class with the CAl program type.
@@ -27,8 +34,18 @@ class CalProgram(Program):
         cal_type = ProgramType(CAL)
         super().__init__(master, cal_type)
         self.current_set_temp = None
+        self.next_set_temp = None
         self.thread_id = None  # type: UUID
 
+    def setup_tabs(self):
+        """Setup the configuration, graphing, and table tabs, and the curve fit tab."""
+        super().setup_tabs()
+        self.live_fit = LiveCurveFit()
+        fit_frame = ttk.Frame(self)
+        self.add(fit_frame, image=self.graph_photo, text="Fit", compound=tk.TOP)
+        self.curve_fit_view = CurveFitView(fit_frame, self.live_fit)
+        self.curve_fit_view.pack(fill="both", expand=True)
+
     def program_loop(self, thread_id: UUID):
         """
         Runs the calibration main loop.
@@ -37,6 +54,7 @@ class CalProgram(Program):
         """
         temps_arr = self.options.get_target_temps()
         self.thread_id = thread_id
+        self.reset_live_fit()
         self.cal_loop(temps_arr)
         if self.master.thread_map[self.thread_id]:
             self.create_excel()
@@ -62,13 +80,12 @@ class CalProgram(Program):
         for _ in range(self.options.num_temp_readings.get()):
             while temp is None:
                 try:
-                    self.master.conn_dev(TEMP, thread_id=self.thread_id)
-                    temp = float((self.master.temp_controller.get_temp_k()))
+                    with self.master.device_manager.session(TEMP, self.thread_id) as temp_controller:
+                        temp = float((temp_controller.get_temp_k()))
                     avg_temp += temp
                 except (AttributeError, visa.VisaIOError):
                     self.temp_controller_error()
             temp = None
-        self.disconnect_devices()
         return avg_temp/(float(self.options.num_temp_readings.get()))
 
     def cal_loop(self, temps: List[float]):
@@ -102,7 +119,6 @@ class CalProgram(Program):
 
             self.current_set_temp = temps[0] - 5
             self.set_oven_temp(temps[0] - 5, **kwargs)
-            self.disconnect_devices()
             kwargs["force_connect"] = False
 
             while not self.reset_temp(temps[0]):
@@ -116,14 +132,14 @@ class CalProgram(Program):
             self.record_beginning_extra_points(cycle_num, temps[0])
 
             start_cycle_time = time.time()
-            for temp in temps:
+            for i, temp in enumerate(temps):
                 self.current_set_temp = temp
+                self.next_set_temp = temps[i + 1] if i + 1 < len(temps) else temps[0]
                 if temp >= temps[0]:
                     kwargs = {"temp": temp, "heat": True, "force_connect": True}
                 else:
                     kwargs = {"temp": temp, "heat": False, "cooling": True, "force_connect": True}
                 self.set_oven_temp(**kwargs)
-                self.disconnect_devices()
                 self.sleep()
                 kwargs["force_connect"] = False
                 while not self.check_drift_rate(cycle_num):
@@ -161,6 +177,23 @@ class CalProgram(Program):
             temperature += 273.15
             self.database_controller.record_calibration_point(curr_time, temperature, wavelengths, powers, drift_rate=0,
                                                               is_real_calibration_point=True, cycle_num=cycle_num)
+            self.live_fit.add_point(temperature, wavelengths)
+
+    def reset_live_fit(self):
+        """Restarts the live curve fit from the real calibration points already recorded for the run."""
+        self.live_fit.reset(self.snums)
+        try:
+            data_frame = self.database_controller.to_data_frame()
+            real_points = data_frame[data_frame[REAL_POINT_HEADER] == "True"]
+            wavelength_columns = ["{} Wavelength (nm.)".format(snum) for snum in self.snums]
+            dropout_columns = ["{} Dropouts".format(snum) for snum in self.snums]
+            dropouts = None
+            if all(column in real_points.columns for column in dropout_columns):
+                dropouts = real_points[dropout_columns].fillna(0).values
+            self.live_fit.add_points(real_points[TEMPERATURE_HEADER].values, real_points[wavelength_columns].values,
+                                     dropouts)
+        except (IndexError, KeyError):
+            pass
 
     def reset_temp(self, start_temp: float) -> bool:
         """
@@ -183,36 +216,36 @@ class CalProgram(Program):
             return True
         return False
 
-    def get_drift_rate(self, get_wave_amp: bool=False) -> Tuple[float, float, float, List[float], List[float]]:
+    def get_drift_rate(self, get_wave_amp: bool=False) -> Tuple[float, float, float, List[float], List[float],
+                                                                List[float], List[int]]:
         """
         Get the drift rate of the system.
 
         :param: the UUID of the thread the code is currently running on
         :return: the current drift rate in mK/min
         """
-        self.master.conn_dev(TEMP, thread_id=self.thread_id)
         start_time = time.time()
         self.check_program_stopped()
         start_temp = self.get_temp()
 
         waves = []
         amps = []
+        deviations = []
+        dropouts = []
         if get_wave_amp:
-            waves, amps = self.get_wave_amp_data(self.thread_id)
+            waves, amps, deviations, dropouts = self.get_wave_amp_data(self.thread_id)
         else:
             time.sleep(5)
 
         self.check_program_stopped()
         self.sleep()
 
-        self.master.conn_dev(TEMP, thread_id=self.thread_id)
         curr_temp = self.get_temp()
         curr_time = time.time()
-        self.disconnect_devices()
 
         drift_rate = math.fabs(start_temp - curr_temp) / math.fabs(start_time - curr_time)
         drift_rate *= 60000.
-        return drift_rate, curr_temp, curr_time, waves, amps
+        return drift_rate, curr_temp, curr_time, waves, amps, deviations, dropouts
 
     def check_drift_rate(self, cycle_num: int) -> bool:
         """
@@ -224,18 +257,26 @@ class CalProgram(Program):
         """
         while True:
             try:
-                drift_rate, curr_temp, curr_time, waves, amps = self.get_drift_rate(get_wave_amp=True)
+                drift_rate, curr_temp, curr_time, waves, amps, deviations, dropouts = \
+                    self.get_drift_rate(get_wave_amp=True)
 
                 if drift_rate <= self.options.drift_rate.get():
                     self.database_controller.record_calibration_point(curr_time, curr_temp, waves, amps, drift_rate,
                                                                       is_real_calibration_point=True,
-                                                                      cycle_num=cycle_num)
+                                                                      cycle_num=cycle_num,
+                                                                      wavelength_deviations=deviations,
+                                                                      dropouts=dropouts)
+                    next_temperature = None
+                    if self.next_set_temp is not None:
+                        next_temperature = float(self.next_set_temp) + 273.15
+                    self.live_fit.add_point(curr_temp, waves, next_temperature, dropouts)
                     return True
 
                 self.check_program_stopped()
                 self.database_controller.record_calibration_point(curr_time, curr_temp, waves, amps,
                                                                   drift_rate, is_real_calibration_point=False,
-                                                                  cycle_num=cycle_num)
+                                                                  cycle_num=cycle_num,
+                                                                  wavelength_deviations=deviations, dropouts=dropouts)
                 return False
             except (AttributeError, visa.VisaIOError):
                 self.temp_controller_error()
@@ -1,33 +1,39 @@
 import re
-from typing import List, Tuple, Callable
+from typing import List, Tuple, Dict
 
 import pandas as pd
-import numpy.polynomial.polynomial as poly
 import numpy as np
 
-from fbgui import excel_file_controller
-from fbgui.helpers import make_length
+from fbgui import excel_file_controller, polynomial_fit
 from fbgui.constants import *
 
 
-def _get_master_temperatures(all_temperatures: List[List[float]]) -> List[float]:
-    master_temperatures = []
-    for k in range(len(all_temperatures[0])):
-        inner_temperatures = []
-        for temperatures in all_temperatures:
-            inner_temperatures.append(temperatures[k])
-        master_temperatures.append(int(sum(inner_temperatures) / len(inner_temperatures)))
-    return master_temperatures
+def _get_master_temperatures(temperatures: np.ndarray) -> np.ndarray:
+    return np.trunc(temperatures.sum(axis=0) / len(temperatures)).astype(int)
+
+
+def _average_cycles(temperatures: np.ndarray) -> np.ndarray:
+    # Each cycle is averaged with the average of the cycles before it, points missing from a cycle are skipped
+    averages = temperatures[0]
+    for cycle_temperatures in temperatures[1:]:
+        averages = np.where(cycle_temperatures != 0, (averages + cycle_temperatures) / 2., averages)
+    return averages
 
 
 class CalibrationExcelContainer:
+    """
+    Builds the calibration sheet from the real points of a calibration run. The real points are pivoted once into a
+    cycle x point x fbg cube, the number of points is the first cycle's, longer cycles are truncated, and shorter
+    cycles are padded with 0s. The columns are computed from the cube, and joined into the sheet's data frame at once.
+    """
+
     def __init__(self, real_point_data_frame: pd.DataFrame, cycles: List[int]):
         super().__init__()
         self.real_point_data_frame = real_point_data_frame
         self.cycles = cycles
         self.wavelength_headers, self.power_headers = excel_file_controller \
             .get_wavelength_power_headers(real_point_data_frame)
-        self.temperature_averages = []
+        self.temperature_averages = np.empty(0)
         self.deviation_wavelength_indexes = []
         self.deviation_power_indexes = []
         self.mean_wavelength_indexes = []
@@ -43,6 +49,7 @@ class CalibrationExcelContainer:
         self.power_mean_coefficients = ([], [])  # type: Tuple[List[List[float]], List[List[float]]]
 
         self.number_of_readings = 0
+        self.column_blocks = []  # type: List[pd.DataFrame]
         self.calibration_data_frame = pd.DataFrame()
         self.populate()
 
@@ -50,155 +57,125 @@ class CalibrationExcelContainer:
         return self.calibration_data_frame
 
     def populate(self):
-        all_temperatures = []
-        for cycle_num in self.cycles:
-            temperatures = self.get_temperatures(cycle_num)
-            all_temperatures.append(temperatures)
-            self.add_wavelengths(temperatures, cycle_num)
-        mean_temperature_column_name = "Mean Temperature (K)"
-        self.calibration_data_frame[mean_temperature_column_name] = \
-            make_length(list(self.temperature_averages), self.number_of_readings)
-        self.mean_temperature_column = self._get_index(mean_temperature_column_name) + 1
+        temperatures, readings = self.pivot_cycles()
+        wavelengths = readings[:, :, :len(self.wavelength_headers)]
+        powers = readings[:, :, len(self.wavelength_headers):]
+        self.temperature_averages = _average_cycles(temperatures)
+        master_temperatures = _get_master_temperatures(temperatures)
 
-        self.add_powers(all_temperatures[0])
-
-        self.calibration_data_frame["Mean Temperature (K) "] = list(self.temperature_averages)
-        self.add_wavelength_deviation()
-        self.add_power_deviation()
-
-        self.get_wavelength_sensitivity_coefficients(all_temperatures)
-        self.get_power_sensitivity_coefficients(all_temperatures)
-
-        self.plot_master_temperatures(all_temperatures)
-
-    def add_wavelengths(self, temperatures: List[float], cycle_num: int):
-        self.calibration_data_frame["Temperature (K) Cycle {}".format(cycle_num)] = temperatures
-        for wavelength_header in self.wavelength_headers:
-            wavelengths = self.get_readings(cycle_num, wavelength_header)
-            delta_wavelengths = [(wavelength - wavelengths[0]) * 1000 for wavelength in wavelengths]
-            self.calibration_data_frame["{} Cycle {}".format(wavelength_header, cycle_num)] = wavelengths
-            fbg_name = fbg_name_from_header(wavelength_header)
-            self.calibration_data_frame["{} {} Wavelength (pm) Cycle {}".format(fbg_name, u"\u0394", cycle_num)] = \
-                delta_wavelengths
+        self.add_wavelengths(temperatures, wavelengths)
+        mean_temperature_column_name = "Mean Temperature (K)"
+        self._add_columns([mean_temperature_column_name], self.temperature_averages)
+        self.add_powers(temperatures[0], powers)
+        self._add_columns(["Mean Temperature (K) "], self.temperature_averages)
+
+        wavelength_means = get_means_at_temperatures(self.real_point_data_frame[self.wavelength_headers].values,
+                                                     self.number_of_readings)
+        power_means = get_means_at_temperatures(self.real_point_data_frame[self.power_headers].values,
+                                                self.number_of_readings)
+        mean_wavelength_columns, deviation_wavelength_columns = \
+            self._add_deviation(self.wavelength_headers, "Wavelength (nm)", wavelengths, wavelength_means,
+                                "Cycle {} {} Wavelength Deviation (pm)", 1000)
+        mean_power_columns, deviation_power_columns = \
+            self._add_deviation(self.power_headers, "Power (db)", powers, power_means,
+                                "Cycle {} {} Power Deviation (db)", 1)
+
+        sensitivity_wavelength_columns, sensitivity_power_columns = [], []  # type: List[str], List[str]
+        if self.number_of_readings >= 3:
+            sensitivity_wavelength_columns = \
+                self._add_sensitivities(self.wavelength_headers, wavelength_means, master_temperatures,
+                                        self.wavelength_mean_coefficients, "Wavelength", "(pm/K)")
+            sensitivity_power_columns = \
+                self._add_sensitivities(self.power_headers, power_means, master_temperatures,
+                                        self.power_mean_coefficients, "Power", "(db/K)")
 
-    def add_powers(self, temperatures: List[float]):
+        master_temperature_column = "Master Temperatures (K)"
+        self._add_columns([master_temperature_column], master_temperatures)
+
+        self.calibration_data_frame = pd.concat(self.column_blocks, axis=1)
+        self.column_blocks = []
+        indexes = {}  # type: Dict[str, int]
+        for i, column in enumerate(self.calibration_data_frame.columns):
+            indexes.setdefault(column, i)
+        self.mean_temperature_column = indexes[mean_temperature_column_name] + 1
+        self.master_temperature_column = indexes[master_temperature_column] + 1
+        self.mean_wavelength_indexes = [indexes[column] for column in mean_wavelength_columns]
+        self.deviation_wavelength_indexes = [indexes[column] for column in deviation_wavelength_columns]
+        self.mean_power_indexes = [indexes[column] for column in mean_power_columns]
+        self.deviation_power_indexes = [indexes[column] for column in deviation_power_columns]
+        self.sensitivity_wavelength_indexes = [indexes[column] for column in sensitivity_wavelength_columns]
+        self.sensitivity_power_indexes = [indexes[column] for column in sensitivity_power_columns]
+
+    def pivot_cycles(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pivots the real points into a cube of the cycles' readings, the points of a cycle are in the order they
+        were recorded.
+
+        :returns: the (cycle, point) temperatures, and the (cycle, point, header) readings, wavelength headers first
+        """
+        cycle_indexes = pd.Index(self.cycles).get_indexer(self.real_point_data_frame[CYCLE_HEADER])
+        point_indexes = self.real_point_data_frame.groupby(CYCLE_HEADER).cumcount().values
+        self.number_of_readings = int(np.count_nonzero(cycle_indexes == 0))
+        rows = (cycle_indexes >= 0) & (point_indexes < self.number_of_readings)
+
+        headers = [TEMPERATURE_HEADER] + self.wavelength_headers + self.power_headers
+        cube = np.zeros((len(self.cycles), self.number_of_readings, len(headers)))
+        cube[cycle_indexes[rows], point_indexes[rows]] = self.real_point_data_frame[headers].values[rows]
+        return cube[:, :, 0], cube[:, :, 1:]
+
+    def add_wavelengths(self, temperatures: np.ndarray, wavelengths: np.ndarray):
+        columns = []
+        for cycle_num in self.cycles:
+            columns.append("Temperature (K) Cycle {}".format(cycle_num))
+            for wavelength_header in self.wavelength_headers:
+                fbg_name = fbg_name_from_header(wavelength_header)
+                columns.append("{} Cycle {}".format(wavelength_header, cycle_num))
+                columns.append("{} {} Wavelength (pm) Cycle {}".format(fbg_name, u"\u0394", cycle_num))
+        delta_wavelengths = (wavelengths - wavelengths[:, :1]) * 1000
+        cycle_readings = np.stack((wavelengths, delta_wavelengths), axis=3).reshape(wavelengths.shape[:2] + (-1,))
+        values = np.concatenate((temperatures[:, :, np.newaxis], cycle_readings), axis=2)
+        self._add_columns(columns, values.transpose(1, 0, 2).reshape(self.number_of_readings, len(columns)))
+
+    def add_powers(self, temperatures: np.ndarray, powers: np.ndarray):
+        columns = []
         for cycle_num in self.cycles:
-            self.calibration_data_frame["Temperature (K) Cycle {} ".format(cycle_num)] = temperatures
-            for power_header in self.power_headers:
-                powers = self.real_point_data_frame[self.real_point_data_frame["Cycle Num"] == cycle_num][power_header]
-                powers = make_length(list(powers), self.number_of_readings)
-                self.calibration_data_frame["{} Cycle {}".format(power_header, cycle_num)] = powers
-
-    def get_temperatures(self, cycle_num: int) -> List[float]:
-        header = TEMPERATURE_HEADER
-        temperatures = list(
-            self.real_point_data_frame[self.real_point_data_frame["Cycle Num"] == cycle_num][header])
-        if not self.number_of_readings:
-            self.temperature_averages = temperatures
-        else:
-            temperatures += [0] * (self.number_of_readings - len(temperatures))
-            self.temperature_averages = [(t + new_t) / 2. if new_t != 0 else t for t, new_t in
-                                         zip(self.temperature_averages, temperatures)]
-        self.number_of_readings = len(self.temperature_averages)
-        return make_length(list(temperatures), self.number_of_readings)
-
-    def add_wavelength_deviation(self):
-        self._add_deviation(self.wavelength_headers, "Wavelength (nm)", self.mean_wavelength_indexes,
-                            self._wavelength_inner_deviation)
-
-    def add_power_deviation(self):
-        self._add_deviation(self.power_headers, "Power (db)", self.mean_power_indexes,
-                            self._power_inner_deviation)
-
-    def get_wavelength_sensitivity_coefficients(self, temperatures: List[List[float]]):
-        self._get_sensitivity_mean_coefficients("Wavelength (nm)", temperatures,
-                                                self.wavelength_mean_coefficients, self.sensitivity_wavelength_indexes,
-                                                self.wavelength_headers, "Wavelength", "(pm/K)")
-
-    def get_power_sensitivity_coefficients(self, temperatures: List[List[float]]):
-        self._get_sensitivity_mean_coefficients("Power (db)", temperatures, self.power_mean_coefficients,
-                                                self.sensitivity_power_indexes, self.power_headers, "Power", "(db/K)")
-
-    def _get_sensitivity_mean_coefficients(self, header_specifier: str, all_temperatures: List[List[float]],
-                                           coefficients_list: Tuple[List[List[float]], List[List[float]]],
-                                           indexes: List[int], headers: List[str], type_specifier: str, units: str):
-        if len(all_temperatures[0]) < 3:
-            return
+            columns.append("Temperature (K) Cycle {} ".format(cycle_num))
+            columns.extend("{} Cycle {}".format(power_header, cycle_num) for power_header in self.power_headers)
+        cycle_temperatures = np.broadcast_to(temperatures, powers.shape[:2])[:, :, np.newaxis]
+        values = np.concatenate((cycle_temperatures, powers), axis=2)
+        self._add_columns(columns, values.transpose(1, 0, 2).reshape(self.number_of_readings, len(columns)))
+
+    def _add_deviation(self, headers: List[str], header_specifier: str, readings: np.ndarray, means: np.ndarray,
+                       deviation_format: str, scalar: int) -> Tuple[List[str], List[str]]:
+        columns, mean_columns, deviation_columns = [], [], []  # type: List[str], List[str], List[str]
         for header in headers:
             fbg_name = fbg_name_from_header(header)
-            master_temperatures = _get_master_temperatures(all_temperatures)
-            mean_column_name = "{} Mean {}".format(fbg_name, header_specifier)
-            y_values = self.calibration_data_frame[mean_column_name][1:]
-            mean_temperature_column_name = "Mean Temperature (K)"
-            x_values = self.calibration_data_frame[mean_temperature_column_name][1:]
-
-            coefficients = []
-            for order in range(1, 4):
-                coefficients = poly.polyfit(x_values, y_values, order)
-                error = np.sum((poly.polyval(x_values, coefficients) - y_values)**2)
-                if error <= 10**-6:
-                    break
-            derivative_coefficients = poly.polyder(coefficients)
-
-            sensitivity_column_name = "{} {} Sensitivity {}".format(fbg_name, type_specifier, units)
-            scalar = 1000 if type_specifier == "Wavelength" else 1
-            results = poly.polyval(master_temperatures, derivative_coefficients)
-            self.calibration_data_frame[sensitivity_column_name] = results
-            self.calibration_data_frame[sensitivity_column_name] *= scalar
-            coefficients_list[0].append(list(reversed(coefficients)))
-            coefficients_list[1].append(list(reversed(derivative_coefficients)))
-            self._add_deviation_index(sensitivity_column_name, indexes)
-
-    def _wavelength_inner_deviation(self, cycle: int, fbg_name: str, wavelength_header: str,
-                                    mean_wavelengths: List[float]):
-        deviation_column_name = "Cycle {} {} Wavelength Deviation (pm)".format(cycle, fbg_name)
-        self.add_deviation_column(deviation_column_name, wavelength_header, cycle, mean_wavelengths)
-        self.calibration_data_frame[deviation_column_name] *= 1000
-        self._add_deviation_index(deviation_column_name, self.deviation_wavelength_indexes)
-
-    def _power_inner_deviation(self, cycle: int, fbg_name: str, power_header: str, mean_powers: List[float]):
-        deviation_column_name = "Cycle {} {} Power Deviation (db)".format(cycle, fbg_name)
-        self.add_deviation_column(deviation_column_name, power_header, cycle, mean_powers)
-        self._add_deviation_index(deviation_column_name, self.deviation_power_indexes)
-
-    def _add_deviation_index(self, column_name: str, deviation_indexes: List[int]):
-        deviation_index = self._get_index(column_name)
-        deviation_indexes.append(deviation_index)
-
-    def _add_deviation(self, headers: List[str], header_specifier: str, mean_indexes: List[int],
-                       inner_deviation_function: Callable[[int, str, str, List[float]], None]):
-        for i, header in enumerate(headers):
-            means, fbg_name = self.get_means_and_fbg_name(header)
-            mean_deviation_column_name = "{} Mean {}".format(fbg_name, header_specifier)
-            self.calibration_data_frame[mean_deviation_column_name] = means
-            mean_index = self._get_index(mean_deviation_column_name)
-            mean_indexes.append(mean_index)
+            mean_columns.append("{} Mean {}".format(fbg_name, header_specifier))
+            columns.append(mean_columns[-1])
             for cycle in self.cycles:
-                inner_deviation_function(cycle, fbg_name, header, means)
-
-    def get_means_and_fbg_name(self, header) -> Tuple[List[float], str]:
-        means = get_means_at_temperatures(list(self.real_point_data_frame[header]), self.number_of_readings)
-        fbg_name = fbg_name_from_header(header)
-        return means, fbg_name
-
-    def add_deviation_column(self, deviation_column_name: str, header: str, cycle: int, means: List[float]):
-        readings = self.get_readings(cycle, header)
-        self.calibration_data_frame[deviation_column_name] = readings
-        self.calibration_data_frame[deviation_column_name] -= means
-
-    def _get_index(self, column_name: str) -> int:
-        return self.calibration_data_frame.columns.tolist().index(column_name)
-
-    def get_readings(self, cycle_num: int, header: str) -> List[float]:
-        readings = \
-            self.real_point_data_frame[self.real_point_data_frame["Cycle Num"] == cycle_num][header]
-        return make_length(list(readings), self.number_of_readings)
+                deviation_columns.append(deviation_format.format(cycle, fbg_name))
+                columns.append(deviation_columns[-1])
+        deviations = (readings - means) * scalar
+        values = np.concatenate((means[:, :, np.newaxis], deviations.transpose(1, 2, 0)), axis=2)
+        self._add_columns(columns, values.reshape(self.number_of_readings, len(columns)))
+        return mean_columns, deviation_columns
+
+    def _add_sensitivities(self, headers: List[str], means: np.ndarray, master_temperatures: np.ndarray,
+                           coefficients_list: Tuple[List[List[float]], List[List[float]]], type_specifier: str,
+                           units: str) -> List[str]:
+        mean_fit = polynomial_fit.fit_lowest_order(self.temperature_averages[1:], means[1:])
+        scalar = 1000 if type_specifier == "Wavelength" else 1
+        columns = []
+        for i, header in enumerate(headers):
+            columns.append("{} {} Sensitivity {}".format(fbg_name_from_header(header), type_specifier, units))
+            coefficients_list[0].append(list(reversed(mean_fit.column_coefficients(i))))
+            coefficients_list[1].append(list(reversed(mean_fit.column_derivative(i))))
+        self._add_columns(columns, mean_fit.evaluate_derivatives(master_temperatures) * scalar)
+        return columns
 
-    def plot_master_temperatures(self, all_temperatures: List[List[float]]):
-        master_temperatures = _get_master_temperatures(all_temperatures)
-        master_temperature_column = "Master Temperatures (K)"
-        self.calibration_data_frame[master_temperature_column] = master_temperatures
-        self.master_temperature_column = self._get_index(master_temperature_column) + 1
+    def _add_columns(self, columns: List[str], values: np.ndarray):
+        values = values.reshape(self.number_of_readings, len(columns))
+        self.column_blocks.append(pd.DataFrame(values, columns=columns))
 
 
 def fbg_name_from_header(header: str) -> str:
@@ -208,16 +185,20 @@ def fbg_name_from_header(header: str) -> str:
     return name_match.group(0)
 
 
-def get_means_at_temperatures(values: List[float], num_temps: int) -> List[float]:
-    try:
-        means = []
-        for i in range(num_temps):
-            count = 0
-            mean = 0
-            for j in range(i, len(values), num_temps):
-                mean += values[j]
-                count += 1
-            means.append(mean / count)
-        return means
-    except ZeroDivisionError:
-        return []
+def get_means_at_temperatures(values: np.ndarray, num_temps: int) -> np.ndarray:
+    """
+    Means of every num_temps'th value, starting from each of the first num_temps values. For cycles of num_temps
+    points each, these are the means of each point across the cycles.
+
+    :param values: readings in the order they were recorded, one column per header
+    :param num_temps: number of points in a cycle
+    :returns: (point, header) means, empty if there are fewer than num_temps values
+    """
+    values = np.asarray(values, dtype=float)
+    if not num_temps or len(values) < num_temps:
+        return np.empty((0,) + values.shape[1:])
+    padded_values = np.zeros((-(-len(values) // num_temps) * num_temps,) + values.shape[1:])
+    padded_values[:len(values)] = values
+    sums = padded_values.reshape((-1, num_temps) + values.shape[1:]).sum(axis=0)
+    counts = np.bincount(np.arange(len(values)) % num_temps, minlength=num_temps)
+    return sums / counts.reshape((-1,) + (1,) * (values.ndim - 1))
@@ -70,6 +70,42 @@ DB_DIR = os.path.join("db")
 # Database path
 DB_PATH = os.path.join(DB_DIR, "program_data.db")
 
+# Number of recorded points committed together, and the maximum seconds a point waits to be committed
+DB_COMMIT_BATCH_SIZE = 10
+DB_COMMIT_INTERVAL = 5.
+# Number of consecutive failed commits after which the queued points are dropped, instead of retried
+DB_COMMIT_MAX_RETRIES = 5
+
+# Number of prepared statements kept by each database connection
+STATEMENT_CACHE_SIZE = 64
+
+# Seconds between temperature readings taken while the optical sweep is running
+TEMP_SAMPLE_INTERVAL = 1.
+
+# Optical switch settling, the switched channel is settled once this many consecutive SM125 frames have the same
+# peaks within the tolerance (nm.), the recorder moves on after the timeout (s.) even if it has not settled
+SWITCH_SETTLE_FRAMES = 3
+SWITCH_SETTLE_TOLERANCE = .001
+SWITCH_SETTLE_TIMEOUT = 1.2
+
+# SM125 streaming mode, when enabled a dedicated thread polls the SM125 continuously into a ring buffer of frames,
+# and the laser recorder reads frames from the buffer instead of querying the SM125 itself
+SM125_STREAMING = False
+SM125_STREAM_CAPACITY = 4096
+SM125_STREAM_MAX_PEAKS = 64
+SM125_STREAM_FRAME_TIMEOUT = 1.
+
+# Asyncio baking, when enabled baking runs without switched fbgs scan the SM125, and read the temperature
+# concurrently with the asyncio devices, and pausing cancels the running scan instead of waiting for it
+ASYNC_BAKING = False
+# Seconds the asyncio devices wait for a connection, a scan, or a temperature reading, matches the socket timeout of
+# the blocking devices
+DEVICE_TIMEOUT = 3.
+
+# Number of most recent durations kept for each timed stage, and seconds between timing summaries in the program log
+TIMING_WINDOW = 500
+TIMING_SUMMARY_INTERVAL = 300.
+
 # Matplotlib images, and style
 MPL_STYLE_PATH = os.path.join(ASSETS_PATH, "kyton.mplstyle")
 PLAY_PATH = os.path.join(ASSETS_PATH, "play.gif")
@@ -106,6 +142,13 @@ DELTA_TEMPERATURE_HEADER2 = "{}T (K)  ".format(u"\u0394")
 DELTA_TEMPERATURE_HEADER3 = "{}T (K)   ".format(u"\u0394")
 MEAN_DELTA_WAVELENGTH_HEADER = "Mean raw {}{} (pm.)".format(u"\u0394", u"\u03BB")
 MEAN_DELTA_POWER_HEADER = "Mean raw {}{} (dBm.)".format(u"\u0394", "P")
+# Range of the points in each bucket of a rollup, the fbg headers are formatted with the fbg's serial number
+MIN_TEMPERATURE_HEADER = "Min Temperature (K)"
+MAX_TEMPERATURE_HEADER = "Max Temperature (K)"
+MIN_WAVELENGTH_HEADER = "{{}} Min {} (nm.)".format(u"\u03BB")
+MAX_WAVELENGTH_HEADER = "{{}} Max {} (nm.)".format(u"\u03BB")
+MIN_POWER_HEADER = "{} Min P (dBm.)"
+MAX_POWER_HEADER = "{} Max P (dBm.)"
 REAL_POINT_HEADER = "Real Point"
 CYCLE_HEADER = "Cycle Num"
 
@@ -120,3 +163,42 @@ CALIBRATION_GRAPH_START_ROW = 2
 CREATE_MAP_TABLE = str("CREATE TABLE 'map' ( 'ID' INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,"
                        "'ProgName' TEXT NOT NULL, 'ProgType' INTEGER NOT NULL, 'FilePath' TEXT, 'Snums' TEXT, "
                        "'BakeSensitivity' TEXT, 'ExtraPoint1Temperature' REAL, 'ExtraPoint2Temperature' REAL)")
+
+# Long format program data, one row per recorded point in points, and one row per fbg per point in readings, both
+# keyed by the run's map ID, the indexes cover the per point, and the time range queries of a run, the rollups hold
+# the count, sum, minimum, and maximum of the points in each time bucket of a baking run
+CREATE_READINGS_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS points (ID INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, run_id INTEGER NOT NULL, "
+    "ts REAL NOT NULL, temperature REAL NOT NULL, drift_rate REAL, real_point INTEGER, cycle_num INTEGER)",
+    "CREATE TABLE IF NOT EXISTS fbgs (ID INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, run_id INTEGER NOT NULL, "
+    "name TEXT NOT NULL, UNIQUE (run_id, name))",
+    "CREATE TABLE IF NOT EXISTS readings (run_id INTEGER NOT NULL, ts REAL NOT NULL, fbg_id INTEGER NOT NULL, "
+    "wavelength REAL NOT NULL, power REAL NOT NULL, std_dev REAL NOT NULL DEFAULT 0, "
+    "dropouts INTEGER NOT NULL DEFAULT 0, point_id INTEGER)",
+    "CREATE INDEX IF NOT EXISTS points_run_id ON points (run_id, ID)",
+    "CREATE INDEX IF NOT EXISTS points_run_ts ON points (run_id, ts)",
+    "CREATE INDEX IF NOT EXISTS readings_run_point ON readings (run_id, point_id, fbg_id, wavelength, power, "
+    "std_dev, dropouts)",
+    "CREATE INDEX IF NOT EXISTS readings_run_ts ON readings (run_id, ts, fbg_id, wavelength, power)",
+    "CREATE TABLE IF NOT EXISTS point_rollups (run_id INTEGER NOT NULL, resolution INTEGER NOT NULL, "
+    "bucket REAL NOT NULL, count INTEGER NOT NULL, ts_sum REAL NOT NULL, temperature_sum REAL NOT NULL, "
+    "temperature_min REAL NOT NULL, temperature_max REAL NOT NULL, PRIMARY KEY (run_id, resolution, bucket))",
+    "CREATE TABLE IF NOT EXISTS reading_rollups (run_id INTEGER NOT NULL, resolution INTEGER NOT NULL, "
+    "bucket REAL NOT NULL, fbg_id INTEGER NOT NULL, count INTEGER NOT NULL, wavelength_sum REAL NOT NULL, "
+    "wavelength_min REAL NOT NULL, wavelength_max REAL NOT NULL, power_sum REAL NOT NULL, power_min REAL NOT NULL, "
+    "power_max REAL NOT NULL, PRIMARY KEY (run_id, resolution, bucket, fbg_id))",
+)
+
+# Bucket sizes in seconds of the per minute, per hour, and per day rollups kept for baking runs, finest first, each
+# resolution is a multiple of the one before it
+ROLLUP_RESOLUTIONS = (60, 3600, 86400)
+# Minimum number of buckets for a rollup to replace the raw points in the graphs, and in the baking spreadsheet
+GRAPH_ROLLUP_POINTS = 2000
+EXCEL_ROLLUP_POINTS = 5000
+# Number of points read from the database, and streamed to the spreadsheet at a time by the excel export
+EXCEL_CHUNK_SIZE = 1000
+# Number of worker processes the excel exports are run in, so several runs can be exported at once
+EXPORT_WORKERS = 2
+# Highest order of the calibration curve fits, and the summed squared error at which a lower order fit is kept
+CURVE_FIT_MAX_ORDER = 3
+CURVE_FIT_TOLERANCE = 10**-6
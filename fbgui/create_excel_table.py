@@ -1,7 +1,5 @@
 """Home page table used for creating excel spreadsheets of program runs."""
 import configparser
-import sqlite3
-import threading
 import tkinter
 import tkinter.font as tkfont
 import tkinter.ttk as ttk
@@ -13,8 +11,9 @@ from typing import List, Dict
 from fbgui import ui_helper as uh, reset_config
 from fbgui.constants import DB_PATH, PROG_CONFIG_PATH, BAKING, CAL
 from fbgui.database_controller import delete_tables
-from fbgui.excel_file_controller import ExcelFileController
+from fbgui.export_pool import ExportPool
 from fbgui.messages import MessageType, Message
+from fbgui.sql import reader
 
 
 class ExcelTable(ttk.Frame):
@@ -23,23 +22,26 @@ class ExcelTable(ttk.Frame):
 
     :ivar List[str] headers: the treeview table headers
     :ivar Queue main_queue: main_queue parameter
+    :ivar ExportPool export_pool: worker processes the spreadsheets are created in
     :ivar ttk.Treeview tree: ttk tree displaying information about the program runs
     :ivar List[int] item_ids: ids of the items currently stored in the tree
     :ivar Dict[int: str] file_paths: mapping of map table ids to file paths
     :ivar List[str] s_nums: map of program database ids to comma separated strings of serial numbers for that program
     """
 
-    def __init__(self, master: ttk.Frame, main_queue: Queue, **kwargs):
+    def __init__(self, master: ttk.Frame, main_queue: Queue, export_pool: ExportPool, **kwargs):
         """
         Create the widgets, populate the table, and pack into the master frame.
 
         :param master: parent frame for this class
         :param main_queue: queue used for writing log messages
+        :param export_pool: worker processes the spreadsheets are created in
         :param kwargs: additional parameters to pass to the ttk Frame super constructor
         """
         super().__init__(master, **kwargs)
         self.headers = ["Id", "File name", "Program Type"]
         self.main_queue = main_queue
+        self.export_pool = export_pool
         self.tree = None  # type: ttk.Treeview
         self.item_ids = []  # type: List[int]
         self.file_paths = None  # type: Dict[int, str]
@@ -57,10 +59,11 @@ class ExcelTable(ttk.Frame):
         for child in uh.get_all_children_tree(self.tree):
             self.tree.delete(child)
         self.item_ids.clear()
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM map;")
-        res = cur.fetchall()
+        with reader(DB_PATH) as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT ID, ProgName, ProgType, FilePath, Snums, BakeSensitivity, ExtraPoint1Temperature, "
+                           "ExtraPoint2Temperature FROM map;")
+            res = cursor.fetchall()
         ids = [tup[0] for tup in res]
         names = [tup[1] for tup in res]
         types = [tup[2] for tup in res]
@@ -77,7 +80,6 @@ class ExcelTable(ttk.Frame):
         self.bake_sensitivities = {i: sensitivity for i, sensitivity in zip(id_column, sensitivities)}
         self.extra_point1_dict = {i: ep for i, ep in zip(id_column, extra_point1)}
         self.extra_point2_dict = {i: ep for i, ep in zip(id_column, extra_point2)}
-        conn.close()
         for i, name, ptype in zip(id_column[::-1], prog_info["Name"][::-1], prog_info["Type"][::-1]):
             self.add_data([i, name, ptype])
 
@@ -102,11 +104,13 @@ class ExcelTable(ttk.Frame):
         delete_table.grid(column=1, row=0, padx=5)
         create_excel = ttk.Button(button_frame, text="Generate Spreadsheet", command=self.create_spreadsheet)
         create_excel.grid(column=0, row=0, padx=5)
+        cancel_excel = ttk.Button(button_frame, text="Cancel Spreadsheets", command=self.export_pool.cancel_all)
+        cancel_excel.grid(column=2, row=0, padx=5)
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
 
     def create_spreadsheet(self):
-        """Create the spreadsheet(s) for the selected elements of the tree view."""
+        """Create the spreadsheet(s) for the selected elements of the tree view, in parallel export processes."""
         for item in self.tree.selection():
             values = self.tree.item(item)['values']
             selected_index = values[0]
@@ -125,8 +129,7 @@ class ExcelTable(ttk.Frame):
                 extra_points.append(extra_point2)
             if len(extra_points) == 0:
                 extra_points = None
-            threading.Thread(target=self.show_spreadsheet, args=(f_name, s_nums, values[2], sensitivity,
-                                                                 extra_points)).start()
+            self.show_spreadsheet(f_name, s_nums, values[2], sensitivity, extra_points)
 
     def delete_run(self):
         table_ids = []
@@ -159,9 +162,8 @@ class ExcelTable(ttk.Frame):
 
     def show_spreadsheet(self, file_path: str, fbg_names: List[str], program_type: str, sensitivity: List[float],
                          extra_points: List[float]):
-        excel_controller = ExcelFileController(file_path, fbg_names, self.main_queue, program_type.capitalize(),
-                                               bake_sensitivity=sensitivity, extra_point_temperatures=extra_points)
-        excel_controller.create_excel()
+        self.export_pool.submit(file_path, fbg_names, program_type.capitalize(), bake_sensitivity=sensitivity,
+                                extra_point_temperatures=extra_points)
 
     def _setup_headers(self):
         """Sets up the tree view headers."""
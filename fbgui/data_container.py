@@ -1,5 +1,7 @@
 """Data container for database data."""
+import warnings
 from queue import Queue
+from typing import Dict
 
 import numpy as np
 import pandas as pd
@@ -7,6 +9,33 @@ import pandas as pd
 from fbgui.config_controller import *
 from fbgui.messages import MessageType, Message
 
+#: Suffix of the wavelength column headers, after the fbg's serial number
+WAVELENGTH_SUFFIX = " Wavelength (nm.)"
+
+
+def first_finite(values: np.ndarray) -> np.ndarray:
+    """
+    Gets the first finite value of each fbg, fbgs added part way through a run are NaN until their first reading.
+
+    :param values: 2D array of shape (fbgs, points)
+    :returns: 2D array of shape (fbgs, 1) of the first finite values, NaN for fbgs without one
+    """
+    finite = np.isfinite(values)
+    first = values[np.arange(len(values)), finite.argmax(axis=1)]
+    return np.where(finite.any(axis=1), first, np.nan)[:, np.newaxis]
+
+
+def mean_of_fbgs(values: np.ndarray) -> np.ndarray:
+    """
+    Averages the fbgs of each point, ignoring the fbgs without a reading.
+
+    :param values: 2D array of shape (fbgs, points)
+    :returns: the mean of each point, NaN for points without any readings
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(values, axis=0)
+
 
 class DataCollection(object):
     """
@@ -14,35 +43,50 @@ class DataCollection(object):
 
     **Create must be called in order to instantiate the object properly based on a dataframe object.**
 
-    :ivar List[float] times: list of delta times in hours, from the start
-    :ivar List[float] temps: list of temperatures in Kelvin
-    :ivar List[delta_temps: list of delta temperatures in Kelvin, from the start
-    :ivar List[List[float]] powers: 2D list of powers by serial number in dBm.
-    :ivar List[List[float]] delta_powers: 2D list of delta powers, from the start, by serial number, in dBm.
-    :ivar List[float] mean_delta_powers: list of average delta power in dBm, from the start
-    :ivar List[List[float]] wavelengths: 2D list of wavelengths by serial number in nm.
-    :ivar List[List[float]] delta_wavelengths: 2D list of delta wavelengths, from the start, by serial number, in pm.
-    :ivar List[float] mean_delta_wavelengths: list of average delta wavelengths in pm.
-    :ivar List[float] drift_rates: list of calibration drift rates mK/min
+    :ivar np.ndarray times: delta times in hours, from the start
+    :ivar np.ndarray temps: temperatures in Kelvin
+    :ivar np.ndarray delta_temps: delta temperatures in Kelvin, from the start
+    :ivar np.ndarray powers: 2D array of shape (fbgs, points) of powers by serial number in dBm.
+    :ivar np.ndarray delta_powers: 2D array of shape (fbgs, points) of delta powers, from the start, by serial
+                                   number, in dBm.
+    :ivar np.ndarray mean_delta_powers: average delta power in dBm, from the start
+    :ivar np.ndarray wavelengths: 2D array of shape (fbgs, points) of wavelengths by serial number in nm.
+    :ivar np.ndarray delta_wavelengths_pm: 2D array of shape (fbgs, points) of delta wavelengths, from the start, by
+                                           serial number, in pm.
+    :ivar np.ndarray mean_delta_wavelengths_pm: average delta wavelengths in pm.
+    :ivar np.ndarray drift_rates: calibration drift rates mK/min
+    :ivar np.ndarray temp_ranges: (points, 2) minimum, and maximum temperature of each rollup bucket in Kelvin, empty
+                                  if the rows are not rollup buckets
+    :ivar np.ndarray delta_temp_ranges: (points, 2) temp_ranges from the first temperature
+    :ivar np.ndarray wavelength_ranges: (fbgs, points, 2) minimum, and maximum wavelength of each rollup bucket in nm.
+    :ivar np.ndarray delta_wavelength_ranges_pm: (fbgs, points, 2) wavelength_ranges from the first wavelengths in pm.
+    :ivar np.ndarray power_ranges: (fbgs, points, 2) minimum, and maximum power of each rollup bucket in dBm.
+    :ivar np.ndarray delta_power_ranges: (fbgs, points, 2) power_ranges from the first powers in dBm.
     """
 
     def __init__(self):
         """Create empty collection, must call create to populate."""
-        self.times = []  # type: List[float]
-        self.temps = []  # type: List[float]
-        self.delta_temps = []  # type: List[float]
-        self.powers = []  # type: List[List[float]]
-        self.delta_powers = []  # type: List[List[float]]
-        self.mean_delta_powers = []  # type: List[float]
-        self.wavelengths = []  # type: List[List[float]]
-        self.delta_wavelengths_pm = []  # type: List[List[float]]
-        self.mean_delta_wavelengths_pm = []  # type: List[float]
-        self.drift_rates = []  # type: List[float]
+        self.times = []  # type: np.ndarray
+        self.temps = []  # type: np.ndarray
+        self.delta_temps = []  # type: np.ndarray
+        self.powers = []  # type: np.ndarray
+        self.delta_powers = []  # type: np.ndarray
+        self.mean_delta_powers = []  # type: np.ndarray
+        self.wavelengths = []  # type: np.ndarray
+        self.delta_wavelengths_pm = []  # type: np.ndarray
+        self.mean_delta_wavelengths_pm = []  # type: np.ndarray
+        self.drift_rates = []  # type: np.ndarray
+        self.temp_ranges = []  # type: np.ndarray
+        self.delta_temp_ranges = []  # type: np.ndarray
+        self.wavelength_ranges = []  # type: np.ndarray
+        self.delta_wavelength_ranges_pm = []  # type: np.ndarray
+        self.power_ranges = []  # type: np.ndarray
+        self.delta_power_ranges = []  # type: np.ndarray
 
     def create(self, is_cal: bool, df: pd.DataFrame, fbg_names: List[str]=None, main_queue: Queue=None):
         """
         Creates a data collection from the given dataframe, updates the instance variables to match how they are
-        specified in the class docstring, numpy arrays are used instead of lists however.
+        specified in the class docstring, every series is computed with numpy broadcasting over whole columns.
 
         **Adds date time column to the data frame**
 
@@ -56,41 +100,160 @@ class DataCollection(object):
         if fbg_names is None:
             fbg_names = get_configured_fbg_names(is_cal)
         try:
-            timestamps = df["Date Time"]
-            start_time = df["Date Time"][0]
+            timestamps = df["Date Time"].values.astype(float)
+            start_time = timestamps[0]
             df['Date Time'] = pd.to_datetime(df['Date Time'], unit="s")
-            self.times = [(time - start_time) / 60 / 60 for time in timestamps]
-            self.temps = df["Mean Temperature (K)"]
-            first_temp = self.temps[0]
-            self.delta_temps = np.array([temp - first_temp for temp in self.temps])
+            self.times = (timestamps - start_time) / 60 / 60
+            self.temps = df["Mean Temperature (K)"].values.astype(float)
+            self.delta_temps = self.temps - self.temps[0]
 
             headers = df.columns.values.tolist()
             wave_headers = [head for head in headers if "Wave" in head]
             pow_headers = [head for head in headers if "Pow" in head]
-            for wave_head, pow_head in zip(wave_headers, pow_headers):
-                self.wavelengths.append(df[wave_head])
-                self.powers.append(df[pow_head])
-
-            self.delta_wavelengths_pm = np.array([np.array([(w - wave[0]) * 1000 for w in wave])
-                                                  for wave in self.wavelengths])
-            self.delta_powers = np.array([np.array([p - power[0] for p in power]) for power in self.powers])
-            self.mean_delta_wavelengths_pm = np.array(self.delta_wavelengths_pm[0])
-            self.mean_delta_powers = np.array(self.delta_powers[0])
-
-            for wave_diff, pow_diff in zip(self.delta_wavelengths_pm[1:], self.delta_powers[1:]):
-                self.mean_delta_wavelengths_pm += wave_diff
-                self.mean_delta_powers += pow_diff
-            self.mean_delta_wavelengths_pm /= len(fbg_names)
-            self.mean_delta_powers /= len(fbg_names)
-
-            self.delta_temps = list(self.delta_temps)
-            self.delta_wavelengths_pm = list(self.delta_wavelengths_pm)
-            self.delta_powers = list(self.delta_powers)
-            self.mean_delta_wavelengths_pm = list(self.mean_delta_wavelengths_pm)
-            self.mean_delta_powers = list(self.mean_delta_powers)
+            if not len(wave_headers):
+                raise IndexError("The table does not contain any fbg columns.")
+            self.wavelengths = df[wave_headers].values.T.astype(float)
+            self.powers = df[pow_headers].values.T.astype(float)
+
+            first_wavelengths = first_finite(self.wavelengths)
+            first_powers = first_finite(self.powers)
+            self.delta_wavelengths_pm = (self.wavelengths - first_wavelengths) * 1000
+            self.delta_powers = self.powers - first_powers
+            self.mean_delta_wavelengths_pm = mean_of_fbgs(self.delta_wavelengths_pm)
+            self.mean_delta_powers = mean_of_fbgs(self.delta_powers)
             if is_cal:
-                self.drift_rates = list(df['Drift Rate'])
+                self.drift_rates = df['Drift Rate'].values.astype(float)
+            if MIN_TEMPERATURE_HEADER in df:
+                self._add_ranges(df, [head[:-len(WAVELENGTH_SUFFIX)] for head in wave_headers], first_wavelengths,
+                                 first_powers)
         except (KeyError, IndexError) as e:
             if main_queue is not None:
                 main_queue.put(Message(MessageType.DEVELOPER, "File Helper Create Data Coll Error Dump", str(e)))
             raise RuntimeError("No data has been collected yet")
+
+    def _add_ranges(self, df: pd.DataFrame, fbg_names: List[str], first_wavelengths: np.ndarray,
+                    first_powers: np.ndarray):
+        """Sets the ranges of the rollup buckets from the range columns of the rollup rows, after the means."""
+        self.temp_ranges = df[[MIN_TEMPERATURE_HEADER, MAX_TEMPERATURE_HEADER]].values.astype(float)
+        self.delta_temp_ranges = self.temp_ranges - self.temps[0]
+        self.wavelength_ranges = np.stack([df[[MIN_WAVELENGTH_HEADER.format(fbg_name),
+                                               MAX_WAVELENGTH_HEADER.format(fbg_name)]].values.astype(float)
+                                           for fbg_name in fbg_names])
+        self.power_ranges = np.stack([df[[MIN_POWER_HEADER.format(fbg_name),
+                                          MAX_POWER_HEADER.format(fbg_name)]].values.astype(float)
+                                      for fbg_name in fbg_names])
+        self.delta_wavelength_ranges_pm = (self.wavelength_ranges - first_wavelengths[..., np.newaxis]) * 1000
+        self.delta_power_ranges = self.power_ranges - first_powers[..., np.newaxis]
+
+
+class DataCollectionBuffer(object):
+    """
+    Incrementally built data collection, new database rows are appended to preallocated numpy buffers that double
+    in size when full, so each update costs time proportional to the number of new rows.
+
+    Snapshots are views of the filled part of the buffers, rows are only ever written past the end of a snapshot,
+    so a published snapshot never changes.
+
+    :ivar bool is_cal: True if the rows are from a calibration program table
+    :ivar int last_id: ID of the last row appended, 0 if no rows have been appended
+    :ivar int size: number of rows appended
+    :ivar Dict[str, np.ndarray] buffers: DataCollection attribute name mapped to its buffer, the last axis of
+                                         every buffer is the row axis
+    """
+
+    #: Attributes stored as 1D buffers of shape (capacity,)
+    ROW_ATTRIBUTES = ["times", "temps", "delta_temps", "mean_delta_wavelengths_pm", "mean_delta_powers", "drift_rates"]
+    #: Attributes stored as 2D buffers of shape (fbgs, capacity)
+    FBG_ATTRIBUTES = ["wavelengths", "delta_wavelengths_pm", "powers", "delta_powers"]
+
+    def __init__(self, is_cal: bool, capacity: int=1024):
+        """
+        Creates an empty buffer.
+
+        :param is_cal: True if the rows are from a calibration program table
+        :param capacity: number of rows to preallocate
+        """
+        self.is_cal = is_cal
+        self.capacity = capacity
+        self.last_id = 0
+        self.size = 0
+        self.buffers = {}  # type: Dict[str, np.ndarray]
+        self.start_time = 0.
+        self.first_temp = 0.
+        self.first_wavelengths = None  # type: np.ndarray
+        self.first_powers = None  # type: np.ndarray
+
+    def append(self, df: pd.DataFrame):
+        """
+        Appends new rows of the program table to the buffers.
+
+        :param df: new rows of the program table, including the ID column, ordered by ID
+        :raises KeyError: If the data frame is missing one of the program table columns
+        """
+        if not len(df):
+            return
+        headers = df.columns.values.tolist()
+        wavelengths = df[[head for head in headers if "Wave" in head]].values.T.astype(float)
+        powers = df[[head for head in headers if "Pow" in head]].values.T.astype(float)
+        timestamps = df["Date Time"].values.astype(float)
+        temps = df["Mean Temperature (K)"].values.astype(float)
+        if not self.size:
+            self._allocate(len(wavelengths))
+            self.start_time = timestamps[0]
+            self.first_temp = temps[0]
+            self.first_wavelengths = first_finite(wavelengths)
+            self.first_powers = first_finite(powers)
+        else:
+            self.first_wavelengths = np.where(np.isnan(self.first_wavelengths), first_finite(wavelengths),
+                                              self.first_wavelengths)
+            self.first_powers = np.where(np.isnan(self.first_powers), first_finite(powers), self.first_powers)
+
+        self._reserve(self.size + len(df))
+        rows = slice(self.size, self.size + len(df))
+        delta_wavelengths_pm = (wavelengths - self.first_wavelengths) * 1000
+        delta_powers = powers - self.first_powers
+        self.buffers["times"][rows] = (timestamps - self.start_time) / 60 / 60
+        self.buffers["temps"][rows] = temps
+        self.buffers["delta_temps"][rows] = temps - self.first_temp
+        self.buffers["wavelengths"][:, rows] = wavelengths
+        self.buffers["powers"][:, rows] = powers
+        self.buffers["delta_wavelengths_pm"][:, rows] = delta_wavelengths_pm
+        self.buffers["delta_powers"][:, rows] = delta_powers
+        self.buffers["mean_delta_wavelengths_pm"][rows] = mean_of_fbgs(delta_wavelengths_pm)
+        self.buffers["mean_delta_powers"][rows] = mean_of_fbgs(delta_powers)
+        if self.is_cal:
+            self.buffers["drift_rates"][rows] = df["Drift Rate"].values.astype(float)
+        self.size += len(df)
+        self.last_id = int(df["ID"].values[-1])
+
+    def snapshot(self) -> DataCollection:
+        """
+        Creates a data collection of all of the rows appended so far, without copying the buffers.
+
+        :returns: data collection containing the appended rows
+        :raises RuntimeError: If no rows have been appended yet
+        """
+        if not self.size:
+            raise RuntimeError("No data has been collected yet")
+        data_collection = DataCollection()
+        for name, buffer in self.buffers.items():
+            setattr(data_collection, name, buffer[..., :self.size])
+        if not self.is_cal:
+            data_collection.drift_rates = []
+        return data_collection
+
+    def _allocate(self, number_of_fbgs: int):
+        for name in DataCollectionBuffer.ROW_ATTRIBUTES:
+            self.buffers[name] = np.empty(self.capacity)
+        for name in DataCollectionBuffer.FBG_ATTRIBUTES:
+            self.buffers[name] = np.empty((number_of_fbgs, self.capacity))
+
+    def _reserve(self, size: int):
+        if size <= self.capacity:
+            return
+        while self.capacity < size:
+            self.capacity *= 2
+        for name, buffer in self.buffers.items():
+            new_buffer = np.empty(buffer.shape[:-1] + (self.capacity,))
+            new_buffer[..., :self.size] = buffer[..., :self.size]
+            self.buffers[name] = new_buffer
@@ -1,15 +1,91 @@
+import collections
+import functools
 import queue
 import sqlite3
-from typing import List
+from typing import List, Tuple, Dict, Optional, Iterator, Sequence, Callable
 
+import numpy as np
 import pandas as pd
 
 from fbgui import helpers
-from fbgui.constants import DB_PATH, CAL, BAKING, CREATE_MAP_TABLE
+from fbgui.constants import DB_PATH, CAL, BAKING, CREATE_MAP_TABLE, CREATE_READINGS_SCHEMA, DATE_TIME_HEADER, \
+    TEMPERATURE_HEADER, REAL_POINT_HEADER, CYCLE_HEADER, ROLLUP_RESOLUTIONS, MIN_TEMPERATURE_HEADER, \
+    MAX_TEMPERATURE_HEADER, MIN_WAVELENGTH_HEADER, MAX_WAVELENGTH_HEADER, MIN_POWER_HEADER, MAX_POWER_HEADER, \
+    STATEMENT_CACHE_SIZE
+from fbgui.database_writer import get_writer, DatabaseWriter, LAST_ROW_ID
 from fbgui.datatable import DataTable
 from fbgui.exceptions import ProgramStopped
 from fbgui.messages import *
-
+from fbgui.sql import reader, in_statement, validate_table_name
+from fbgui.timing import timed
+
+INSERT_POINT = "INSERT INTO points(run_id, ts, temperature, drift_rate, real_point, cycle_num) VALUES (?,?,?,?,?,?)"
+#: Readings are queued right after their point, with LAST_ROW_ID as the point_id parameter
+INSERT_READING = "INSERT INTO readings(run_id, ts, fbg_id, wavelength, power, std_dev, dropouts, point_id) " \
+                 "VALUES (?,?,?,?,?,?,?,?)"
+
+#: Tables holding the recorded data of the runs, keyed by run_id
+RUN_TABLES = ("readings", "points", "fbgs", "point_rollups", "reading_rollups")
+
+#: Per fbg values stored in the readings table
+READING_COLUMNS = ("wavelength", "power", "std_dev", "dropouts")
+
+#: Points of a run recorded after an ID
+SELECT_POINTS = "SELECT ID, ts, temperature, drift_rate, real_point, cycle_num FROM points " \
+                "WHERE run_id = ? AND ID > ? ORDER BY ID"
+
+#: At most a chunk of the points of a run recorded after an ID
+SELECT_POINTS_CHUNK = SELECT_POINTS + " LIMIT ?"
+
+#: Readings of the points of a run between two IDs pivoted to one row per point, formatted with the selected
+#: columns, and one READING_JOIN per fbg, the fbg id parameters come first, the group by skips duplicate readings
+SELECT_JOINED_READINGS = "SELECT {} FROM points p {} WHERE p.run_id = ? AND p.ID > ? AND p.ID <= ? " \
+                         "GROUP BY p.ID ORDER BY p.ID"
+READING_JOIN = "LEFT JOIN readings r{0} ON r{0}.run_id = p.run_id AND r{0}.point_id = p.ID AND r{0}.fbg_id = ?"
+#: Most fbgs joined in one query, sqlite joins at most 64 tables
+MAX_JOINED_FBGS = 32
+
+#: Rebuilds the finest rollup buckets of a run's points, and readings recorded in a time range from the points, and
+#: readings tables
+BUILD_POINT_ROLLUPS = "INSERT OR REPLACE INTO point_rollups(run_id, resolution, bucket, count, ts_sum, " \
+                      "temperature_sum, temperature_min, temperature_max) SELECT run_id, ?, " \
+                      "CAST(ts / ? AS INTEGER) * ?, COUNT(*), SUM(ts), SUM(temperature), MIN(temperature), " \
+                      "MAX(temperature) FROM points WHERE run_id = ? AND ts >= ? AND ts < ? " \
+                      "GROUP BY CAST(ts / ? AS INTEGER)"
+BUILD_READING_ROLLUPS = "INSERT OR REPLACE INTO reading_rollups(run_id, resolution, bucket, fbg_id, count, " \
+                        "wavelength_sum, wavelength_min, wavelength_max, power_sum, power_min, power_max) " \
+                        "SELECT run_id, ?, CAST(ts / ? AS INTEGER) * ?, fbg_id, COUNT(*), SUM(wavelength), " \
+                        "MIN(wavelength), MAX(wavelength), SUM(power), MIN(power), MAX(power) FROM readings " \
+                        "WHERE run_id = ? AND ts >= ? AND ts < ? GROUP BY CAST(ts / ? AS INTEGER), fbg_id"
+#: Rebuilds the coarser rollup buckets of a time range by merging the buckets of the next finer rollup, a coarse
+#: bucket is rebuilt from all of its finer buckets, so the minimum of their minimums is the bucket's minimum
+MERGE_POINT_ROLLUPS = "INSERT OR REPLACE INTO point_rollups(run_id, resolution, bucket, count, ts_sum, " \
+                      "temperature_sum, temperature_min, temperature_max) SELECT run_id, ?, " \
+                      "CAST(bucket / ? AS INTEGER) * ?, SUM(count), SUM(ts_sum), SUM(temperature_sum), " \
+                      "MIN(temperature_min), MAX(temperature_max) FROM point_rollups WHERE run_id = ? " \
+                      "AND resolution = ? AND bucket >= ? AND bucket < ? GROUP BY CAST(bucket / ? AS INTEGER)"
+MERGE_READING_ROLLUPS = "INSERT OR REPLACE INTO reading_rollups(run_id, resolution, bucket, fbg_id, count, " \
+                        "wavelength_sum, wavelength_min, wavelength_max, power_sum, power_min, power_max) " \
+                        "SELECT run_id, ?, CAST(bucket / ? AS INTEGER) * ?, fbg_id, SUM(count), " \
+                        "SUM(wavelength_sum), MIN(wavelength_min), MAX(wavelength_max), SUM(power_sum), " \
+                        "MIN(power_min), MAX(power_max) FROM reading_rollups WHERE run_id = ? AND resolution = ? " \
+                        "AND bucket >= ? AND bucket < ? GROUP BY CAST(bucket / ? AS INTEGER), fbg_id"
+#: Start of the last finest rollup bucket of a run, the bucket may have been built before all of its points were
+SELECT_LAST_ROLLUP = "SELECT MAX(bucket) FROM point_rollups WHERE run_id = ? AND resolution = ?"
+
+#: Mean, minimum, and maximum of each bucket of a run's rollup, the means in the same columns as SELECT_POINTS, and
+#: READING_COLUMNS
+SELECT_POINT_ROLLUPS = "SELECT bucket AS ID, ts_sum / count AS ts, temperature_sum / count AS temperature, " \
+                       "NULL AS drift_rate, NULL AS real_point, NULL AS cycle_num, temperature_min, temperature_max " \
+                       "FROM point_rollups WHERE run_id = ? AND resolution = ? ORDER BY bucket"
+SELECT_READING_ROLLUPS = "SELECT bucket AS point_id, fbg_id, wavelength_sum / count AS wavelength, " \
+                         "power_sum / count AS power, NULL AS std_dev, NULL AS dropouts, wavelength_min, " \
+                         "wavelength_max, power_min, power_max FROM reading_rollups " \
+                         "WHERE run_id = ? AND resolution = ? AND fbg_id IN ({})"
+
+#: Range columns of the rollup readings, and the headers of their columns in the rollup dataframes
+READING_RANGE_COLUMNS = (("wavelength_min", MIN_WAVELENGTH_HEADER), ("wavelength_max", MAX_WAVELENGTH_HEADER),
+                         ("power_min", MIN_POWER_HEADER), ("power_max", MAX_POWER_HEADER))
 
 class DatabaseController:
     def __init__(self, file_path: str, fbg_names: List[str], main_queue: queue.Queue,
@@ -25,6 +101,11 @@ class DatabaseController:
         self.fbg_names = None  # type: List[str]
         self.column_names = None  # type: List[str]
         self.extra_point_temperatures = None  # type: List[str]
+        self.table_id = None  # type: int
+        self.fbg_ids = None  # type: List[int]
+        self.rollup_start = None  # type: Optional[float]
+        self.last_timestamp = None  # type: Optional[float]
+        self.revision = 0
         self.reset_controller(file_path, fbg_names, bake_sensitivity, extra_point_temperatures)
 
     def reset_controller(self, file_path: str, fbg_names: List[str], bake_sensitivity: List[float]=None,
@@ -33,11 +114,17 @@ class DatabaseController:
         self.file_name = helpers.get_file_name(self.file_path)
         self.fbg_names = fbg_names
         self.extra_point_temperatures = extra_point_temperatures
+        self.table_id = None
+        self.fbg_ids = None
+        self.rollup_start = None
+        self.last_timestamp = None
+        self.revision += 1
         if self.function_type == BAKING:
             self.bake_sensitivity = bake_sensitivity
         self.column_names = create_column_names(fbg_names)
         if self.function_type == CAL:
             add_calibration_column_names(self.column_names)
+        add_statistics_column_names(self.column_names, fbg_names)
         table_column_names = [s.replace("'", "") for s in self.column_names]
         if self.table is not None:
             self.table.setup_headers(table_column_names, reset=True)
@@ -47,73 +134,155 @@ class DatabaseController:
         return DatabaseController(file_path, fbg_names, self.main_queue, self.function_type,
                                   self.table, self.excel_table, bake_sensitivity, extra_point_temperatures)
 
-    def record_baking_point(self, timestamp: float, temperature: float, wavelengths: List[float], powers: List[float]):
-        column_command_string = ",".join(self.create_database_column_commands())
+    def record_baking_point(self, timestamp: float, temperature: float, wavelengths: List[float], powers: List[float],
+                            wavelength_deviations: List[float]=None, dropouts: List[int]=None):
         readable_time = datetime.datetime.fromtimestamp(int(timestamp)).strftime("%d/%m/%y %H:%M")
         wavelength_power = create_wavelength_power_list(wavelengths, powers)
-        values = [readable_time, *wavelength_power, temperature]
-        self.record_point(column_command_string, values, timestamp)
+        statistics = self.create_statistics_list(wavelength_deviations, dropouts)
+        values = [readable_time, *wavelength_power, temperature, *statistics]
+        readings = create_readings(wavelengths, powers, statistics)
+        self.record_point(values, timestamp, [temperature, None, None, None], readings)
 
     def record_calibration_point(self, timestamp: float, temperature: float, wavelengths: List[float],
                                  powers: List[float], drift_rate: float,
-                                 is_real_calibration_point: bool, cycle_num: int):
-        column_commands = self.create_database_column_commands()
-        add_calibration_commands(column_commands)
-        column_command_string = ",".join(column_commands)
+                                 is_real_calibration_point: bool, cycle_num: int,
+                                 wavelength_deviations: List[float]=None, dropouts: List[int]=None):
         readable_time = datetime.datetime.fromtimestamp(int(timestamp)).strftime("%d/%m/%y %H:%M")
         wavelength_power = create_wavelength_power_list(wavelengths, powers)
+        statistics = self.create_statistics_list(wavelength_deviations, dropouts)
         values = [readable_time, *wavelength_power, temperature, drift_rate,
-                  "'{}'".format(is_real_calibration_point), cycle_num]
-        self.record_point(column_command_string, values, timestamp)
+                  str(is_real_calibration_point), cycle_num, *statistics]
+        readings = create_readings(wavelengths, powers, statistics)
+        self.record_point(values, timestamp, [temperature, drift_rate, int(is_real_calibration_point), cycle_num],
+                          readings)
 
-    def record_point(self, column_command_string: str, values: List, timestamp: float):
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
+    def create_statistics_list(self, wavelength_deviations: List[float]=None, dropouts: List[int]=None) -> List:
+        """
+        Interleaves the scan statistics of each fbg in the order of the statistics columns, points recorded without
+        statistics, such as manually entered extra points, are recorded with 0s.
 
-        if not self.program_exists(cursor):
-            self.create_program_table(cursor, column_command_string)
+        :param wavelength_deviations: standard deviation of each fbg's wavelength in pm.
+        :param dropouts: number of scans each fbg's peak was missing from
+        :return: list of alternating wavelength deviations, and dropouts
+        """
+        if wavelength_deviations is None:
+            wavelength_deviations = [0.] * len(self.fbg_names)
+        if dropouts is None:
+            dropouts = [0] * len(self.fbg_names)
+        statistics = []
+        for deviation, dropout_count in zip(wavelength_deviations, dropouts):
+            statistics.append(deviation)
+            statistics.append(dropout_count)
+        return statistics
+
+    @timed("database.record_point")
+    def record_point(self, values: List, timestamp: float, point_values: List, readings: List[Tuple]):
+        """
+        Adds the point to the live table, and queues the point's row, and one reading row per fbg to be written
+        together. For baking runs the rollup buckets are rebuilt once per finest bucket, with the first point
+        recorded after the bucket ends.
+
+        :param values: values of the live table's columns
+        :param timestamp: time the point was recorded at
+        :param point_values: temperature, drift rate, real point, and cycle number of the point, None for baking
+        :param readings: wavelength, power, wavelength standard deviation, and dropouts of each fbg
+        """
+        writer = get_writer()
+        try:
+            if self.fbg_ids is None:
+                with writer.cursor() as cursor:
+                    self.open_program(cursor)
+        except sqlite3.OperationalError as sql_error:
+            self.handle_sql_error(sql_error)
+            return
 
-        table_id = self.get_table_id(cursor)
         if self.table is not None:
             self.table.add_data(values)
         if self.excel_table is not None:
-            self.excel_table.current_table_id = table_id
-        values[0] = timestamp
-        values = ",".join([str(value) for value in values])
-        add_baking_command = "INSERT INTO {}({}) VALUES ({})".format(self.function_type.lower() + str(table_id),
-                                                                     ",".join(self.column_names), values)
+            self.excel_table.current_table_id = self.table_id
+        rows = [(INSERT_POINT, [self.table_id, timestamp, *point_values])]
+        rows.extend((INSERT_READING, [self.table_id, timestamp, fbg_id, *reading, LAST_ROW_ID])
+                    for fbg_id, reading in zip(self.fbg_ids, readings))
+        if self.function_type == BAKING:
+            self.last_timestamp = timestamp
+            bucket = get_bucket(timestamp, ROLLUP_RESOLUTIONS[0])
+            if self.rollup_start is None:
+                self.rollup_start = bucket
+            elif bucket > self.rollup_start:
+                rows.extend(create_rollup_rows(self.table_id, self.rollup_start, bucket))
+                self.rollup_start = bucket
         try:
-            cursor.execute(add_baking_command)
-            connection.commit()
+            writer.write_many(rows)
         except sqlite3.OperationalError as sql_error:
             self.handle_sql_error(sql_error)
-        connection.close()
 
-    def create_database_column_commands(self) -> List[str]:
+    def open_program(self, cursor: sqlite3.Cursor):
         """
-        Returns a list of strings used for creating the database attribute values, includes names and SQL types.
+        Adds the program to the map if it does not exist, and caches the run's table id, and the ids of the fbgs.
+        Fbgs that were not part of the previous runs of the program are added, so the fbgs can change between runs.
 
-        :return: list of comma separated strings, names and types of table attributes
+        :param cursor: cursor of the database writer's connection
         """
-        fbg_columns = []
-        for fbg_name in self.fbg_names:
-            fbg_columns.append("'{} Wavelength (nm.)' REAl NOT NULL".format(fbg_name))
-            fbg_columns.append("'{} Power (dBm.)' REAL NOT NULL".format(fbg_name))
-        col_list = ["ID INTEGER NOT NULL PRIMARY KEY", "'Date Time' REAL NOT NULL",
-                    *fbg_columns, "'Mean Temperature (K)' REAL NOT NULL"]
-        return col_list
-
-    def create_program_table(self, cursor: sqlite3.Cursor, columns: str):
-        try:
-            self.add_entry_to_map(cursor)
-        except sqlite3.OperationalError:
-            cursor.execute(CREATE_MAP_TABLE)
-            self.add_entry_to_map(cursor)
+        for command in CREATE_READINGS_SCHEMA:
+            cursor.execute(command)
+        if not self.program_exists(cursor):
+            try:
+                self.add_entry_to_map(cursor)
+            except sqlite3.OperationalError:
+                cursor.execute(CREATE_MAP_TABLE)
+                self.add_entry_to_map(cursor)
         table_id = self.get_table_id(cursor)
-        cursor.execute("CREATE TABLE `{}` ({});".format(self.function_type.lower() + str(table_id), columns))
+        cursor.execute("UPDATE map SET Snums = ? WHERE ID = ?;", (",".join(self.fbg_names), table_id))
+        self.table_id = table_id
+        if self.function_type == BAKING:
+            cursor.execute(SELECT_LAST_ROLLUP, (table_id, ROLLUP_RESOLUTIONS[0]))
+            self.rollup_start = cursor.fetchall()[0][0]
+        self.fbg_ids = add_fbgs(cursor, table_id, self.fbg_names)
+
+    def flush(self):
+        """
+        Commits all of the recorded points that are waiting to be written to the database, for baking runs the
+        rollup buckets of the points recorded since the last finished bucket are rebuilt first, so the rollups
+        include the last points.
+        """
+        try:
+            writer = get_writer()
+            self.queue_rollups(writer)
+            writer.flush()
+        except sqlite3.OperationalError as sql_error:
+            self.log_flush_error(sql_error)
+
+    def request_flush(self, done: Callable[[], None]=None):
+        """
+        Like flush, but the commit runs on the database writer's thread, so the Tk thread is not blocked on the
+        commit, and the rollup rebuild. Errors are logged to the main queue.
+
+        :param done: called on the writer's thread after the flush, whether or not the points were committed
+        """
+        def flushed(sql_error: Optional[sqlite3.OperationalError]):
+            if sql_error is not None:
+                self.log_flush_error(sql_error)
+            if done is not None:
+                done()
+
+        writer = get_writer()
+        try:
+            self.queue_rollups(writer)
+        except sqlite3.OperationalError as sql_error:
+            self.log_flush_error(sql_error)
+        writer.request_flush(flushed)
+
+    def queue_rollups(self, writer: DatabaseWriter):
+        """Queues the rebuild of the rollup buckets up to the end of the bucket of the last point, for baking runs."""
+        if self.rollup_start is not None and self.last_timestamp is not None:
+            end = get_bucket(self.last_timestamp, ROLLUP_RESOLUTIONS[0]) + ROLLUP_RESOLUTIONS[0]
+            writer.write_many(create_rollup_rows(self.table_id, self.rollup_start, end))
+
+    def log_flush_error(self, sql_error: sqlite3.OperationalError):
+        self.main_queue.put(Message(MessageType.DEVELOPER, "Flush DB sqlite3 Error Dump", str(sql_error)))
 
     def get_table_id(self, cursor):
-        cursor.execute("SELECT ID FROM map WHERE ProgName = '{}';".format(self.file_name))
+        cursor.execute("SELECT ID FROM map WHERE ProgName = ?;", (self.file_name,))
         return cursor.fetchall()[0][0]
 
     def add_entry_to_map(self, cursor: sqlite3.Cursor):
@@ -136,27 +305,27 @@ class DatabaseController:
         if self.bake_sensitivity is not None:
             sensitivity = ",".join(str(x) for x in self.bake_sensitivity)
 
-        columns = "'ProgName','ProgType','FilePath','Snums'"
-        values = "'{}','{}','{}','{}'" \
-                 .format(self.file_name, self.function_type.lower(), self.file_path, ",".join(self.fbg_names))
+        columns = ["ProgName", "ProgType", "FilePath", "Snums"]
+        values = [self.file_name, self.function_type.lower(), self.file_path, ",".join(self.fbg_names)]
 
         if sensitivity is not None:
-            columns += ", 'BakeSensitivity'"
-            values += ",'{}'".format(sensitivity)
+            columns.append("BakeSensitivity")
+            values.append(sensitivity)
         if extra_point1 is not None:
-            columns += ", 'ExtraPoint1Temperature'"
-            values += ",'{}'".format(extra_point1)
+            columns.append("ExtraPoint1Temperature")
+            values.append(extra_point1)
         if extra_point2 is not None:
-            columns += ", 'ExtraPoint2Temperature'"
-            values += ",'{}'".format(extra_point2)
-        cursor.execute("INSERT INTO map({}) VALUES ({})".format(columns, values))
+            columns.append("ExtraPoint2Temperature")
+            values.append(extra_point2)
+        cursor.execute("INSERT INTO map({}) VALUES ({})".format(",".join(columns), ",".join("?" * len(values))),
+                       values)
 
     def handle_sql_error(self, sql_error: sqlite3.OperationalError):
         try:
-            msg = Message(MessageType.ERROR, "Configuration Error",
-                          "Fbg names have changed from the first time this program was run. Please "
-                          "use a new file name.")
+            msg = Message(MessageType.ERROR, "Database Error",
+                          "The program data could not be written to the database, check the database file.")
             self.main_queue.put(msg)
+            self.main_queue.put(Message(MessageType.DEVELOPER, "Write DB sqlite3 Error Dump", str(sql_error)))
             raise ProgramStopped
         except TypeError as type_error:
             self.main_queue.put(Message(MessageType.DEVELOPER, "Write DB sqlite3 Error Dump", str(sql_error)))
@@ -174,103 +343,174 @@ class DatabaseController:
         return cycle_nums[-1]
 
     def get_cycle_nums(self) -> List[int]:
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
-        try:
-            table_id = self.get_table_id(cursor)
-        except (sqlite3.OperationalError, IndexError):
-            connection.close()
-            return []
-        table_name = self.function_type.lower() + str(table_id)
-        cursor.execute("SELECT {}.'Cycle Num' FROM {};".format(table_name, table_name))
-        cycle_nums = cursor.fetchall()
-        connection.close()
+        with reader(DB_PATH) as connection:
+            cursor = connection.cursor()
+            try:
+                table_id = self.get_table_id(cursor)
+                cursor.execute("SELECT cycle_num FROM points WHERE run_id = ? ORDER BY ID;", (table_id,))
+                cycle_nums = cursor.fetchall()
+            except (sqlite3.OperationalError, IndexError):
+                return []
         return [int(cycle_num[0]) for cycle_num in cycle_nums]
 
-    def to_data_frame(self) -> pd.DataFrame:
+    def to_data_frame(self, number_of_points: int=None) -> pd.DataFrame:
         """
-        Creates a pandas dataframe object from the database table corresponding to the program run of type
-        func, and named name.
+        Creates a pandas dataframe object from the points, and readings recorded for the program run of type
+        func, and named name, with a wavelength, and power column for each of the program's current fbgs.
 
-        :return: dataframe for the specified table, or an empty dataframe if one cannot be created for the table
+        :param number_of_points: if given, the means of the coarsest rollup with at least this many buckets over
+                                 the run are used instead of the raw points, if there is one
+        :return: dataframe for the specified run, or an empty dataframe if one cannot be created for the run
         :raises IndexError: If program is not in the map, thus data has not been recorded for this program yet
-        :raises RuntimeError: If program database has been corrupted, or the table is empty
         """
-        connection = None
-        try:
-            connection = sqlite3.connect(DB_PATH)
-            cursor = connection.cursor()
-            table_id = self.get_table_id(cursor)
-            df = pd.read_sql_query("SELECT * from {}".format(self.function_type.lower() + str(table_id)), connection)
+        resolution = None
+        if number_of_points is not None:
+            resolution = self.get_rollup_resolution(number_of_points)
+        if resolution is not None:
+            df = self.get_rollup_rows(resolution)
+        else:
+            df = self.get_new_rows(0)
+        if "ID" in df:
             del df["ID"]
-            connection.close()
-            return df
-        except (pd.io.sql.DatabaseError, sqlite3.OperationalError):
-            if connection is not None:
-                connection.close()
-            return pd.DataFrame()
-        except (RuntimeError, IndexError) as e:
-            if connection is not None:
-                connection.close()
-            raise e
+        return df
+
+    def get_new_rows(self, last_id: int) -> pd.DataFrame:
+        """
+        Creates a pandas dataframe of the points of the program run recorded after the point with ID last_id.
+
+        :param last_id: ID of the last point already read, 0 to read the whole run
+        :return: dataframe of the new rows including the ID column ordered by ID, or an empty dataframe if one
+                 cannot be created for the run
+        :raises IndexError: If program is not in the map, thus data has not been recorded for this program yet
+        """
+        with reader(DB_PATH) as connection:
+            try:
+                cursor = connection.cursor()
+                table_id = self.get_table_id(cursor)
+                fbg_ids = get_fbg_ids(cursor, table_id, self.fbg_names)
+                cursor.execute("BEGIN")
+                points = pd.read_sql_query(SELECT_POINTS, connection, params=(table_id, last_id))
+                reading_column = read_joined_readings(cursor, table_id, list(fbg_ids.values()), points, last_id)
+                return create_wide_data_frame(points, reading_column, fbg_ids, self.function_type == CAL)
+            except (pd.io.sql.DatabaseError, sqlite3.OperationalError):
+                return pd.DataFrame()
+
+    def iter_data_frames(self, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Reads the points of the program run in order, chunk_size points at a time, so a long run can be exported
+        without holding all of it in memory. All of the chunks are read in one read transaction.
+
+        :param chunk_size: maximum number of points in each dataframe
+        :return: dataframes with the columns of to_data_frame
+        :raises IndexError: If program is not in the map, thus data has not been recorded for this program yet
+        """
+        with reader(DB_PATH) as connection:
+            try:
+                cursor = connection.cursor()
+                table_id = self.get_table_id(cursor)
+                fbg_ids = get_fbg_ids(cursor, table_id, self.fbg_names)
+                cursor.execute("BEGIN")
+                last_id = 0
+                while True:
+                    points = pd.read_sql_query(SELECT_POINTS_CHUNK, connection,
+                                               params=(table_id, last_id, chunk_size))
+                    if not len(points.index):
+                        return
+                    reading_column = read_joined_readings(cursor, table_id, list(fbg_ids.values()), points, last_id)
+                    last_id = int(points["ID"].values[-1])
+                    df = create_wide_data_frame(points, reading_column, fbg_ids, self.function_type == CAL)
+                    del df["ID"]
+                    yield df
+            except (pd.io.sql.DatabaseError, sqlite3.OperationalError):
+                return
+
+    def get_rollup_resolution(self, number_of_points: int) -> Optional[int]:
+        """
+        Returns the coarsest rollup resolution that still has at least number_of_points buckets over the run's time
+        range, rollups are only kept for baking runs.
+
+        :param number_of_points: minimum number of buckets
+        :return: resolution in seconds, or None if the raw points should be used
+        :raises IndexError: If program is not in the map, thus data has not been recorded for this program yet
+        """
+        if self.function_type != BAKING:
+            return None
+        with reader(DB_PATH) as connection:
+            try:
+                cursor = connection.cursor()
+                table_id = self.get_table_id(cursor)
+                cursor.execute("SELECT ts FROM points WHERE run_id = ? ORDER BY ID LIMIT 1;", (table_id,))
+                first = cursor.fetchall()
+                cursor.execute("SELECT ts FROM points WHERE run_id = ? ORDER BY ID DESC LIMIT 1;", (table_id,))
+                last = cursor.fetchall()
+            except sqlite3.OperationalError:
+                return None
+        if not first:
+            return None
+        return select_rollup_resolution(last[0][0] - first[0][0], number_of_points)
+
+    def get_rollup_rows(self, resolution: int) -> pd.DataFrame:
+        """
+        Creates a pandas dataframe of the means of the run's rollup buckets, in the same columns as get_new_rows,
+        followed by the minimum, and maximum temperature, and each fbg's minimum, and maximum wavelength, and power in
+        the bucket. The ID column holds the start time of the bucket, and the statistics columns are NaN.
+
+        :param resolution: bucket size in seconds of the rollup
+        :return: dataframe with a row per bucket ordered by time, or an empty dataframe if one cannot be created
+        :raises IndexError: If program is not in the map, thus data has not been recorded for this program yet
+        """
+        with reader(DB_PATH) as connection:
+            try:
+                cursor = connection.cursor()
+                table_id = self.get_table_id(cursor)
+                fbg_ids = get_fbg_ids(cursor, table_id, self.fbg_names)
+                cursor.execute("BEGIN")
+                points = pd.read_sql_query(SELECT_POINT_ROLLUPS, connection, params=(table_id, resolution))
+                readings = pd.read_sql_query(in_statement(SELECT_READING_ROLLUPS, len(fbg_ids)), connection,
+                                             params=(table_id, resolution, *fbg_ids.values()))
+                df = create_wide_data_frame(points, pivot_readings(points, readings, READING_COLUMNS), fbg_ids, False)
+                add_range_columns(df, points, readings, fbg_ids)
+                return df
+            except (pd.io.sql.DatabaseError, sqlite3.OperationalError):
+                return pd.DataFrame()
 
     def program_exists(self, cursor: sqlite3.Cursor = None) -> bool:
         """
         Checks whether or not there is data in the database for the program of type func, named name.
 
-        :param cursor: the database cursor
+        :param cursor: the database cursor, if None the calling thread's reader connection is used
         :return: True if the program exists, otherwise False
         """
-        connection = None
         if cursor is None:
-            connection = sqlite3.connect(DB_PATH)
-            cursor = connection.cursor()
+            with reader(DB_PATH) as connection:
+                return self.program_exists(connection.cursor())
         try:
-            cursor.execute("SELECT ID, ProgName, ProgType from map")
+            cursor.execute("SELECT ProgType FROM map WHERE ProgName = ? ORDER BY ID LIMIT 1;", (self.file_name,))
             rows = cursor.fetchall()
         except sqlite3.OperationalError:
-            if connection is not None:
-                connection.close()
-            return False
-
-        if connection is not None:
-            connection.close()
-
-        names = [row[1] for row in rows]
-        types = [row[2] for row in rows]
-        try:
-            index = names.index(self.file_name)
-            if types[index] == self.function_type.lower():
-                return True
-        except ValueError:
             return False
+        return len(rows) > 0 and rows[0][0] == self.function_type.lower()
 
     def get_fbg_list(self) -> List[str]:
-        try:
-            connection = sqlite3.connect(DB_PATH)
+        with reader(DB_PATH) as connection:
             cursor = connection.cursor()
             try:
                 table_id = self.get_table_id(cursor)
-            except IndexError:
+                cursor.execute("SELECT Snums FROM map WHERE ID = ?;", (table_id,))
+                fbg_names = cursor.fetchall()[0][0]
+            except (sqlite3.OperationalError, IndexError):
                 return []
-            cursor.execute("SELECT ID, Snums from map")
-            rows = cursor.fetchall()
-            id_to_fbg_names = {row[0]: row[1] for row in rows}
-            fbg_names = id_to_fbg_names[table_id]
-            connection.close()
-            return fbg_names.split(",")
-        except sqlite3.OperationalError:
-            return []
+        return fbg_names.split(",")
 
     def delete_partial_cycles(self, partial_cycle_nums: List[int]):
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
-        for cycle_num in partial_cycle_nums:
-            cursor.execute("DELETE FROM {}{} WHERE `Cycle Num` = {};".format(self.function_type.lower(),
-                                                                             self.get_table_id(cursor),
-                                                                             cycle_num))
-        connection.commit()
-        connection.close()
+        self.revision += 1
+        with get_writer().cursor() as cursor:
+            table_id = self.get_table_id(cursor)
+            for cycle_num in partial_cycle_nums:
+                cursor.execute("DELETE FROM readings WHERE run_id = ? AND point_id IN "
+                               "(SELECT ID FROM points WHERE run_id = ? AND cycle_num = ?);",
+                               (table_id, table_id, cycle_num))
+                cursor.execute("DELETE FROM points WHERE run_id = ? AND cycle_num = ?;", (table_id, cycle_num))
 
 
 def create_wavelength_power_list(wavelengths: List[float], powers: List[float]):
@@ -281,10 +521,202 @@ def create_wavelength_power_list(wavelengths: List[float], powers: List[float]):
     return wavelength_power
 
 
-def add_calibration_commands(columns: List[str]):
-    columns.append("'Drift Rate' REAL NOT NULL")
-    columns.append("'Real Point' INTEGER NOT NULL")
-    columns.append("'Cycle Num' INTEGER NOT NULL")
+def get_bucket(timestamp: float, resolution: int) -> float:
+    """
+    Returns the start time of the rollup bucket the timestamp falls in.
+
+    :param timestamp: seconds since the epoch
+    :param resolution: bucket size in seconds
+    """
+    return float(int(timestamp // resolution) * resolution)
+
+
+def create_rollup_rows(run_id: int, start: float, end: float) -> List[Tuple]:
+    """
+    Creates the statements rebuilding the rollup buckets of a run's points recorded from the start time, up to the
+    end time. The finest buckets are built from the points, and readings, and each coarser rollup from the one
+    before it, so the coarse buckets that only partly overlap the time range are rebuilt whole.
+
+    :param run_id: map ID of the run
+    :param start: start of the time range, at the start of a finest bucket
+    :param end: end of the time range, at the start of a finest bucket, the buckets from it on are not rebuilt
+    :return: (statement, parameters) pairs, to be executed in order
+    """
+    finest = ROLLUP_RESOLUTIONS[0]
+    rows = [(BUILD_POINT_ROLLUPS, [finest, finest, finest, run_id, start, end, finest]),
+            (BUILD_READING_ROLLUPS, [finest, finest, finest, run_id, start, end, finest])]
+    for finer, resolution in zip(ROLLUP_RESOLUTIONS, ROLLUP_RESOLUTIONS[1:]):
+        parameters = [resolution, resolution, resolution, run_id, finer, get_bucket(start, resolution), end,
+                      resolution]
+        rows.append((MERGE_POINT_ROLLUPS, parameters))
+        rows.append((MERGE_READING_ROLLUPS, parameters))
+    return rows
+
+
+def select_rollup_resolution(duration: float, number_of_points: int) -> Optional[int]:
+    """
+    Returns the coarsest rollup resolution with at least number_of_points buckets over the duration.
+
+    :param duration: length of the time range in seconds
+    :param number_of_points: minimum number of buckets
+    :return: resolution in seconds, or None if every rollup is too coarse
+    """
+    for resolution in sorted(ROLLUP_RESOLUTIONS, reverse=True):
+        if duration / resolution >= number_of_points:
+            return resolution
+    return None
+
+
+def create_readings(wavelengths: List[float], powers: List[float], statistics: List) -> List[Tuple]:
+    """
+    Groups the values recorded for each fbg into the rows of the readings table.
+
+    :param wavelengths: mean wavelength of each fbg
+    :param powers: mean power of each fbg
+    :param statistics: alternating wavelength deviations, and dropouts of each fbg
+    :return: wavelength, power, wavelength standard deviation, and dropouts of each fbg
+    """
+    return list(zip(wavelengths, powers, statistics[::2], statistics[1::2]))
+
+
+def add_fbgs(cursor: sqlite3.Cursor, table_id: int, fbg_names: List[str]) -> List[int]:
+    """
+    Adds the fbgs of the run that are not in the fbgs table yet, and returns the ids of all of them.
+
+    :param cursor: cursor of the database writer's connection
+    :param table_id: map ID of the run
+    :param fbg_names: names of the run's fbgs
+    :return: ids of the fbgs in the order of fbg_names
+    """
+    cursor.executemany("INSERT OR IGNORE INTO fbgs(run_id, name) VALUES (?, ?);",
+                       [(table_id, fbg_name) for fbg_name in fbg_names])
+    fbg_ids = get_fbg_ids(cursor, table_id, fbg_names)
+    return [fbg_ids[fbg_name] for fbg_name in fbg_names]
+
+
+def get_fbg_ids(cursor: sqlite3.Cursor, table_id: int, fbg_names: List[str]) -> Dict[str, int]:
+    """
+    Returns the ids of the run's fbgs that have been recorded, ordered the same as fbg_names.
+
+    :param cursor: database cursor
+    :param table_id: map ID of the run
+    :param fbg_names: names of the fbgs
+    :return: fbg name mapped to its id, fbgs that have not been recorded for the run are left out
+    """
+    cursor.execute("SELECT name, ID FROM fbgs WHERE run_id = ?;", (table_id,))
+    ids = dict(cursor.fetchall())
+    return collections.OrderedDict((fbg_name, ids[fbg_name]) for fbg_name in fbg_names if fbg_name in ids)
+
+
+def create_wide_data_frame(points: pd.DataFrame, reading_column: Callable[[str, int], np.ndarray],
+                           fbg_ids: Dict[str, int], is_cal: bool) -> pd.DataFrame:
+    """
+    Creates a dataframe of one row per point, with the columns shown in the live table. Fbgs that were not recorded
+    for a point, because they were added to the run later, are left as NaN.
+
+    :param points: rows of the points table selected with SELECT_POINTS
+    :param reading_column: function returning a reading column of an fbg in the order of the points, as returned by
+                           read_joined_readings, or pivot_readings
+    :param fbg_ids: name mapped to id of each fbg to include the columns of
+    :param is_cal: True if the run is a calibration run, False for baking
+    :return: dataframe with an ID column, followed by the live table's columns
+    """
+    columns = collections.OrderedDict([("ID", points["ID"].values), (DATE_TIME_HEADER, points["ts"].values)])
+    for fbg_name, fbg_id in fbg_ids.items():
+        columns["{} Wavelength (nm.)".format(fbg_name)] = reading_column("wavelength", fbg_id)
+        columns["{} Power (dBm.)".format(fbg_name)] = reading_column("power", fbg_id)
+    columns[TEMPERATURE_HEADER] = points["temperature"].values
+    if is_cal:
+        columns["Drift Rate"] = points["drift_rate"].values
+        columns[REAL_POINT_HEADER] = [str(bool(real_point)) for real_point in points["real_point"].values]
+        columns[CYCLE_HEADER] = points["cycle_num"].values.astype(int)
+    for fbg_name, fbg_id in fbg_ids.items():
+        columns["{} Std. Dev. (pm.)".format(fbg_name)] = reading_column("std_dev", fbg_id)
+        columns["{} Dropouts".format(fbg_name)] = reading_column("dropouts", fbg_id)
+    df = pd.DataFrame(columns, columns=list(columns.keys()))
+    return df
+
+
+def add_range_columns(df: pd.DataFrame, points: pd.DataFrame, readings: pd.DataFrame, fbg_ids: Dict[str, int]):
+    """
+    Adds the minimum, and maximum temperature, and each fbg's minimum, and maximum wavelength, and power columns of
+    the rollup buckets to the end of the dataframe.
+
+    :param df: dataframe created from the rollup rows by create_wide_data_frame
+    :param points: rows of the point_rollups table selected with SELECT_POINT_ROLLUPS
+    :param readings: rows of the reading_rollups table selected with SELECT_READING_ROLLUPS
+    :param fbg_ids: name mapped to id of each fbg to include the columns of
+    """
+    reading_column = pivot_readings(points, readings, [column for column, _ in READING_RANGE_COLUMNS])
+    df[MIN_TEMPERATURE_HEADER] = points["temperature_min"].values
+    df[MAX_TEMPERATURE_HEADER] = points["temperature_max"].values
+    for fbg_name, fbg_id in fbg_ids.items():
+        for column, header in READING_RANGE_COLUMNS:
+            df[header.format(fbg_name)] = reading_column(column, fbg_id)
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def select_joined_readings(count: int) -> str:
+    """
+    Formats SELECT_JOINED_READINGS for count fbgs, the statements are cached like sql.in_statement.
+
+    :param count: number of fbgs joined
+    :returns: the parameterized statement
+    """
+    columns = ", ".join("r{}.{}".format(i, column) for i in range(count) for column in READING_COLUMNS)
+    joins = " ".join(READING_JOIN.format(i) for i in range(count))
+    return SELECT_JOINED_READINGS.format(columns, joins)
+
+
+def read_joined_readings(cursor: sqlite3.Cursor, table_id: int, fbg_ids: List[int], points: pd.DataFrame,
+                         after_id: int) -> Callable[[str, int], np.ndarray]:
+    """
+    Reads the readings of the points pivoted by sqlite into one row per point, each reading is looked up in the
+    readings_run_point index, so a row is fetched per point instead of per reading. Up to MAX_JOINED_FBGS fbgs are
+    read at a time.
+
+    :param cursor: cursor of the read transaction the points were selected in
+    :param table_id: the run's map ID
+    :param fbg_ids: ids of the fbgs to read
+    :param points: the points after after_id up to the last of the run, or of the chunk, with an ID column
+    :param after_id: ID of the point before the first of the points
+    :return: function returning a column of an fbg in the order of the points, NaN for points without a reading
+    """
+    values = {}  # type: Dict[Tuple[str, int], np.ndarray]
+    last_id = int(points["ID"].values[-1]) if len(points.index) else after_id
+    for start in range(0, len(fbg_ids), MAX_JOINED_FBGS):
+        chunk = fbg_ids[start:start + MAX_JOINED_FBGS]
+        cursor.execute(select_joined_readings(len(chunk)), (*chunk, table_id, after_id, last_id))
+        rows = np.array(cursor.fetchall(), dtype=float).reshape(-1, len(chunk), len(READING_COLUMNS))
+        for i, fbg_id in enumerate(chunk):
+            for j, column in enumerate(READING_COLUMNS):
+                values[(column, fbg_id)] = rows[:, i, j]
+
+    def reading_column(column: str, fbg_id: int) -> np.ndarray:
+        return values[(column, fbg_id)]
+
+    return reading_column
+
+
+def pivot_readings(points: pd.DataFrame, readings: pd.DataFrame,
+                   columns: Sequence[str]) -> Callable[[str, int], np.ndarray]:
+    """
+    Pivots the readings' columns into one row per point.
+
+    :param points: the points the readings belong to, with an ID column
+    :param readings: readings with point_id, fbg_id, and the columns
+    :param columns: names of the columns to pivot
+    :return: function returning a column of an fbg in the order of the points, NaN for points without a reading
+    """
+    readings = readings.drop_duplicates(["point_id", "fbg_id"]).set_index(["point_id", "fbg_id"])
+    readings = readings[list(columns)].unstack()
+
+    def reading_column(column: str, fbg_id: int) -> np.ndarray:
+        if (column, fbg_id) in readings.columns:
+            return readings[(column, fbg_id)].reindex(points["ID"].values).values
+        return np.full(len(points.index), np.nan)
+
+    return reading_column
 
 
 def create_column_names(fbg_names: List[str]) -> List[str]:
@@ -308,14 +740,20 @@ def add_calibration_column_names(columns: List[str]):
     columns.append("'Cycle Num'")
 
 
+def add_statistics_column_names(columns: List[str], fbg_names: List[str]):
+    for fbg_name in fbg_names:
+        columns.append("'{} Std. Dev. (pm.)'".format(fbg_name))
+        columns.append("'{} Dropouts'".format(fbg_name))
+
+
 def delete_tables(table_ids: List[int], program_types: List[str]):
-    connection = sqlite3.connect(DB_PATH)
-    cursor = connection.cursor()
     for table_id, program_type in zip(table_ids, program_types):
         try:
-            cursor.execute("DELETE FROM map WHERE ID = {};".format(table_id))
-            cursor.execute("DROP TABLE {}{};".format(program_type.lower(), table_id))
-            connection.commit()
+            with get_writer().cursor() as cursor:
+                cursor.execute("DELETE FROM map WHERE ID = ?;", (table_id,))
+                for table_name in RUN_TABLES:
+                    cursor.execute("DELETE FROM {} WHERE run_id = ?;".format(table_name), (table_id,))
+                table_name = validate_table_name("{}{}".format(program_type.lower(), table_id))
+                cursor.execute("DROP TABLE IF EXISTS {};".format(table_name))
         except sqlite3.OperationalError:
             pass
-    connection.close()
@@ -0,0 +1,271 @@
+"""Batched writer that owns the single long lived sqlite connection used for recording program data."""
+import atexit
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple, Sequence, Optional, Callable
+
+from fbgui.constants import DB_PATH, DB_COMMIT_BATCH_SIZE, DB_COMMIT_INTERVAL, DB_COMMIT_MAX_RETRIES
+from fbgui.exceptions import RowsDropped
+from fbgui.sql import connect
+from fbgui.timing import time_stage
+
+#: Placeholder for the last parameter of a queued row, replaced with the row ID of the row inserted just before it
+LAST_ROW_ID = object()
+
+
+class DatabaseWriter(object):
+    """
+    Owns one sqlite connection in WAL mode, rows are queued and committed in batches by a background thread, so
+    readers such as the graphing thread are not blocked by the program thread's writes.
+
+    :ivar str db_path: path to the sqlite database file
+    :ivar int batch_size: number of queued writes that triggers a commit
+    :ivar float flush_interval: maximum number of seconds a queued row waits before it is committed
+    :ivar List[Tuple[str, Sequence]] pending: queued (parameterized statement, parameters) pairs
+    :ivar int pending_writes: number of writes the pending rows were queued by
+    :ivar int max_retries: number of consecutive failed commits after which the queued rows are dropped
+    :ivar int failures: number of consecutive failed commits
+    :ivar sqlite3.OperationalError error: error raised when the background thread dropped the queued rows, raised on
+                                          the next write
+    :ivar List[Callable] flush_callbacks: callbacks of the flushes requested from the background thread
+    """
+
+    def __init__(self, db_path: str=DB_PATH, batch_size: int=DB_COMMIT_BATCH_SIZE,
+                 flush_interval: float=DB_COMMIT_INTERVAL, max_retries: int=DB_COMMIT_MAX_RETRIES):
+        """
+        Creates the writer, the connection and the background thread are started on first use.
+
+        :param db_path: path to the sqlite database file
+        :param batch_size: number of queued writes that triggers a commit
+        :param flush_interval: maximum number of seconds a queued row waits before it is committed, and the seconds
+                               between retries of a failed commit
+        :param max_retries: number of consecutive failed commits after which the queued rows are dropped
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.failures = 0
+        self.pending = []  # type: List[Tuple[str, Sequence]]
+        self.pending_writes = 0
+        self.error = None  # type: Optional[sqlite3.OperationalError]
+        self.flush_callbacks = []  # type: List[Callable[[Optional[sqlite3.OperationalError]], None]]
+        self.connection = None  # type: sqlite3.Connection
+        self.lock = threading.RLock()
+        self.condition = threading.Condition(threading.Lock())
+        self.first_pending_time = None  # type: Optional[float]
+        self.thread = None  # type: threading.Thread
+
+    def start(self):
+        """Opens the connection in WAL mode, and starts the background commit thread if it is not running."""
+        with self.lock:
+            if self.connection is None:
+                self.connection = connect(self.db_path, check_same_thread=False)
+                self.connection.execute("PRAGMA journal_mode=WAL;")
+                self.connection.execute("PRAGMA synchronous=NORMAL;")
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+                self.thread.start()
+
+    @contextmanager
+    def cursor(self):
+        """
+        Context manager for running statements synchronously on the writer's connection, queued rows are
+        committed first, and the statements are committed on exit.
+        """
+        self.start()
+        with self.lock:
+            self.flush()
+            cursor = self.connection.cursor()
+            try:
+                yield cursor
+                self.connection.commit()
+            except BaseException:
+                self.connection.rollback()
+                raise
+
+    def write(self, statement: str, parameters: Sequence):
+        """
+        Queues a parameterized statement to be committed in the next batch.
+
+        :param statement: parameterized sql statement
+        :param parameters: the values of the statement's parameters
+        :raises RowsDropped: If the queued rows were dropped after repeated failed commits
+        """
+        self.write_many([(statement, parameters)])
+
+    def write_many(self, rows: Sequence[Tuple[str, Sequence]]):
+        """
+        Queues the rows of one recorded point together, they count as a single write towards the batch size, and
+        are committed in the same transaction.
+
+        :param rows: (parameterized statement, parameters) pairs, rows with the same statement should be adjacent,
+                     rows whose last parameter is LAST_ROW_ID get the row ID of the last row inserted before them
+        :raises RowsDropped: If the queued rows were dropped after repeated failed commits
+        """
+        self.start()
+        self.raise_error()
+        with self.condition:
+            if not self.pending:
+                self.first_pending_time = time.monotonic()
+            self.pending.extend(rows)
+            self.pending_writes += 1
+            if self.pending_writes >= self.batch_size:
+                self.condition.notify()
+
+    def request_flush(self, callback: Callable[[Optional[sqlite3.OperationalError]], None]=None):
+        """
+        Asks the background thread to commit all of the queued rows now, so the caller is not blocked on the commit.
+
+        :param callback: called on the background thread after the flush, with the error if the rows could not be
+                         committed, None otherwise, it must not raise
+        """
+        self.start()
+        with self.condition:
+            self.flush_callbacks.append(callback)
+            self.condition.notify()
+
+    def flush(self):
+        """
+        Commits all of the queued rows in one transaction. If the commit fails the rows are put back at the front of
+        the queue to be retried, after max retries consecutive failures they are dropped.
+
+        :raises sqlite3.OperationalError: If the rows cannot be committed
+        :raises RowsDropped: If the rows were dropped
+        """
+        with self.lock:
+            with self.condition:
+                pending, pending_writes, first_pending_time = self.pending, self.pending_writes, \
+                    self.first_pending_time
+                self.pending = []
+                self.pending_writes = 0
+                self.first_pending_time = None
+            if not pending or self.connection is None:
+                return
+            try:
+                with time_stage("database.commit"):
+                    self._commit(pending)
+            except sqlite3.OperationalError as sql_error:
+                self.connection.rollback()
+                self.failures += 1
+                if self.failures >= self.max_retries:
+                    self.failures = 0
+                    raise RowsDropped("Dropped {} queued rows after {} failed commits: {}"
+                                      .format(len(pending), self.max_retries, sql_error)) from sql_error
+                with self.condition:
+                    self.pending[:0] = pending
+                    self.pending_writes += pending_writes
+                    self.first_pending_time = first_pending_time
+                raise
+            self.failures = 0
+
+    def _commit(self, pending: List[Tuple[str, Sequence]]):
+        """
+        Executes the queued rows grouped by statement, and commits them.
+
+        :param pending: queued (parameterized statement, parameters) pairs
+        """
+        cursor = self.connection.cursor()
+        statement = pending[0][0]
+        batch = []
+        row_id = None  # type: Optional[int]
+        for next_statement, parameters in pending:
+            if next_statement != statement:
+                row_id = execute(cursor, statement, batch)
+                statement, batch = next_statement, []
+            if parameters and parameters[-1] is LAST_ROW_ID:
+                if row_id is None:
+                    row_id = cursor.execute("SELECT last_insert_rowid();").fetchone()[0]
+                parameters = [*parameters[:-1], row_id]
+            batch.append(parameters)
+        execute(cursor, statement, batch)
+        self.connection.commit()
+
+    def raise_error(self):
+        """
+        Raises the error from the background commit that dropped the queued rows, if there is one.
+
+        :raises RowsDropped: If the background thread dropped the queued rows
+        """
+        error = self.error
+        self.error = None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Commits the queued rows, and closes the connection."""
+        with self.lock:
+            try:
+                self.flush()
+            except sqlite3.OperationalError:
+                pass
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def _flush_loop(self):
+        """
+        Background loop that commits queued rows once the batch is full, the flush interval has elapsed, or a flush
+        is requested. The errors of requested flushes are passed to their callbacks, instead of the next write, and
+        a requested flush does not wait out the retry delay of a failed commit.
+        """
+        while True:
+            with self.condition:
+                while self.pending_writes < self.batch_size and not self.flush_callbacks:
+                    if self.first_pending_time is None:
+                        timeout = self.flush_interval
+                    else:
+                        timeout = self.first_pending_time + self.flush_interval - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    self.condition.wait(timeout)
+                callbacks, self.flush_callbacks = self.flush_callbacks, []
+            error = None  # type: Optional[sqlite3.OperationalError]
+            try:
+                self.flush()
+            except sqlite3.OperationalError as sql_error:
+                error = sql_error
+                if isinstance(sql_error, RowsDropped) and not callbacks:
+                    self.error = sql_error
+            for callback in callbacks:
+                if callback is not None:
+                    callback(error)
+            if error is not None and not isinstance(error, RowsDropped):
+                with self.condition:
+                    self.condition.wait_for(lambda: self.flush_callbacks, self.flush_interval)
+
+
+def execute(cursor: sqlite3.Cursor, statement: str, batch: List[Sequence]) -> Optional[int]:
+    """
+    Executes the statement once for each of the parameters in the batch.
+
+    :param cursor: cursor of the writer's connection
+    :param statement: parameterized sql statement
+    :param batch: parameters of each execution
+    :returns: the cursor's lastrowid if the batch is one row, None otherwise, executemany does not set lastrowid
+    """
+    if len(batch) == 1:
+        cursor.execute(statement, batch[0])
+        return cursor.lastrowid
+    cursor.executemany(statement, batch)
+    return None
+
+
+_writer = None  # type: DatabaseWriter
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> DatabaseWriter:
+    """
+    Returns the writer shared by all of the database controllers, created on first use.
+
+    :returns: the shared database writer
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DatabaseWriter()
+            atexit.register(_writer.close)
+        return _writer
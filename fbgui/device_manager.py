@@ -0,0 +1,146 @@
+"""Keeps the device connections open for the length of a program run, and reconnects only on failure."""
+import select
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Dict, Union
+from uuid import UUID
+
+import visa
+
+from fbgui.constants import LASER, SWITCH, TEMP, OVEN
+from fbgui.devices.optical_switch import OpticalSwitch
+from fbgui.devices.oven import Oven
+from fbgui.devices.sm125_laser import SM125
+from fbgui.devices.temperature_controller import TemperatureController
+from fbgui.messages import MessageType, Message
+
+#: Device identifier mapped to the Application attribute holding the connection
+DEVICE_ATTRIBUTES = {LASER: "laser", SWITCH: "switch", TEMP: "temp_controller", OVEN: "oven"}
+
+Device = Union[SM125, OpticalSwitch, TemperatureController, Oven]
+
+
+class DeviceManager(object):
+    """
+    Manages the device connections stored on the Application, connections are opened on first use, and kept open
+    until the program is paused, or a communication error occurs.
+
+    :ivar Application master: the main Application object holding the device connections
+    :ivar Dict[str, threading.RLock] locks: device identifier mapped to the lock held while the device is acquired
+    """
+
+    def __init__(self, master):
+        """
+        Creates the device manager for the Application's devices.
+
+        :param master: the main Application object, used for connecting to devices and logging messages
+        """
+        self.master = master
+        self.locks = {dev: threading.RLock() for dev in DEVICE_ATTRIBUTES}  # type: Dict[str, threading.RLock]
+
+    def get_device(self, dev: str) -> Device:
+        """
+        Returns the current connection for the device, or None if it is not connected.
+
+        :param dev: device identifier string
+        """
+        return getattr(self.master, DEVICE_ATTRIBUTES[dev])
+
+    def acquire(self, dev: str, thread_id: UUID=None, try_once: bool=False) -> Device:
+        """
+        Locks the device for the calling thread, and returns its connection. The existing connection is reused if
+        it passes the health check, otherwise the device is reconnected.
+
+        **release must be called once the caller is done with the device**
+
+        :param dev: device identifier string
+        :param thread_id: UUID of the thread running the code, if None then code is running on main thread
+        :param try_once: True if try to connect only once, False if continuously try to connect to device
+        :returns: the device connection, None if the device could not be connected to
+        """
+        self.locks[dev].acquire()
+        try:
+            device = self.get_device(dev)
+            if device is not None and not is_healthy(device):
+                self.invalidate(dev)
+            self.master.conn_dev(dev, try_once=try_once, thread_id=thread_id)
+            return self.get_device(dev)
+        except BaseException:
+            self.locks[dev].release()
+            raise
+
+    def release(self, dev: str):
+        """
+        Releases the lock on a device acquired with acquire, the connection is kept open.
+
+        :param dev: device identifier string
+        """
+        self.locks[dev].release()
+
+    @contextmanager
+    def session(self, dev: str, thread_id: UUID=None, try_once: bool=False):
+        """
+        Context manager that acquires the device, and releases it on exit. The connection is closed if a
+        communication error is raised, so the next acquire reconnects.
+
+        :param dev: device identifier string
+        :param thread_id: UUID of the thread running the code, if None then code is running on main thread
+        :param try_once: True if try to connect only once, False if continuously try to connect to device
+        """
+        device = self.acquire(dev, thread_id, try_once)
+        try:
+            yield device
+        except (socket.error, visa.VisaIOError):
+            self.invalidate(dev)
+            raise
+        finally:
+            self.release(dev)
+
+    def invalidate(self, dev: str):
+        """
+        Closes the device connection after a failure, the device is reconnected the next time it is acquired.
+
+        :param dev: device identifier string
+        """
+        if self.get_device(dev) is not None:
+            self.close(dev)
+            self.master.main_queue.put(Message(MessageType.DEVELOPER, "Device Session",
+                                               "Closed the {} connection, reconnecting on next use.".format(dev)))
+
+    def close(self, dev: str):
+        """
+        Closes the device connection, and sets it to None.
+
+        :param dev: device identifier string
+        """
+        device = self.get_device(dev)
+        setattr(self.master, DEVICE_ATTRIBUTES[dev], None)
+        if device is not None:
+            try:
+                device.close()
+            except (socket.error, visa.VisaIOError):
+                pass
+
+    def close_all(self):
+        """Close all of the device connections, at the end of a program run."""
+        for dev in DEVICE_ATTRIBUTES:
+            self.close(dev)
+
+
+def is_healthy(device: Device) -> bool:
+    """
+    Checks whether a kept open connection can be reused. A socket device is unhealthy if the peer closed the
+    connection, or unread bytes are waiting, which means the last response was not fully read. GPIB devices are
+    assumed healthy, and are reconnected when a query fails.
+
+    :param device: the device connection to check
+    :returns: True if the connection can be reused, False otherwise
+    """
+    if isinstance(device, socket.socket):
+        try:
+            readable, _, _ = select.select([device], [], [], 0)
+        except (socket.error, ValueError):
+            return False
+        return not readable
+    return True
@@ -0,0 +1,169 @@
+"""
+Asyncio versions of the devices used for recording baking points, the SM125 uses asyncio streams, and the
+temperature controller runs its blocking pyvisa calls on a dedicated executor thread, so scans, and temperature reads
+can be awaited concurrently with timeouts, and cancelled.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Callable, Any
+from uuid import UUID
+
+import numpy as np
+
+from fbgui.constants import DEVICE_TIMEOUT
+from fbgui.devices.sm125_laser import parse_peaks_and_levels, LENGTH_PREFIX_SIZE
+from fbgui.devices.temperature_controller import TemperatureController
+from fbgui.exceptions import ProgramStopped
+
+_gpib_executor = None  # type: ThreadPoolExecutor
+
+
+def get_gpib_executor() -> ThreadPoolExecutor:
+    """
+    Returns the single thread executor shared by all of the GPIB devices, the devices share one bus, so their calls
+    are run one at a time.
+    """
+    global _gpib_executor
+    if _gpib_executor is None:
+        _gpib_executor = ThreadPoolExecutor(max_workers=1)
+    return _gpib_executor
+
+
+class AsyncSM125(object):
+    """
+    Asyncio stream connection to the SM125.
+
+    :ivar asyncio.StreamReader reader: stream the responses are read from
+    :ivar asyncio.StreamWriter writer: stream the commands are written to
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, address: str, port: int, timeout: float=DEVICE_TIMEOUT) -> "AsyncSM125":
+        """
+        Opens a connection to the SM125.
+
+        :param address: IP address of the SM125
+        :param port: port of the SM125
+        :param timeout: seconds to wait for the connection
+        :raises asyncio.TimeoutError: If the connection is not accepted within the timeout
+        """
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+        return cls(reader, writer)
+
+    async def get_data(self, use_positions: List[bool]) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Returns the SM125 wavelengths, and amplitudes in the same format as SM125.get_data.
+
+        :param use_positions: list of 4 values, True if expecting data on that channel, False otherwise
+        :returns: Wavelength readings, Amplitude readings
+        :raises asyncio.IncompleteReadError: If the SM125 closes the connection before the response is received
+        """
+        self.writer.write(b'#GET_PEAKS_AND_LEVELS')
+        await self.writer.drain()
+        response_length = int(await self.reader.readexactly(LENGTH_PREFIX_SIZE))
+        response = await self.reader.readexactly(response_length)
+        return parse_peaks_and_levels(response, use_positions)
+
+    def close(self):
+        """Close the connection."""
+        self.writer.close()
+
+
+class AsyncGPIBDevice(object):
+    """
+    Runs the methods of a blocking GPIB device on the GPIB executor.
+
+    :ivar device: the blocking device wrapper
+    :ivar ThreadPoolExecutor executor: executor the blocking calls are run on
+    """
+
+    def __init__(self, device, executor: ThreadPoolExecutor=None):
+        self.device = device
+        self.executor = executor if executor is not None else get_gpib_executor()
+
+    async def call(self, function: Callable, *args) -> Any:
+        """
+        Runs a blocking function on the executor. Cancelling the awaiting task does not interrupt a call that has
+        already started, the result is discarded once it finishes.
+
+        :param function: blocking function to run
+        :param args: arguments of the function
+        :returns: the return value of the function
+        """
+        return await asyncio.get_event_loop().run_in_executor(self.executor, function, *args)
+
+    def close(self):
+        """Close the device connection."""
+        self.device.close()
+
+
+class AsyncTemperatureController(AsyncGPIBDevice):
+    """Asyncio wrapper of the LSC temperature controller."""
+
+    def __init__(self, temperature_controller: TemperatureController, executor: ThreadPoolExecutor=None):
+        super().__init__(temperature_controller, executor)
+
+    async def get_temp_k(self) -> float:
+        """Return temperature reading in degrees Kelvin."""
+        return await self.call(self.device.get_temp_k)
+
+
+class AsyncRunner(object):
+    """
+    Runs device coroutines on an event loop owned by a program thread. Stopping the runner from any thread cancels
+    the running coroutine right away, so device code does not need to poll the thread map.
+
+    **stop must be called after the thread map entry is set to False, close must be called by the owning thread**
+
+    :ivar asyncio.AbstractEventLoop loop: event loop the coroutines are run on
+    :ivar UUID thread_id: UUID of the program thread
+    :ivar dict thread_map: UUID mapped to whether or not the thread with that UUID should be running
+    :ivar asyncio.Task task: the running coroutine's task, None if no coroutine is running
+    """
+
+    def __init__(self, thread_id: UUID, thread_map: dict, loop: asyncio.AbstractEventLoop=None):
+        """
+        :param thread_id: UUID of the program thread
+        :param thread_map: UUID mapped to whether or not the thread with that UUID should be running
+        :param loop: event loop to run the coroutines on, a new event loop is created if None
+        """
+        self.loop = loop if loop is not None else asyncio.new_event_loop()
+        self.thread_id = thread_id
+        self.thread_map = thread_map
+        self.task = None  # type: asyncio.Task
+        self.lock = threading.Lock()
+
+    def run(self, coroutine) -> Any:
+        """
+        Runs the coroutine until it finishes, or the runner is stopped.
+
+        :param coroutine: coroutine to run
+        :returns: the result of the coroutine
+        :raises ProgramStopped: If the program thread was stopped before the coroutine finished
+        """
+        with self.lock:
+            self.task = asyncio.ensure_future(coroutine, loop=self.loop)
+            if not self.thread_map[self.thread_id]:
+                self.task.cancel()
+        try:
+            return self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            raise ProgramStopped
+        finally:
+            with self.lock:
+                self.task = None
+
+    def stop(self):
+        """Cancels the running coroutine, can be called from any thread."""
+        with self.lock:
+            if self.task is not None:
+                self.loop.call_soon_threadsafe(self.task.cancel)
+
+    def close(self):
+        """Closes the event loop."""
+        self.loop.close()
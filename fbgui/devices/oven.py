@@ -1,6 +1,8 @@
 from visa import ResourceManager
 from pyvisa.resources.gpib import GPIBInstrument
 
+from fbgui.timing import time_stage
+
 
 class Oven(object):
     """
@@ -24,23 +26,32 @@ class Oven(object):
 
         :param temp: Temperature to set the oven to
         """
-        self.device.query('S {}'.format(temp))
+        self.query('S {}'.format(temp))
 
     def heater_on(self):
         """Turns oven heater on."""
-        self.device.query('H ON')
+        self.query('H ON')
 
     def heater_off(self):
         """Turns oven heater off."""
-        self.device.query('H OFF')
+        self.query('H OFF')
 
     def cooling_on(self):
         """Turns oven cooling on."""
-        self.device.query('C ON')
+        self.query('C ON')
 
     def cooling_off(self):
         """Turns oven cooling off."""
-        self.device.query('C OFF')
+        self.query('C OFF')
+
+    def query(self, command: str) -> str:
+        """
+        Sends a command to the oven, and returns its response.
+
+        :param command: the command to send
+        """
+        with time_stage("oven.query"):
+            return self.device.query(command)
 
     def close(self):
         """Closes the resource."""
@@ -1,21 +1,34 @@
 import socket
 from socket import AF_INET, SOCK_STREAM
-from typing import List, Tuple
-import struct
+from typing import List, Tuple, Union
 from enum import Enum
 
+import numpy as np
+
+from fbgui.timing import timed
+
 WAVELENGTH_MULTIPLIER = 10000.0
 AMPLITUDE_MULTIPLIER = 100.0
 
+#: Number of bytes in the ASCII length prefix sent before every response
+LENGTH_PREFIX_SIZE = 10
+#: Initial size of the reusable response buffer, grown to the largest response seen
+INITIAL_BUFFER_SIZE = 1024
+#: Byte offset of the four per channel peak counts in a GET_PEAKS_AND_LEVELS response
+CHANNEL_LENGTHS_OFFSET = 12
+#: Byte offset of the first wavelength value in a GET_PEAKS_AND_LEVELS response
+VALUES_OFFSET = 32
+NUMBER_OF_CHANNELS = 4
+
 
 class SM125DataType(Enum):
     """
-    Used for parsing the correct data from the SM125 response. Contains size of value in bytes, type of value
-    used by struct module for binary conversion, multiplier used for converting the received value.
+    Used for parsing the correct data from the SM125 response. Contains size of value in bytes, numpy dtype of the
+    value used for binary conversion, multiplier used for converting the received value.
     """
 
-    WAVELENGTH = (4, 'i', WAVELENGTH_MULTIPLIER)
-    AMPLITUDE = (2, 'h', AMPLITUDE_MULTIPLIER)
+    WAVELENGTH = (4, '<i4', WAVELENGTH_MULTIPLIER)
+    AMPLITUDE = (2, '<i2', AMPLITUDE_MULTIPLIER)
 
     def byte_length(self) -> int:
         return self.value[0]
@@ -33,10 +46,11 @@ class SM125(socket.socket):
         socket.setdefaulttimeout(3)
         super().__init__(AF_INET, SOCK_STREAM)
         super().connect((address, port))
-        self.response_position = 0
-        self.response = b""
+        self.length_buffer = bytearray(LENGTH_PREFIX_SIZE)
+        self.response_buffer = bytearray(INITIAL_BUFFER_SIZE)
 
-    def get_data(self, use_positions: List[bool]) -> Tuple[List[List[float]], List[List[float]]]:
+    @timed("sm125.get_data")
+    def get_data(self, use_positions: List[bool]) -> Tuple[List[np.ndarray], List[np.ndarray]]:
         """
         Returns the SM125 wavelengths, amplitudes, the two lists are both of length 4, a value of 0 is used if no
         peak is detected on a channel that is expecting data, or used if not expecting data on a channel.
@@ -45,34 +59,64 @@ class SM125(socket.socket):
         :returns: Wavelength readings, Amplitude readings
         """
         self.send(b'#GET_PEAKS_AND_LEVELS')
-        response_length = int(self.recv(10))
-        self.response = self.recv(response_length)
-
-        self.response_position = 12
-        channel_lengths = []
-        for _ in range(4):
-            start = self.response_position
-            self.response_position += 2
-            channel_length_bytes = self.response[start:self.response_position]
-            channel_length = struct.unpack('H', channel_length_bytes)[0]
-            channel_lengths.append(channel_length)
-
-        self.response_position += 12
-
-        wavelengths = self.__parse_values(SM125DataType.WAVELENGTH, channel_lengths, use_positions)
-        amplitudes = self.__parse_values(SM125DataType.AMPLITUDE, channel_lengths, use_positions)
-        return wavelengths, amplitudes
-
-    def __parse_values(self, sm125_type: SM125DataType, channel_lengths: List[int], use_positions: List[bool]):
-        values = [[], [], [], []]
-        for i in range(4):
-            for j in range(channel_lengths[i]):
-                start = self.response_position
-                self.response_position += sm125_type.byte_length()
-                value_bytes = self.response[start:self.response_position]
-                value = struct.unpack(sm125_type.type_specifier(), value_bytes)[0] / sm125_type.multiplier()
-                if use_positions[i]:
-                    values[i].append(value)
-            if (use_positions[i] and not channel_lengths[i]) or not use_positions[i]:
-                values[i].append(0.0)
-        return values
+        response_length = int(bytes(self.recv_exact(self.length_buffer, LENGTH_PREFIX_SIZE)))
+        if response_length > len(self.response_buffer):
+            self.response_buffer = bytearray(response_length)
+        response = self.recv_exact(self.response_buffer, response_length)
+        return parse_peaks_and_levels(response, use_positions)
+
+    def recv_exact(self, buffer: bytearray, length: int) -> memoryview:
+        """
+        Reads exactly length bytes into the start of buffer, looping over short reads.
+
+        :param buffer: preallocated buffer to read into, must be at least length bytes long
+        :param length: the number of bytes to read
+        :returns: view of the first length bytes of the buffer
+        :raises socket.error: If the SM125 closes the connection before length bytes are received
+        """
+        view = memoryview(buffer)[:length]
+        received = 0
+        while received < length:
+            count = self.recv_into(view[received:], length - received)
+            if not count:
+                raise socket.error("SM125 closed the connection after {} of {} bytes.".format(received, length))
+            received += count
+        return view
+
+
+def parse_peaks_and_levels(response: Union[bytes, memoryview], use_positions: List[bool]) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """
+    Decodes a GET_PEAKS_AND_LEVELS response in a single pass, without copying the response buffer.
+
+    The response contains the peak count of each channel, followed by every channel's wavelengths, followed by every
+    channel's amplitudes, so each block is read with one numpy.frombuffer call and then split by channel.
+
+    :param response: the SM125 response, without the 10 byte length prefix, may be a view of a reused buffer
+    :param use_positions: list of 4 values, True if expecting data on that channel, False otherwise
+    :returns: scaled wavelength arrays for each channel, scaled amplitude arrays for each channel
+    """
+    view = memoryview(response)
+    channel_lengths = np.frombuffer(view, dtype='<u2', count=NUMBER_OF_CHANNELS, offset=CHANNEL_LENGTHS_OFFSET)
+    number_of_peaks = int(channel_lengths.sum())
+    split_indexes = np.cumsum(channel_lengths)[:-1]
+
+    wavelengths = _parse_values(view, SM125DataType.WAVELENGTH, VALUES_OFFSET, number_of_peaks)
+    amplitudes_offset = VALUES_OFFSET + number_of_peaks * SM125DataType.WAVELENGTH.byte_length()
+    amplitudes = _parse_values(view, SM125DataType.AMPLITUDE, amplitudes_offset, number_of_peaks)
+    return (_split_channels(wavelengths, split_indexes, use_positions),
+            _split_channels(amplitudes, split_indexes, use_positions))
+
+
+def _parse_values(view: memoryview, sm125_type: SM125DataType, offset: int, count: int) -> np.ndarray:
+    values = np.frombuffer(view, dtype=sm125_type.type_specifier(), count=count, offset=offset)
+    return values / sm125_type.multiplier()
+
+
+def _split_channels(values: np.ndarray, split_indexes: np.ndarray, use_positions: List[bool]) -> List[np.ndarray]:
+    channels = []
+    for use_position, channel_values in zip(use_positions, np.split(values, split_indexes)):
+        if use_position and len(channel_values):
+            channels.append(channel_values)
+        else:
+            channels.append(np.zeros(1))
+    return channels
@@ -1,5 +1,7 @@
 from pyvisa.resources.gpib import GPIBInstrument
 
+from fbgui.timing import timed
+
 
 class TemperatureController(object):
     """
@@ -17,6 +19,7 @@ class TemperatureController(object):
         self.device = manager.open_resource(location, read_termination='\r\n',
                                             open_timeout=2500)  # type: GPIBInstrument
 
+    @timed("temp_controller.get_temp_k")
     def get_temp_k(self):
         """ Return temperature reading in degrees Kelvin. """
         query = self.device.query('KRDG? B')
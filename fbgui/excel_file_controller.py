@@ -5,7 +5,6 @@ from typing import Tuple, Callable
 import math
 
 import pandas as pd
-from StyleFrame import Styler, utils, StyleFrame
 from openpyxl import drawing
 from openpyxl.chart import ScatterChart, Reference, Series, marker
 from openpyxl.chart.shapes import GraphicalProperties
@@ -19,14 +18,24 @@ from fbgui.calibration_excel_container import CalibrationExcelContainer
 from fbgui.data_container import DataCollection
 from fbgui.database_controller import DatabaseController
 from fbgui.excel_graph_helpers import *
+from fbgui.excel_writer import ExcelWorkbook, DataSheet, BufferedSheet, RED_STYLE, DATE_TIME_STYLE
 from fbgui.helpers import get_file_name
 from fbgui.messages import *
 
+#: Stages of an export, passed to the progress callback as the export reaches them
+QUERY_STAGE = "query"
+COMPUTE_STAGE = "compute"
+STYLE_STAGE = "style"
+CHARTS_STAGE = "charts"
+SAVE_STAGE = "save"
+
 
 class ExcelFileController:
     def __init__(self, excel_file_path: str, fbg_names: List[str], main_queue: queue.Queue, function_type: str,
-                 bake_sensitivity: List[float]=None, extra_point_temperatures: List[float]=None):
+                 bake_sensitivity: List[float]=None, extra_point_temperatures: List[float]=None,
+                 progress: Callable[[str], None]=None):
         self.excel_file_path = excel_file_path
+        self.progress = progress
         self.excel_file_name = get_file_name(excel_file_path)
         self.fbg_names = fbg_names
         self.main_queue = main_queue
@@ -39,21 +48,38 @@ class ExcelFileController:
 
     def create_excel(self):
         try:
-            if self.is_calibration:
-                self.create_calibration_excel()
-            else:
-                self.create_baking_excel()
-        except (RuntimeError, IndexError):
-            self.main_queue.put(Message(MessageType.WARNING, "Excel File Creation Error",
-                                        "No data has been recorded yet, or the database has been corrupted."))
-            traceback.print_exc()
-        except PermissionError:
-            message = "Please close {}, before attempting to create a new copy of it.".format(self.excel_file_name)
-            self.main_queue.put(Message(MessageType.WARNING, "Excel File Creation Error", message))
-            messagebox.showwarning("Excel file is already opened", message)
+            self.export()
+        except (RuntimeError, IndexError, PermissionError) as error:
+            report_export_error(error, self.excel_file_name, self.main_queue)
+
+    def export(self):
+        """
+        Creates the excel file, and opens it.
+
+        :raises RuntimeError: If no data has been recorded for the run
+        :raises IndexError: If the run is not in the database
+        :raises PermissionError: If the excel file is open in another program
+        :raises ExportCancelled: If the progress callback cancels the export
+        """
+        if self.is_calibration:
+            self.create_calibration_excel()
+        else:
+            self.create_baking_excel()
+
+    def report_progress(self, stage: str):
+        """
+        Passes the stage the export has reached to the progress callback, if there is one.
+
+        :param stage: one of the export stages, QUERY_STAGE, COMPUTE_STAGE, STYLE_STAGE, CHARTS_STAGE, or SAVE_STAGE
+        :raises ExportCancelled: If the progress callback cancels the export
+        """
+        if self.progress is not None:
+            self.progress(stage)
 
     def create_baking_excel(self):
-        data_frame = self.database_controller.to_data_frame()
+        self.report_progress(QUERY_STAGE)
+        data_frame = self.database_controller.to_data_frame(EXCEL_ROLLUP_POINTS)
+        self.report_progress(COMPUTE_STAGE)
         data_collection = DataCollection()
         data_collection.create(self.is_calibration, data_frame, self.fbg_names, self.main_queue)
         column_ordering = [DATE_TIME_HEADER, DELTA_TIME_HEADER, TEMPERATURE_HEADER]
@@ -70,29 +96,27 @@ class ExcelFileController:
         column_ordering.extend([DELTA_TEMPERATURE_HEADER3, MEAN_DELTA_WAVELENGTH_HEADER, MEAN_DELTA_POWER_HEADER])
         data_frame[MEAN_DELTA_WAVELENGTH_HEADER] = data_collection.mean_delta_wavelengths_pm
         data_frame[MEAN_DELTA_POWER_HEADER] = data_collection.mean_delta_powers
+        add_range_columns(column_ordering, data_frame, self.fbg_names)
         data_frame = data_frame[column_ordering]
 
         baking_coefficients = self._create_baking_coefficients(data_frame)
         trend_line_indexes = self._create_trend_lines(data_frame, baking_coefficients)
         sensitivity_indexes = self._create_sensitivity_lines(data_frame, trend_line_indexes)
 
-        style_frame = self.create_style_frame(data_frame)
-        style_frame.apply_column_style(cols_to_style=MEAN_DELTA_WAVELENGTH_HEADER,
-                                       styler_obj=Styler(font_color=utils.colors.red))
-        style_frame.apply_column_style(cols_to_style=[DATE_TIME_HEADER],
-                                       styler_obj=Styler(number_format=utils.number_formats.date_time_with_seconds))
-        delta_temperature_headers = [col for col in data_frame.columns.values if DELTA_TEMPERATURE_HEADER in col]
-        style_frame.apply_column_style(cols_to_style=delta_temperature_headers,
-                                       styler_obj=Styler(font_color=utils.colors.red))
-        parameters = BakingGraphParameters(len(data_frame.index), trend_line_indexes, sensitivity_indexes)
-        self.show_excel([style_frame], ["Baking Data"], parameters, self._graph_bake_results,
+        workbook = ExcelWorkbook(self.fbg_names)
+        column_styles = {MEAN_DELTA_WAVELENGTH_HEADER: RED_STYLE, DATE_TIME_HEADER: DATE_TIME_STYLE}
+        column_styles.update((col, RED_STYLE) for col in data_frame.columns.values if DELTA_TEMPERATURE_HEADER in col)
+        data_sheet = workbook.create_data_sheet("Baking Data", column_styles)
+        for start in range(0, len(data_frame.index), EXCEL_CHUNK_SIZE):
+            self.report_progress(STYLE_STAGE)
+            data_sheet.append(data_frame.iloc[start:start + EXCEL_CHUNK_SIZE])
+        parameters = BakingGraphParameters(data_sheet.num_rows, trend_line_indexes, sensitivity_indexes)
+        self.show_excel(workbook, [data_sheet], parameters, self._graph_bake_results,
                         baking_coefficients=baking_coefficients)
 
     def _create_baking_coefficients(self, data_frame: pd.DataFrame) -> List[List[float]]:
-        baking_coefficients = []
-        for i in range(len(self.fbg_names)):
-            baking_coefficients.append(curve_fit_baking(data_frame, self._get_baking_wavelength_column(i)-1))
-        return baking_coefficients
+        wavelength_indexes = [self._get_baking_wavelength_column(i) - 1 for i in range(len(self.fbg_names))]
+        return curve_fit_baking(data_frame, wavelength_indexes)
 
     def _create_trend_lines(self, data_frame: pd.DataFrame, coefficients: List[List[float]]) -> List[int]:
         trend_line_indexes = []
@@ -110,33 +134,20 @@ class ExcelFileController:
         return sensitivity_indexes
 
     def create_calibration_excel(self):
-        data_frame = self.database_controller.to_data_frame()
-        data_collection = DataCollection()
-        data_collection.create(self.is_calibration, data_frame, self.fbg_names, self.main_queue)
-
-        real_point_data_frame = data_frame[data_frame[REAL_POINT_HEADER] == "True"]
+        workbook = ExcelWorkbook(self.fbg_names)
+        calibration_sheet = workbook.create_data_sheet("Cal")
+        full_sheet = workbook.create_data_sheet("Full Cal", {DATE_TIME_HEADER: DATE_TIME_STYLE})
+        real_point_data_frame = self._stream_full_calibration(full_sheet)
+        self.report_progress(COMPUTE_STAGE)
         cycles = list(set(real_point_data_frame[CYCLE_HEADER]))
         cycles.sort()
         del real_point_data_frame[REAL_POINT_HEADER]
         del real_point_data_frame[DATE_TIME_HEADER]
 
-        full_column_ordering = [DATE_TIME_HEADER, DELTA_TIME_HEADER, TEMPERATURE_HEADER]
-
-        add_times(data_frame, data_collection)
-        add_wavelength_power_columns(full_column_ordering, data_frame)
-        full_column_ordering.extend([CYCLE_HEADER, REAL_POINT_HEADER])
-        data_frame = data_frame[full_column_ordering]
-
         container = CalibrationExcelContainer(real_point_data_frame, cycles)
         calibration_data_frame = container.get_data_frame()
-        calibration_style_frame = self.create_style_frame(calibration_data_frame)
-        full_style_frame = self.create_style_frame(data_frame)
-        delta_temperature_headers = [col for col in data_frame.columns.values if DELTA_TEMPERATURE_HEADER in col]
-        full_style_frame.apply_column_style(cols_to_style=delta_temperature_headers,
-                                            styler_obj=Styler(font_color=utils.colors.red))
-        full_style_frame.apply_column_style(cols_to_style=[DATE_TIME_HEADER],
-                                            styler_obj=
-                                            Styler(number_format=utils.number_formats.date_time_with_seconds))
+        self.report_progress(STYLE_STAGE)
+        calibration_sheet.append(calibration_data_frame)
         first_column = "Temperature (K) Cycle {}".format(container.cycles[0])
         temperatures = calibration_data_frame[first_column].values
         parameters = CalibrationGraphParameters(len(calibration_data_frame.index), temperatures,
@@ -146,12 +157,40 @@ class ExcelFileController:
                                                 container.sensitivity_wavelength_indexes,
                                                 container.sensitivity_power_indexes,
                                                 container.master_temperature_column, container.mean_temperature_column)
+        parameters.data_frame = calibration_data_frame
         coefficients = [container.wavelength_mean_coefficients, container.power_mean_coefficients]
-        self.show_excel([calibration_style_frame, full_style_frame], ["Cal", "Full Cal"],
-                        parameters, self._graph_calibration_results, coefficients)
+        self.show_excel(workbook, [calibration_sheet, full_sheet], parameters, self._graph_calibration_results,
+                        coefficients)
+
+    def _stream_full_calibration(self, full_sheet: DataSheet) -> pd.DataFrame:
+        """
+        Streams every point of the calibration run to the full calibration sheet, EXCEL_CHUNK_SIZE points at a time.
+
+        :param full_sheet: the empty full calibration sheet
+        :returns: the real points of the run
+        :raises RuntimeError: If no points have been recorded for the run
+        """
+        real_point_data_frames = []  # type: List[pd.DataFrame]
+        full_column_ordering = []  # type: List[str]
+        start_time = 0.
+        for data_frame in self.database_controller.iter_data_frames(EXCEL_CHUNK_SIZE):
+            self.report_progress(QUERY_STAGE)
+            timestamps = data_frame[DATE_TIME_HEADER].values.astype(float)
+            if not full_column_ordering:
+                start_time = timestamps[0]
+                full_column_ordering = [DATE_TIME_HEADER, DELTA_TIME_HEADER, TEMPERATURE_HEADER]
+                add_wavelength_power_columns(full_column_ordering, data_frame)
+                full_column_ordering.extend([CYCLE_HEADER, REAL_POINT_HEADER])
+            real_point_data_frames.append(data_frame[data_frame[REAL_POINT_HEADER] == "True"])
+            data_frame[DELTA_TIME_HEADER] = (timestamps - start_time) / 60 / 60
+            data_frame[DATE_TIME_HEADER] = format_times(pd.to_datetime(timestamps, unit="s"))
+            full_sheet.append(data_frame[full_column_ordering])
+        if not full_column_ordering:
+            raise RuntimeError("No data has been collected yet")
+        return pd.concat(real_point_data_frames, ignore_index=True)
 
     def write_curve_fit_coefficients(self, coefficients_list: List[Tuple[List[List[float]], List[List[float]]]],
-                                     worksheet: Worksheet):
+                                     worksheet: BufferedSheet):
         if not len(coefficients_list[0]) or not len(coefficients_list[1]):
             return
 
@@ -167,7 +206,7 @@ class ExcelFileController:
                 worksheet.append([])
                 row += 1
 
-    def write_coefficients(self, worksheet: Worksheet, row: int, coefficients: List[List[float]],
+    def write_coefficients(self, worksheet: BufferedSheet, row: int, coefficients: List[List[float]],
                            derivative_coefficients: List[List[float]]=None, write_sensitivity: bool = False) -> int:
         sensitivity_header = "Sensitivity (pm/K)"
         drift_rate_header = "Drift Rate (mK/hr)"
@@ -243,45 +282,31 @@ class ExcelFileController:
             data_frame[delta_power_header] = delta_power
             column_ordering.append(delta_power_header)
 
-    def create_style_frame(self, data_frame: pd.DataFrame):
-        defaults = {'font_size': 14}
-        style_frame = StyleFrame(data_frame, styler_obj=Styler(**defaults, shrink_to_fit=False, wrap_text=False))
-
-        header_style = Styler(bold=True, font_size=18)
-        style_frame.set_column_width(columns=style_frame.columns, width=35)
-        style_frame.apply_headers_style(styler_obj=header_style)
-
-        for fbg_name, hex_color in zip(self.fbg_names, HEX_COLORS):
-            style_frame.apply_column_style(cols_to_style=[col for col in data_frame.columns.values if fbg_name in col],
-                                           styler_obj=Styler(bg_color=hex_color))
-        temperature_headers = [col for col in data_frame.columns.values if "Temperature" in col]
-        style_frame.apply_column_style(cols_to_style=temperature_headers,
-                                       styler_obj=Styler(font_color=utils.colors.red))
-        return style_frame
-
-    def show_excel(self, style_frames: List[StyleFrame], sheet_names: List[str], parameters: GraphParameters,
+    def show_excel(self, workbook: ExcelWorkbook, data_sheets: List[DataSheet], parameters: GraphParameters,
                    graph_results: Callable[[GraphParameters], None],
                    coefficients: List[Tuple[List[List[float]], List[List[float]]]]=None,
                    baking_coefficients: List[List[float]]=None):
-        excel_writer = StyleFrame.ExcelWriter(self.excel_file_path)
-        for style_frame, sheet_name in zip(style_frames, sheet_names):
-            style_frame.to_excel(excel_writer=excel_writer, row_to_add_filters=0, sheet_name=sheet_name)
+        for data_sheet in data_sheets:
+            data_sheet.add_filters()
 
         if coefficients is not None:
-            worksheet = excel_writer.book.create_sheet("Curve Fit")
+            worksheet = BufferedSheet()
             self.write_curve_fit_coefficients(coefficients, worksheet)
+            worksheet.write(workbook.create_sheet("Curve Fit"))
         if baking_coefficients is not None:
-            worksheet = excel_writer.book.create_sheet("Curve Fit")
+            worksheet = BufferedSheet()
             self.write_coefficients(worksheet, 1, baking_coefficients)
+            worksheet.write(workbook.create_sheet("Curve Fit"))
 
-        parameters.chart_sheet = excel_writer.book.create_sheet(title="Chart")
-        parameters.data_sheet = excel_writer.sheets[sheet_names[0]]
+        self.report_progress(CHARTS_STAGE)
+        parameters.chart_sheet = workbook.create_sheet("Chart")
+        parameters.data_sheet = data_sheets[0].worksheet
         graph_results(parameters)
 
-        excel_writer.book.create_sheet("Notes")
+        workbook.create_sheet("Notes")
 
-        excel_writer.save()
-        excel_writer.close()
+        self.report_progress(SAVE_STAGE)
+        workbook.save(self.excel_file_path)
         os.startfile('"{}"'.format(self.excel_file_path.replace("\\", "\\\\")))
 
     def _graph_calibration_results(self, calibration_parameters: CalibrationGraphParameters):
@@ -410,18 +435,52 @@ class ExcelFileController:
         return series
 
 
+def report_export_error(error: Exception, excel_file_name: str, main_queue: queue.Queue):
+    """
+    Logs an error raised by an export, and warns the user if the excel file is open in another program.
+
+    :param error: RuntimeError, or IndexError if the run has no data, PermissionError if the file is open
+    :param excel_file_name: name of the excel file being created
+    :param main_queue: queue used for writing log messages
+    """
+    if isinstance(error, PermissionError):
+        message = "Please close {}, before attempting to create a new copy of it.".format(excel_file_name)
+        main_queue.put(Message(MessageType.WARNING, "Excel File Creation Error", message))
+        messagebox.showwarning("Excel file is already opened", message)
+    else:
+        main_queue.put(Message(MessageType.WARNING, "Excel File Creation Error",
+                               "No data has been recorded yet, or the database has been corrupted."))
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+
 def add_times(data_frame: pd.DataFrame, data_collection: DataCollection):
-    data_frame[DATE_TIME_HEADER] = data_frame[DATE_TIME_HEADER] \
-        .apply(lambda x: x.tz_localize("UTC").tz_convert("US/Eastern").strftime("%m/%d/%y %I:%M %p"))
+    data_frame[DATE_TIME_HEADER] = format_times(pd.DatetimeIndex(data_frame[DATE_TIME_HEADER]))
     data_frame[DELTA_TIME_HEADER] = data_collection.times
 
 
+def format_times(times: pd.DatetimeIndex) -> List[str]:
+    return list(times.tz_localize("UTC").tz_convert("US/Eastern").strftime("%m/%d/%y %I:%M %p"))
+
+
 def add_wavelength_power_columns(column_ordering: List[str], data_frame: pd.DataFrame):
     wavelength_headers, power_headers = get_wavelength_power_headers(data_frame)
     column_ordering.extend(wavelength_headers)
     column_ordering.extend(power_headers)
 
 
+def add_range_columns(column_ordering: List[str], data_frame: pd.DataFrame, fbg_names: List[str]):
+    """
+    Adds the minimum, and maximum columns of the rollup buckets to the end of the column ordering, if the rows are
+    rollup buckets, so the sheet keeps the peaks the means of the buckets smooth away.
+    """
+    if MIN_TEMPERATURE_HEADER not in data_frame:
+        return
+    column_ordering.extend([MIN_TEMPERATURE_HEADER, MAX_TEMPERATURE_HEADER])
+    for fbg_name in fbg_names:
+        column_ordering.extend(header.format(fbg_name) for header in (MIN_WAVELENGTH_HEADER, MAX_WAVELENGTH_HEADER,
+                                                                       MIN_POWER_HEADER, MAX_POWER_HEADER))
+
+
 def add_baking_duplicate_columns(data_frame: pd.DataFrame, data_collection: DataCollection):
     data_frame[DELTA_TIME_HEADER1] = data_frame[DELTA_TIME_HEADER]
     data_frame[DELTA_TIME_HEADER2] = data_frame[DELTA_TIME_HEADER]
@@ -439,7 +498,7 @@ def get_wavelength_power_headers(data_frame: pd.DataFrame) -> Tuple[List[str], L
 
 
 def hex_to_rgb(hex_index: int) -> List[float]:
-    hex_string = HEX_COLORS[hex_index][1:]
+    hex_string = HEX_COLORS[hex_index % len(HEX_COLORS)][1:]
     rgb_list = []  # type: List[float]
     for i in range(0, len(hex_string), 2):
         hex_int = int(hex_string[i:i + 2], 16) / 255 * 100
@@ -504,9 +563,7 @@ def _add_series(chart: ScatterChart, index: int, temperature_column: int,
     if cycle is not None and series_parameters.extra_point_temperatures is not None:
         for temperature in series_parameters.extra_point_temperatures:
             for row_number in range(start_row, end_row+1):
-                column_letter = get_column_letter(temperature_column)
-                column = "{}{}".format(column_letter, row_number)
-                excel_temperature = series_parameters.data_sheet[column].value
+                excel_temperature = series_parameters.data_frame.iat[row_number - 2, temperature_column - 1]
                 if math.isclose(temperature, excel_temperature, abs_tol=.5):
                     extra_point_indexes.append(row_number - 1)
     for i in extra_point_indexes:
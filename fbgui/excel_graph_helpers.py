@@ -1,6 +1,7 @@
 import enum
 from typing import Optional, List
 
+import pandas as pd
 from openpyxl.worksheet import Worksheet
 
 from fbgui.constants import *
@@ -63,6 +64,7 @@ class GraphParameters:
     def __init__(self, num_rows: int):
         self.chart_sheet = None  # type: Worksheet
         self.data_sheet = None  # type: Worksheet
+        self.data_frame = None  # type: pd.DataFrame
         self.num_rows = num_rows
 
 
@@ -99,6 +101,7 @@ class SeriesParameters:
                  extra_point_temperatures: List[float]):
         self.indexes = indexes
         self.data_sheet = parameters.data_sheet
+        self.data_frame = parameters.data_frame
         self.last_row = parameters.num_rows + 1
         self.sub_type = sub_type
         self.cycles = parameters.cycles
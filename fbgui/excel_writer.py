@@ -0,0 +1,202 @@
+"""
+Streams the program data into write only openpyxl workbooks, rows are written to the worksheet's temporary file as
+they are appended, so the memory used by an export does not grow with the length of the run.
+"""
+import collections
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, Font, PatternFill, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet import Worksheet
+
+from fbgui.constants import HEX_COLORS
+
+COLUMN_WIDTH = 35
+HEADER_STYLE = "Header"
+DATA_STYLE = "Data"
+RED_STYLE = "Red Data"
+DATE_TIME_STYLE = "Date Time Data"
+FBG_STYLE = "FBG Data {}"
+
+
+def create_named_styles(number_of_fbgs: int) -> List[NamedStyle]:
+    """
+    Creates the named styles of the data columns, the header, the default data style, the red data style, the date
+    time style, and a background colored style for each fbg, fbgs past the last color reuse the colors in order.
+
+    :param number_of_fbgs: number of fbgs the colored styles are created for
+    :returns: the named styles to add to the workbook
+    """
+    side = Side(style="thin")
+    border = Border(left=side, right=side, top=side, bottom=side)
+    alignment = Alignment(horizontal="center", vertical="center", wrap_text=False, shrink_to_fit=False)
+
+    def style(name: str, font: Font=Font(name="Arial", size=14), fill: PatternFill=PatternFill(),
+              number_format: str="General") -> NamedStyle:
+        return NamedStyle(name=name, font=font, fill=fill, border=border, alignment=alignment,
+                          number_format=number_format)
+
+    styles = [style(HEADER_STYLE, font=Font(name="Arial", size=18, bold=True)), style(DATA_STYLE),
+              style(RED_STYLE, font=Font(name="Arial", size=14, color="FF0000")),
+              style(DATE_TIME_STYLE, number_format="DD/MM/YY HH:MM:SS")]
+    for i, hex_color in enumerate(HEX_COLORS[:number_of_fbgs]):
+        styles.append(style(FBG_STYLE.format(i), fill=PatternFill("solid", fgColor=hex_color[1:])))
+    return styles
+
+
+class DataSheet(object):
+    """
+    Write only worksheet of a data frame's rows, every cell of a column shares the column's named style, and the
+    rows are written through one reusable cell per column.
+
+    :ivar Worksheet worksheet: the write only worksheet
+    :ivar Callable[[str], str] get_style: returns the name of a column's style
+    :ivar List[str] columns: names of the columns, set by the first append
+    :ivar int num_rows: number of data rows written, not including the header
+    """
+
+    def __init__(self, worksheet: Worksheet, get_style: Callable[[str], str]):
+        """
+        :param worksheet: the write only worksheet
+        :param get_style: returns the name of a column's style
+        """
+        self.worksheet = worksheet
+        self.get_style = get_style
+        self.columns = None  # type: Optional[List[str]]
+        self.cells = []  # type: List[WriteOnlyCell]
+        self.num_rows = 0
+
+    def append(self, data_frame: pd.DataFrame):
+        """
+        Writes the rows of the data frame, the first call writes the header from the data frame's columns, and
+        later calls must have the same columns. NaN values are written as empty cells.
+
+        :param data_frame: rows to write
+        """
+        if self.columns is None:
+            self._write_header(data_frame.columns.values.tolist())
+        for row in data_frame.itertuples(index=False, name=None):
+            for cell, value in zip(self.cells, row):
+                cell.value = None if value != value else value
+            self.worksheet.append(self.cells)
+        self.num_rows += len(data_frame.index)
+
+    def _write_header(self, columns: List[str]):
+        self.columns = columns
+        for i in range(1, len(columns) + 1):
+            self.worksheet.column_dimensions[get_column_letter(i)].width = COLUMN_WIDTH
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(self.worksheet, value=column)
+            cell.style = HEADER_STYLE
+            header.append(cell)
+            cell = WriteOnlyCell(self.worksheet)
+            cell.style = self.get_style(column)
+            self.cells.append(cell)
+        self.worksheet.append(header)
+
+    def add_filters(self):
+        """Adds filters to the header row, over all of the written rows."""
+        if self.columns is not None:
+            self.worksheet.auto_filter.ref = "A1:{}{}".format(get_column_letter(len(self.columns)),
+                                                              self.num_rows + 1)
+
+
+class BufferedSheet(object):
+    """
+    Collects the rows, merged cells, and column widths of a small sheet written row by row, a write only sheet
+    needs its column widths before the first row is written.
+
+    :ivar List[List] rows: the appended rows
+    :ivar List[str] merged_cells: ranges of the merged cells
+    :ivar Dict[str, SimpleNamespace] column_dimensions: column letter mapped to its dimensions, only width is kept
+    """
+
+    def __init__(self):
+        self.rows = []  # type: List[List]
+        self.merged_cells = []  # type: List[str]
+        self.column_dimensions = collections.defaultdict(lambda: SimpleNamespace(width=None))
+
+    def append(self, values: List):
+        self.rows.append(values)
+
+    def merge_cells(self, range_string: str):
+        self.merged_cells.append(range_string)
+
+    def write(self, worksheet: Worksheet):
+        """
+        Writes the collected sheet to a write only worksheet.
+
+        :param worksheet: empty write only worksheet
+        """
+        for column, dimension in self.column_dimensions.items():
+            if dimension.width is not None:
+                worksheet.column_dimensions[column].width = dimension.width
+        for range_string in self.merged_cells:
+            worksheet.merged_cells.add(range_string)
+        for row in self.rows:
+            worksheet.append(row)
+
+
+class ExcelWorkbook(object):
+    """
+    Write only workbook of the program's data sheets, the column styles are added once as named styles.
+
+    :ivar Workbook workbook: the write only openpyxl workbook
+    :ivar List[str] fbg_names: serial numbers of the fbgs, columns containing one are colored with the fbg's color
+    """
+
+    def __init__(self, fbg_names: List[str]):
+        """
+        :param fbg_names: serial numbers of the fbgs
+        """
+        self.workbook = Workbook(write_only=True)
+        self.fbg_names = fbg_names
+        for style in create_named_styles(len(fbg_names)):
+            self.workbook.add_named_style(style)
+
+    def create_data_sheet(self, title: str, column_styles: Dict[str, str]=None) -> DataSheet:
+        """
+        Creates an empty data sheet, its columns are styled with column_style.
+
+        :param title: title of the sheet
+        :param column_styles: column name mapped to the name of its style, overrides the default styles
+        :returns: the empty data sheet
+        """
+        column_styles = column_styles or {}
+        return DataSheet(self.create_sheet(title), lambda column: self.column_style(column, column_styles))
+
+    def column_style(self, column: str, column_styles: Dict[str, str]) -> str:
+        """
+        Returns the name of a column's style, fbg columns are colored with the fbg's color, and temperature
+        columns are red, unless the column is in column_styles.
+
+        :param column: name of the column
+        :param column_styles: column name mapped to the name of its style
+        """
+        if column in column_styles:
+            return column_styles[column]
+        style = DATA_STYLE
+        for i, fbg_name in enumerate(self.fbg_names):
+            if fbg_name in column:
+                style = FBG_STYLE.format(i % len(HEX_COLORS))
+        if "Temperature" in column:
+            style = RED_STYLE
+        return style
+
+    def create_sheet(self, title: str) -> Worksheet:
+        """Creates an empty write only worksheet at the end of the workbook."""
+        return self.workbook.create_sheet(title=title)
+
+    def save(self, file_path: str):
+        """
+        Saves the workbook, a write only workbook can only be saved once.
+
+        :param file_path: path of the excel file
+        :raises PermissionError: If the file is open in another program
+        """
+        self.workbook.save(file_path)
@@ -1,2 +1,17 @@
+import sqlite3
+
+
 class ProgramStopped(Exception):
     pass
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class StreamStopped(Exception):
+    pass
+
+
+class RowsDropped(sqlite3.OperationalError):
+    pass
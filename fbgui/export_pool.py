@@ -0,0 +1,212 @@
+"""
+Runs the excel exports in worker processes, so the pandas, and openpyxl work does not compete with the Tk main loop
+for the GIL, and several runs can be exported at once.
+"""
+import multiprocessing
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from queue import Queue, Empty
+from typing import List, Dict, Optional
+
+from fbgui.constants import EXPORT_WORKERS
+from fbgui.excel_file_controller import ExcelFileController, report_export_error
+from fbgui.exceptions import ExportCancelled
+from fbgui.helpers import get_file_name
+from fbgui.messages import Message, MessageType
+
+
+class ExportJob(object):
+    """
+    Arguments of an export, pickled to the worker process, where the ExcelFileController, and its DatabaseController
+    are created from them.
+
+    :ivar str file_path: path of the excel file, also the name of the run in the database
+    :ivar List[str] fbg_names: serial numbers of the fbgs to export
+    :ivar str function_type: BAKING, or CAL
+    :ivar List[float] bake_sensitivity: baking sensitivity of each fbg, None if not set
+    :ivar List[float] extra_point_temperatures: temperatures of the extra calibration points, None if not set
+    """
+
+    def __init__(self, file_path: str, fbg_names: List[str], function_type: str,
+                 bake_sensitivity: List[float]=None, extra_point_temperatures: List[float]=None):
+        self.file_path = file_path
+        self.fbg_names = fbg_names
+        self.function_type = function_type
+        self.bake_sensitivity = bake_sensitivity
+        self.extra_point_temperatures = extra_point_temperatures
+
+
+class ExportProgress(object):
+    """
+    Progress callback of an export running in a worker process, posts each new stage to the progress queue, and
+    cancels the export once its cancel event is set.
+
+    :ivar str file_name: name of the excel file being created
+    :ivar Queue progress_queue: manager queue the stage messages are put on
+    :ivar threading.Event cancel_event: manager event set to cancel the export
+    :ivar str stage: the last stage posted
+    """
+
+    def __init__(self, file_name: str, progress_queue: Queue, cancel_event: threading.Event):
+        self.file_name = file_name
+        self.progress_queue = progress_queue
+        self.cancel_event = cancel_event
+        self.stage = None  # type: Optional[str]
+
+    def __call__(self, stage: str):
+        """
+        Called by the export at each stage, and for every chunk of a streamed stage.
+
+        :param stage: the stage the export has reached
+        :raises ExportCancelled: If the export has been cancelled
+        """
+        if self.cancel_event.is_set():
+            raise ExportCancelled("Creating {} was cancelled.".format(self.file_name))
+        if stage != self.stage:
+            self.stage = stage
+            self.progress_queue.put(Message(MessageType.INFO, "Excel Export",
+                                            "Creating {}: {}.".format(self.file_name, stage)))
+
+
+def run_export(job: ExportJob, progress_queue: Queue, cancel_event: threading.Event):
+    """
+    Runs an export in a worker process, errors are raised to the main process through the export's future.
+
+    :param job: arguments of the export
+    :param progress_queue: manager queue the stage, and log messages are put on
+    :param cancel_event: manager event set to cancel the export
+    """
+    progress = ExportProgress(get_file_name(job.file_path), progress_queue, cancel_event)
+    excel_controller = ExcelFileController(job.file_path, job.fbg_names, progress_queue, job.function_type,
+                                           bake_sensitivity=job.bake_sensitivity,
+                                           extra_point_temperatures=job.extra_point_temperatures, progress=progress)
+    excel_controller.export()
+
+
+class ExportPool(object):
+    """
+    Process pool the excel exports are run in. The worker processes, and the manager process sharing the progress
+    queue, and the cancel events with them are started by the first export. Progress messages, and the results of
+    finished exports are passed to the main queue by poll, which runs on the Tk main loop.
+
+    :ivar Queue main_queue: queue used for writing log messages
+    :ivar int max_workers: maximum number of exports run at once
+    :ivar ProcessPoolExecutor executor: the worker processes, None until the first export, or after they fail
+    :ivar multiprocessing.managers.SyncManager manager: process owning the progress queue, and the cancel events
+    :ivar Queue progress_queue: manager queue the workers put their messages on
+    :ivar Dict[Future, ExportJob] jobs: future mapped to the arguments of each queued, or running export
+    :ivar Dict[Future, threading.Event] cancel_events: future mapped to the manager event that cancels the export
+    """
+
+    def __init__(self, main_queue: Queue, max_workers: int=EXPORT_WORKERS):
+        """
+        :param main_queue: queue used for writing log messages
+        :param max_workers: maximum number of exports run at once
+        """
+        self.main_queue = main_queue
+        self.max_workers = max_workers
+        self.executor = None  # type: ProcessPoolExecutor
+        self.manager = None  # type: multiprocessing.managers.SyncManager
+        self.progress_queue = None  # type: Queue
+        self.jobs = {}  # type: Dict[Future, ExportJob]
+        self.cancel_events = {}  # type: Dict[Future, threading.Event]
+        self.lock = threading.Lock()
+
+    def submit(self, file_path: str, fbg_names: List[str], function_type: str, bake_sensitivity: List[float]=None,
+               extra_point_temperatures: List[float]=None) -> Optional[Future]:
+        """
+        Queues an export of the run, the run is not exported again while an export of it is queued, or running.
+
+        :param file_path: path of the excel file, also the name of the run in the database
+        :param fbg_names: serial numbers of the fbgs to export
+        :param function_type: BAKING, or CAL
+        :param bake_sensitivity: baking sensitivity of each fbg, None if not set
+        :param extra_point_temperatures: temperatures of the extra calibration points, None if not set
+        :returns: future of the export, None if the run is already being exported
+        """
+        job = ExportJob(file_path, fbg_names, function_type, bake_sensitivity, extra_point_temperatures)
+        with self.lock:
+            if any(queued_job.file_path == file_path for queued_job in self.jobs.values()):
+                self.main_queue.put(Message(MessageType.INFO, "Excel Export",
+                                            "{} is already being created.".format(get_file_name(file_path))))
+                return None
+            if self.manager is None:
+                self.manager = multiprocessing.Manager()
+                self.progress_queue = self.manager.Queue()
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            cancel_event = self.manager.Event()
+            future = self.executor.submit(run_export, job, self.progress_queue, cancel_event)
+            self.jobs[future] = job
+            self.cancel_events[future] = cancel_event
+        self.main_queue.put(Message(MessageType.INFO, "Excel Export",
+                                    "Queued {}.".format(get_file_name(file_path))))
+        return future
+
+    def cancel(self, file_path: str):
+        """
+        Cancels the export of the run, a queued export is removed, a running export stops at its next stage.
+
+        :param file_path: path of the excel file of the export
+        """
+        with self.lock:
+            for future, job in self.jobs.items():
+                if job.file_path == file_path:
+                    future.cancel()
+                    self.cancel_events[future].set()
+
+    def cancel_all(self):
+        """Cancels all of the queued, and running exports."""
+        with self.lock:
+            file_paths = [job.file_path for job in self.jobs.values()]
+        for file_path in file_paths:
+            self.cancel(file_path)
+
+    def poll(self):
+        """Passes the workers' messages to the main queue, and reports the exports that have finished."""
+        if self.progress_queue is None:
+            return
+        while True:
+            try:
+                self.main_queue.put(self.progress_queue.get_nowait())
+            except Empty:
+                break
+        with self.lock:
+            finished = [future for future in self.jobs if future.done()]
+            finished_jobs = [(future, self.jobs.pop(future)) for future in finished]
+            for future in finished:
+                del self.cancel_events[future]
+        for future, job in finished_jobs:
+            self._report(future, job)
+
+    def _report(self, future: Future, job: ExportJob):
+        file_name = get_file_name(job.file_path)
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or isinstance(error, ExportCancelled):
+            self.main_queue.put(Message(MessageType.INFO, "Excel Export", "Cancelled {}.".format(file_name)))
+        elif isinstance(error, BrokenProcessPool):
+            self.main_queue.put(Message(MessageType.ERROR, "Excel Export",
+                                        "The export process creating {} stopped unexpectedly.".format(file_name)))
+            with self.lock:
+                self.executor = None
+        elif isinstance(error, (RuntimeError, IndexError, PermissionError)):
+            report_export_error(error, file_name, self.main_queue)
+        elif error is not None:
+            self.main_queue.put(Message(MessageType.ERROR, "Excel Export",
+                                        "Failed to create {}: {}".format(file_name, error)))
+            traceback.print_exception(type(error), error, error.__traceback__)
+        else:
+            self.main_queue.put(Message(MessageType.INFO, "Excel Export", "Created {}.".format(file_name)))
+
+    def shutdown(self):
+        """Cancels the exports, and stops the worker, and manager processes without waiting for them."""
+        self.cancel_all()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        if self.manager is not None:
+            self.manager.shutdown()
+            self.manager = None
+            self.progress_queue = None
@@ -1,4 +1,7 @@
-"""Overrides the default matplotlib tkinter toolbar to add play and pause to the graph animation."""
+"""
+Overrides the default matplotlib tkinter toolbar to add play and pause to the graph animation, and to decimate the
+graph data again when the view limits change.
+"""
 from tkinter.ttk import Frame
 
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2TkAgg
@@ -55,3 +58,35 @@ class Toolbar(NavigationToolbar2TkAgg):
     def pause(self):
         """Pauses graph animation linked to button on toolbar."""
         self.graphing_helper.pause()
+
+    def home(self, *args):
+        """Resets the original view, and turns autoscaling back on so new data stays in view."""
+        super().home(*args)
+        for axis in self.figure_canvas.figure.axes:
+            axis.set_autoscale_on(True)
+        self.redraw_graphs()
+
+    def back(self, *args):
+        """Moves back to the previous view, and redraws the graphs for the new view limits."""
+        super().back(*args)
+        self.redraw_graphs()
+
+    def forward(self, *args):
+        """Moves forward to the next view, and redraws the graphs for the new view limits."""
+        super().forward(*args)
+        self.redraw_graphs()
+
+    def release_zoom(self, event):
+        """Zooms to the selected rectangle, and redraws the graphs for the new view limits."""
+        super().release_zoom(event)
+        self.redraw_graphs()
+
+    def release_pan(self, event):
+        """Finishes panning the axes, and redraws the graphs for the new view limits."""
+        super().release_pan(event)
+        self.redraw_graphs()
+
+    def redraw_graphs(self):
+        """Decimates the graph data again for the current view limits."""
+        if self.graphing_helper is not None:
+            self.graphing_helper.redraw()
@@ -1,41 +1,55 @@
 """Module used for handling the graphing using matplotlib."""
 import functools
-import gc
 import threading
 import time
 import uuid
 from queue import Queue
-from typing import Tuple, Callable, Union
+from typing import Tuple, Callable, Union, Optional
 
-import matplotlib.animation as animation
 import matplotlib.gridspec as gridspec
 import matplotlib.ticker as mtick
 import numpy as np
 from matplotlib import style
+from matplotlib.artist import Artist
 from matplotlib.axes import Axes
-from matplotlib.backend_bases import MouseEvent
+from matplotlib.backend_bases import MouseEvent, TimerBase
+from matplotlib.collections import PathCollection
+from matplotlib.lines import Line2D
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
 from fbgui.config_controller import *
-from fbgui.data_container import DataCollection
+from fbgui.data_container import DataCollection, DataCollectionBuffer
 from fbgui.database_controller import DatabaseController
 from fbgui.graph_toolbar import Toolbar
 from fbgui.main_program import Application
 from fbgui.messages import MessageType, Message
+from fbgui.sql import close_reader
+from fbgui.timing import timed, time_stage
 
 style.use("kyton")
 
+#: Number of min/max buckets per pixel of axes width used when decimating a series for plotting
+BUCKETS_PER_PIXEL = 1
+
 
 class Graph(object):
     """
     Class describes a specific graph that can be represented as a subplot or a main plot.
 
+    The graph's lines and scatter plots are created once, and each update only sets their data. If the axes limits
+    are unchanged by the update only the animated artists are redrawn, by blitting them onto the cached background
+    of the axes, otherwise the whole canvas is redrawn.
+
     :ivar sub_dims: dimensions for the sub graph, first index of the dims parameter
     :ivar zoom_dims: dimensions for the zoom graph, all dimensions after the first in the dims list parameter
     :ivar sub_axis: Axes object for the sub graph that is plotted in the graph page grid
-    :ivar anim: FuncAnimation object when using the animate_func function parameter to animate the graph
+    :ivar timer: matplotlib timer used for calling update to animate the graph
     :ivar zoom_axes: list of the axes objects for the zoomed graph
+    :ivar axes: the axes currently being animated, the sub axis or the zoom axes
+    :ivar artists: the animated artists on the axes, None if they have not been created yet
+    :ivar backgrounds: cached backgrounds of the axes, captured after the last full canvas draw
+    :ivar limits: the x, and y limits of each of the axes when the backgrounds were cached
     """
 
     def __init__(self, title: str, xlabel: str, ylabels: Tuple[str], animate_func: Callable, fig: Figure,
@@ -67,54 +81,47 @@ class Graph(object):
         self.fig = fig
         self.database_controller = database_controller
         self.sub_axis = None  # type: Axes
-        self.anim = None  # type: animation.FuncAnimation
+        self.timer = None  # type: TimerBase
         self.snums = snums
         self.zoom_axes = []  # type: List[Axes]
+        self.axes = ()  # type: Tuple[Axes, ...]
+        self.artists = None  # type: List[Artist]
+        self.backgrounds = []  # type: list
+        self.limits = []  # type: List[Tuple[Tuple[float, float], Tuple[float, float]]]
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
         self.show_sub()
 
     def pause(self):
         """Pauses the graph animation."""
-        self.anim.event_source.stop()
+        self.timer.stop()
 
     def play(self):
         """Plays the graph animation."""
-        self.anim.event_source.start()
+        self.timer.start()
+
+    def stop(self):
+        """Stops animating the graph, used when the graph's axes are removed from the figure."""
+        if self.timer is not None:
+            self.timer.stop()
+        self.axes = ()
+        self.artists = None
+        self.backgrounds = []
 
     def show_sub(self):
         """Show the graph as a subplot in the grid."""
-        if self.anim is not None:
-            self.anim.event_source.stop()
-
+        self.stop()
         for axis in self.zoom_axes:
             axis.cla()
         self.zoom_axes = []
         self.sub_axis = self.fig.add_subplot(self.sub_dims)
-        self.anim = animation.FuncAnimation(self.fig, self.sub_graph, interval=7500, save_count=0)
-
-    def sub_graph(self, _):
-        """Graph the subplot."""
-        self.sub_axis.clear()
-        gc.collect()
         self.sub_axis.set_title(self.title, fontsize=12)
         self.sub_axis.set_xlabel(self.xlabel)
         self.sub_axis.set_ylabel(self.ylabels[0])
-        axes_tuple = (self.sub_axis,)
-        self.check_val_file(axes_tuple)
-
-    def check_val_file(self, axes_tuple: Tuple[Axes, ...]):
-        """
-        Checks whether the currently configured file name is a program stored in the map sql table, and starts
-        the animation if it is.
-
-        :param axes_tuple: tuple of matplotlib Axes objects, that will be graphed using the animate function if
-                           the program exists
-        """
-        if self.database_controller.program_exists():
-            self.animate_func(axes_tuple, self.snums, self.is_cal)
+        self.start_animation((self.sub_axis,))
 
     def show_main(self):
         """Show the graph as the main plot."""
-        self.anim.event_source.stop()
+        self.stop()
         if self.sub_axis is not None:
             self.sub_axis.cla()
         self.zoom_axes = []
@@ -130,14 +137,8 @@ class Graph(object):
             else:
                 share = self.fig.add_subplot(dim, sharex=share)
             self.zoom_axes.append(share)
-        self.anim = animation.FuncAnimation(self.fig, self.main_graph, interval=7500, save_count=0)
 
-    def main_graph(self, _):
-        """Graph the main plot."""
         try:
-            for axis in self.zoom_axes:
-                axis.clear()
-            gc.collect()
             self.zoom_axes[0].set_title(self.title, fontsize=18)
             if len(self.zoom_axes) > 1:
                 self.zoom_axes[1].set_xlabel(self.xlabel)
@@ -148,11 +149,80 @@ class Graph(object):
             for i, ylabel in enumerate(self.ylabels):
                 self.zoom_axes[i].set_ylabel(ylabel)
                 self.zoom_axes[i].yaxis.label.set_fontsize(16)
-
-            axes_tuple = tuple(self.zoom_axes)
-            self.check_val_file(axes_tuple)
         except IndexError as i:
             self.main_queue.put(Message(MessageType.DEVELOPER, "Main Graph Error Dump", str(i)))
+        self.start_animation(tuple(self.zoom_axes))
+
+    def start_animation(self, axes: Tuple[Axes, ...]):
+        """
+        Starts animating the axes, the artists are created on the first update.
+
+        :param axes: the axes to animate
+        """
+        self.axes = axes
+        self.artists = None
+        self.backgrounds = []
+        self.limits = []
+        self.timer = self.fig.canvas.new_timer(interval=7500)
+        self.timer.add_callback(self.update)
+        self.timer.start()
+        self.update()
+
+    def is_shown(self) -> bool:
+        """Returns True if the graph's axes are currently in the figure, False otherwise."""
+        return bool(self.axes) and all(axis in self.fig.axes for axis in self.axes)
+
+    @timed("graph.update")
+    def update(self):
+        """
+        Updates the artists with the latest data, blits the artists if the axes limits have not changed, otherwise
+        redraws the canvas.
+        """
+        if not self.is_shown() or not self.database_controller.program_exists():
+            return
+        try:
+            artists = self.animate_func(self.axes, self.snums, self.is_cal, self.artists)
+        except IndexError as i:
+            self.main_queue.put(Message(MessageType.DEVELOPER, "Graph Update Error Dump", str(i)))
+            return
+        if artists is None:
+            return
+        self.artists = artists
+
+        for axis in self.axes:
+            axis.relim()
+        for artist in self.artists:
+            if isinstance(artist, PathCollection) and len(artist.get_offsets()):
+                artist.axes.update_datalim(artist.get_offsets())
+        for axis in self.axes:
+            axis.autoscale_view()
+        limits = [(axis.get_xlim(), axis.get_ylim()) for axis in self.axes]
+
+        if self.backgrounds and limits == self.limits:
+            self.blit()
+        else:
+            self.fig.canvas.draw_idle()
+
+    def on_draw(self, _):
+        """Caches the axes backgrounds after a full canvas draw, and draws the animated artists on top of them."""
+        if self.artists is None or not self.is_shown():
+            self.backgrounds = []
+            return
+        canvas = self.fig.canvas
+        self.backgrounds = [canvas.copy_from_bbox(axis.bbox) for axis in self.axes]
+        self.limits = [(axis.get_xlim(), axis.get_ylim()) for axis in self.axes]
+        for artist in self.artists:
+            artist.axes.draw_artist(artist)
+
+    def blit(self):
+        """Restores the cached axes backgrounds, and redraws only the animated artists."""
+        canvas = self.fig.canvas
+        for axis, background in zip(self.axes, self.backgrounds):
+            canvas.restore_region(background)
+            for artist in self.artists:
+                if artist.axes is axis:
+                    axis.draw_artist(artist)
+            canvas.blit(axis.bbox)
 
 
 class Graphing:
@@ -240,24 +310,48 @@ class Graphing:
         self.toolbar.update()
 
     def update_data_coll(self):
-        """Updates the data collections used for graphing the data from the sql table, every 8 seconds."""
+        """
+        Updates the data collections used for graphing the data from the sql table, every 8 seconds. Only the rows
+        recorded since the last update are read, and the collection is rebuilt if the program table changes. Once a
+        baking run is long enough for a rollup to have GRAPH_ROLLUP_POINTS buckets, the coarsest such rollup is
+        graphed instead of the raw points. The thread's reader connection is closed once it stops.
+        """
         thread_id = uuid.uuid4()
         self.master.thread_map[thread_id] = True
         self.master.graph_threads.append(thread_id)
+        data_buffer = None  # type: DataCollectionBuffer
+        revision = None
         while self.master.thread_map[thread_id]:
             try:
-                df = self.database_controller.to_data_frame()
-                if self.is_cal:
-                    Graphing.data_coll_cal = DataCollection()
-                    Graphing.data_coll_cal.create(self.is_cal, df)
-                else:
-                    Graphing.data_coll = DataCollection()
-                    Graphing.data_coll.create(self.is_cal, df)
+                with time_stage("graphing.update_data_coll"):
+                    resolution = self.database_controller.get_rollup_resolution(GRAPH_ROLLUP_POINTS)
+                    if resolution is not None:
+                        data_buffer = None
+                        data_coll = DataCollection()
+                        data_coll.create(self.is_cal, self.database_controller.get_rollup_rows(resolution),
+                                         self.database_controller.fbg_names, self.main_queue)
+                    else:
+                        if data_buffer is None or revision != self.database_controller.revision:
+                            revision = self.database_controller.revision
+                            data_buffer = DataCollectionBuffer(self.is_cal)
+                        data_buffer.append(self.database_controller.get_new_rows(data_buffer.last_id))
+                        data_coll = data_buffer.snapshot()
+                    if self.is_cal:
+                        Graphing.data_coll_cal = data_coll
+                    else:
+                        Graphing.data_coll = data_coll
             except RuntimeError as r:
                 self.main_queue.put(Message(MessageType.DEVELOPER, "Graphing Update Data Coll Error Dump", str(r)))
-            except IndexError as i:
-                self.main_queue.put(Message(MessageType.DEVELOPER, "Graphing Update Data Coll Error Dump", str(i)))
+            except (IndexError, KeyError) as e:
+                data_buffer = None
+                self.main_queue.put(Message(MessageType.DEVELOPER, "Graphing Update Data Coll Error Dump", str(e)))
             time.sleep(8)
+        close_reader()
+
+    def redraw(self):
+        """Updates the shown graphs immediately, used to decimate the data again after the view limits change."""
+        for graph in self.graphs:
+            graph.update()
 
     def update_axes(self):
         """Update the axes to include the sub plots on the graphing page."""
@@ -284,7 +378,7 @@ class Graphing:
         :param event: MouseEvent object passed in on click
         """
         if event is None or event.dblclick:
-            self.figure.clf()
+            self.clear_figure()
             for graph in self.graphs:
                 graph.show_sub()
 
@@ -305,16 +399,22 @@ class Graphing:
         """
         self.update_axes()
         if isinstance(event, int):
-            self.figure.clf()
+            self.clear_figure()
             self.graphs[event].show_main()
             self.setup_click_listener()
         else:
             for i, axis in enumerate(self.sub_axes):
                 if event.dblclick and axis == event.inaxes:
-                    self.figure.clf()
+                    self.clear_figure()
                     self.graphs[i].show_main()
                     self.setup_click_listener()
 
+    def clear_figure(self):
+        """Stops animating all of the graphs, and removes their axes from the figure."""
+        for graph in self.graphs:
+            graph.stop()
+        self.figure.clf()
+
     def setup_click_listener(self):
             self.canvas.mpl_disconnect(self.cid)
             self.cid = self.canvas.mpl_connect('button_press_event', self.show_subplots)
@@ -328,11 +428,15 @@ def animate_graph(use_snums: bool) -> Callable:
     """
     Animate graph function decorator.
 
+    The decorated function is passed the artists it returned on the previous update, or None on the first update,
+    and returns the artists it created or updated.
+
     :param use_snums: If True the function being decorated accepts serial nums as an argument
     """
     def _animate_graph(func: Callable) -> Callable:
         @functools.wraps(func)
-        def _wrapper(axes: List[Axes], snums: List[str], is_cal: bool):
+        def _wrapper(axes: List[Axes], snums: List[str], is_cal: bool,
+                     artists: Optional[List[Artist]]) -> Optional[List[Artist]]:
             dc = Graphing.data_coll
             if is_cal:
                 dc = Graphing.data_coll_cal
@@ -340,136 +444,275 @@ def animate_graph(use_snums: bool) -> Callable:
                 if use_snums:
                     if snums is not None and not len(snums):
                         snums = get_configured_fbg_names(is_cal)
-                    func(axes, snums, dc)
+                    return func(axes, snums, dc, artists)
                 else:
-                    func(axes, dc)
+                    return func(axes, dc, artists)
+            return artists
         return _wrapper
     return _animate_graph
 
 
 @animate_graph(False)
-def average_wave_graph(axes: List[Axes], dc: DataCollection):
+def average_wave_graph(axes: List[Axes], dc: DataCollection, lines: List[Line2D]) -> List[Line2D]:
     """
     Animate function for the mean wavelength vs. time graph.
 
     :param axes: average wavelength Axes as only element
     :param dc: data collection object to use for populating the graph
+    :param lines: lines created by the previous update, None on the first update
+    :return: the updated lines
     """
+    if lines is None:
+        lines = [create_line(axes[0])]
     times, wavelength_diffs = dc.times, dc.mean_delta_wavelengths_pm
     if len(times) == len(wavelength_diffs):
-        axes[0].plot(times, wavelength_diffs)
+        set_line_data(lines[0], times, wavelength_diffs)
+    return lines
 
 
 @animate_graph(True)
-def wave_power_graph(axis: List[Axes], snums: List[str], dc: DataCollection):
+def wave_power_graph(axis: List[Axes], snums: List[str], dc: DataCollection,
+                     scatters: List[PathCollection]) -> List[PathCollection]:
     """
     Animate function for the wavelength vs. power graph.
 
     :param axis: wavelength vs power Axes as only element
     :param snums: the serial numbers in use for the corresponding program run being graphed
     :param dc: data collection object to use for populating the graph
+    :param scatters: scatter plots created by the previous update, None on the first update
+    :return: the updated scatter plots
     """
     wavelengths, powers = dc.wavelengths, dc.powers
-    idx = 0
-    axes = []
-    for waves, powers, color in zip(wavelengths, powers, HEX_COLORS):
-        if len(waves) == len(powers):
-            axes.append(axis[0].scatter(waves, powers, color=color, s=75))
-        idx += 1
+    colors = [HEX_COLORS[i % len(HEX_COLORS)] for i in range(len(wavelengths))]
+    if scatters is None or len(scatters) != len(colors):
+        remove_artists(scatters)
+        scatters = [axis[0].scatter([], [], color=color, s=75, animated=True) for color in colors]
+        font_size = 8
+        legend = axis[0].legend(scatters, snums, bbox_to_anchor=(.5, 1.25), loc='upper center',
+                                ncol=int(len(snums) / 2 + 0.5),
+                                fontsize=font_size, fancybox=True, shadow=True)
+        for text in legend.get_texts():
+            text.set_color("black")
 
-    font_size = 8
-    legend = axis[0].legend(axes, snums, bbox_to_anchor=(.5, 1.25), loc='upper center',
-                            ncol=int(len(snums) / 2 + 0.5),
-                            fontsize=font_size, fancybox=True, shadow=True)
-    for text in legend.get_texts():
-        text.set_color("black")
+    for scatter, waves, pows in zip(scatters, wavelengths, powers):
+        if len(waves) == len(pows):
+            scatter.set_offsets(np.column_stack((waves, pows)))
+    return scatters
 
 
 @animate_graph(False)
-def temp_graph(axes: List[Axes], dc: DataCollection):
+def temp_graph(axes: List[Axes], dc: DataCollection, lines: List[Line2D]) -> List[Line2D]:
     """
     Animate function for the temperature vs. time graph.
 
     :param axes: delta temperature vs. time Axes, raw temperature vs time Axes
     :param dc: data collection object to use for populating the graph
+    :param lines: lines created by the previous update, None on the first update
+    :return: the updated lines
     """
+    if lines is None:
+        lines = [create_line(axes[0])]
+        if len(axes) > 1:
+            lines.append(create_line(axes[1], color='b'))
     times, temp_diffs, temps = dc.times, dc.delta_temps, dc.temps
+    if len(dc.temp_ranges) and len(times) == len(dc.temp_ranges):
+        temp_diffs, temps = dc.delta_temp_ranges, dc.temp_ranges
     if len(times) == len(temp_diffs):
-        axes[0].plot(times, temp_diffs)
-    if len(axes) > 1 and len(times) == len(temps):
-        axes[1].plot(times, temps, color='b')
+        set_range_data(lines[0], times, temp_diffs)
+    if len(lines) > 1 and len(times) == len(temps):
+        set_range_data(lines[1], times, temps)
+    return lines
 
 
 @animate_graph(False)
-def average_power_graph(axis: List[Axes], dc: DataCollection):
+def average_power_graph(axis: List[Axes], dc: DataCollection, lines: List[Line2D]) -> List[Line2D]:
     """
     Animate function for the mean power vs. time graph.
 
     :param axis: average power Axes as only element
     :param dc: data collection object to use for populating the graph
+    :param lines: lines created by the previous update, None on the first update
+    :return: the updated lines
     """
+    if lines is None:
+        axis[0].yaxis.set_major_formatter(mtick.FuncFormatter(formatter))
+        lines = [create_line(axis[0])]
     times, power_diffs = dc.times, dc.mean_delta_powers
     if len(times) == len(power_diffs):
-        axis[0].yaxis.set_major_formatter(mtick.FuncFormatter(formatter))
-        axis[0].plot(times, power_diffs)
+        set_line_data(lines[0], times, power_diffs)
+    return lines
 
 
 @animate_graph(True)
-def wave_graph(axis: List[Axes], snums: List[str], dc: DataCollection):
+def wave_graph(axis: List[Axes], snums: List[str], dc: DataCollection, lines: List[Line2D]) -> List[Line2D]:
     """
     Animate function for the individual wavelengths graph.
 
     :param axis: delat wavelength vs. time Axes, wavelength vs. time Axes
     :param snums: the serial numbers in use for the corresponding program run being graphed
     :param dc: data collection object to use for populating the graph
+    :param lines: lines created by the previous update, None on the first update
+    :return: the updated lines
     """
-    times, wavelengths, wavelength_diffs = dc.times, dc.wavelengths, dc.delta_wavelengths_pm
-    idx = 0
-    axes = []
-    for waves, wave_diffs, color in zip(wavelengths, wavelength_diffs, HEX_COLORS):
-        if len(times) == len(wave_diffs):
-            axes.append(axis[0].plot(times, wave_diffs, color=color)[0])
-        if len(axis) > 1 and len(times) == len(waves):
-            axis[1].plot(times, waves, color=color)
-        idx += 1
-
-    create_legend(axis, snums, axes)
+    return fbg_lines_graph(axis, snums, dc.times, dc.delta_wavelengths_pm, dc.wavelengths, lines,
+                           dc.delta_wavelength_ranges_pm, dc.wavelength_ranges)
 
 
 @animate_graph(True)
-def power_graph(axis: List[Axes], snums: List[str], dc: DataCollection):
+def power_graph(axis: List[Axes], snums: List[str], dc: DataCollection, lines: List[Line2D]) -> List[Line2D]:
     """
     Animate function for the individual powers graph.
 
     :param axis: delta power vs. time Axes, raw power vs. time Axes [Only used for Baking]
     :param snums: the serial numbers in use for the corresponding program run being graphed
     :param dc: data collection object to use for populating the graph
+    :param lines: lines created by the previous update, None on the first update
+    :return: the updated lines
     """
-    times, powers, power_diffs = dc.times, dc.powers, dc.delta_powers
-    idx = 0
-    axes = []
-    for pows, pow_diffs, color in zip(powers, power_diffs, HEX_COLORS):
-        if len(times) == len(pow_diffs):
-            axes.append(axis[0].plot(times, pow_diffs, color=color)[0])
-        if len(axis) > 1 and len(times) == len(pows):
-            axis[1].plot(times, pows, color=color)
-        idx += 1
-    create_legend(axis, snums, axes)
+    return fbg_lines_graph(axis, snums, dc.times, dc.delta_powers, dc.powers, lines, dc.delta_power_ranges,
+                           dc.power_ranges)
 
 
 @animate_graph(False)
-def drift_rate_graph(axes: List[Axes], dc: DataCollection):
+def drift_rate_graph(axes: List[Axes], dc: DataCollection, lines: List[Line2D]) -> List[Line2D]:
     """
     Animate function for the drift rates graph.
 
     :param axes: drift rate vs. time Axes, delta drift rate vs. time Axes [Only for Calibration]
     :param dc: data collection object to use for populating the graph
+    :param lines: lines created by the previous update, None on the first update
+    :return: the updated lines
     """
+    if lines is None:
+        lines = [create_line(axis) for axis in axes[:2]]
     times, drates, delta_drates = __get_drift_rates(dc)
     if len(times) == len(drates):
-        axes[0].plot(times, drates)
-    if len(axes) > 1 and len(times) == len(delta_drates):
-        axes[1].plot(times, delta_drates)
+        set_line_data(lines[0], times, drates)
+    if len(lines) > 1 and len(times) == len(delta_drates):
+        set_line_data(lines[1], times, delta_drates)
+    return lines
+
+
+def fbg_lines_graph(axis: List[Axes], snums: List[str], times: np.ndarray, deltas: np.ndarray,
+                    values: np.ndarray, lines: List[Line2D], delta_ranges: np.ndarray=None,
+                    value_ranges: np.ndarray=None) -> List[Line2D]:
+    """
+    Updates one line per fbg of the delta values on the first axes, and of the values on the second axes if it
+    exists, the lines are recreated if the number of fbgs changes. If the ranges of rollup buckets are given the
+    lines are drawn through each bucket's minimum, and maximum instead of its mean.
+
+    :param axis: delta values vs. time Axes, values vs. time Axes
+    :param snums: the serial numbers in use for the corresponding program run being graphed
+    :param times: delta times in hours
+    :param deltas: 2D array of delta values, one row per fbg
+    :param values: 2D array of values, one row per fbg
+    :param lines: lines created by the previous update, None on the first update
+    :param delta_ranges: 3D array of the (minimum, maximum) delta values of each fbg's points, empty if there are none
+    :param value_ranges: 3D array of the (minimum, maximum) values of each fbg's points, empty if there are none
+    :return: the updated lines, the delta lines followed by the value lines
+    """
+    colors = [HEX_COLORS[i % len(HEX_COLORS)] for i in range(len(deltas))]
+    number_of_lines = len(colors) * min(len(axis), 2)
+    if lines is None or len(lines) != number_of_lines:
+        remove_artists(lines)
+        lines = [create_line(axis[0], color=color) for color in colors]
+        create_legend(axis, snums, lines)
+        if len(axis) > 1:
+            lines += [create_line(axis[1], color=color) for color in colors]
+
+    if delta_ranges is not None and len(delta_ranges) and len(delta_ranges) == len(deltas):
+        deltas = delta_ranges
+    if value_ranges is not None and len(value_ranges) and len(value_ranges) == len(values):
+        values = value_ranges
+    for line, delta in zip(lines, deltas):
+        if len(times) == len(delta):
+            set_range_data(line, times, delta)
+    for line, value in zip(lines[len(colors):], values):
+        if len(times) == len(value):
+            set_range_data(line, times, value)
+    return lines
+
+
+def set_range_data(line: Line2D, times: np.ndarray, values: np.ndarray):
+    """
+    Sets the data of a time series line, as set_line_data, if the values are the (minimum, maximum) ranges of
+    rollup buckets, the line goes through both ends of each bucket's range, so peaks inside the buckets are shown.
+
+    :param line: the line to set the data of
+    :param times: sorted times of the series
+    :param values: values of the series, or (time, 2) ranges of the series
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 2:
+        times = np.repeat(times, 2)
+        values = values.reshape(-1)
+    set_line_data(line, times, values)
+
+
+def set_line_data(line: Line2D, times: np.ndarray, values: np.ndarray):
+    """
+    Sets the data of a time series line, decimated to the min and max value in each bucket of the visible time
+    range, with BUCKETS_PER_PIXEL buckets per pixel of the axes width. The whole series is decimated if the axes
+    are autoscaling, otherwise only the range the user zoomed, or panned to.
+
+    :param line: the line to set the data of
+    :param times: sorted times of the series
+    :param values: values of the series
+    """
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    axis = line.axes
+    start, end = 0, len(times)
+    if not axis.get_autoscalex_on():
+        x_min, x_max = sorted(axis.get_xlim())
+        start = max(int(np.searchsorted(times, x_min)) - 1, 0)
+        end = min(int(np.searchsorted(times, x_max, side="right")) + 1, len(times))
+    number_of_buckets = max(int(axis.bbox.width * BUCKETS_PER_PIXEL), 1)
+    indexes = min_max_indexes(values[start:end], number_of_buckets) + start
+    line.set_data(times[indexes], values[indexes])
+
+
+def min_max_indexes(values: np.ndarray, number_of_buckets: int) -> np.ndarray:
+    """
+    Returns the sorted indexes of the minimum and maximum value in each of number_of_buckets equal sized buckets
+    of the values, so peaks are kept when the values are decimated. The first, and last indexes are always included.
+
+    :param values: the values to decimate
+    :param number_of_buckets: the number of buckets to split the values into
+    :return: sorted indexes of the values to keep, all of the indexes if there are less than two values per bucket
+    """
+    if len(values) <= 2 * number_of_buckets:
+        return np.arange(len(values))
+    bucket_size = int(np.ceil(len(values) / number_of_buckets))
+    number_of_full_buckets = len(values) // bucket_size
+    buckets = values[:number_of_full_buckets * bucket_size].reshape(number_of_full_buckets, bucket_size)
+    bucket_starts = np.arange(number_of_full_buckets) * bucket_size
+    remainder = np.arange(number_of_full_buckets * bucket_size, len(values))
+    indexes = np.concatenate((bucket_starts + buckets.argmin(axis=1), bucket_starts + buckets.argmax(axis=1),
+                              remainder, [0, len(values) - 1]))
+    return np.unique(indexes)
+
+
+def create_line(axis: Axes, **kwargs) -> Line2D:
+    """
+    Creates an empty animated line on the axis, the line is only drawn by the graph's blit, and draw handlers.
+
+    :param axis: the axes to add the line to
+    :param kwargs: additional line properties, such as the color
+    :return: the created line
+    """
+    return axis.plot([], [], animated=True, **kwargs)[0]
+
+
+def remove_artists(artists: Optional[List[Artist]]):
+    """
+    Removes the artists from their axes.
+
+    :param artists: artists to remove, if None nothing is removed
+    """
+    if artists is not None:
+        for artist in artists:
+            artist.remove()
 
 
 def __get_drift_rates(dc: DataCollection) -> Tuple[List[float], List[float], List[float]]:
@@ -1,6 +1,52 @@
-from typing import List
+"""Accumulates the SM125 readings of each fbg, and reduces them to per fbg statistics as they are added."""
+from typing import List, Dict, Tuple
 
-from fbgui.helpers import average
+import numpy as np
+
+
+class RunningStatistics(object):
+    """
+    Streaming mean, and variance of a fixed number of slots using Welford's algorithm, the readings are not stored.
+
+    :ivar np.ndarray count: number of readings added to each slot
+    :ivar np.ndarray mean: running mean of each slot, 0 for slots without readings
+    :ivar np.ndarray m2: running sum of squared differences from the mean of each slot
+    """
+
+    def __init__(self, size: int):
+        """
+        Creates the statistics for size slots.
+
+        :param size: number of slots
+        """
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size, dtype=np.float64)
+        self.m2 = np.zeros(size, dtype=np.float64)
+
+    def add(self, start: int, values: np.ndarray, mask: np.ndarray=None):
+        """
+        Adds one reading to each of the consecutive slots starting at start.
+
+        :param start: index of the first slot to add to
+        :param values: one reading for each slot
+        :param mask: True for each slot whose reading is added, the readings of the other slots are skipped, all of
+                     the readings are added if None
+        """
+        slots = np.arange(start, start + len(values))
+        if mask is not None:
+            slots = slots[mask]
+            values = values[mask]
+        self.count[slots] += 1
+        delta = values - self.mean[slots]
+        self.mean[slots] += delta / self.count[slots]
+        self.m2[slots] += delta * (values - self.mean[slots])
+
+    def std(self) -> np.ndarray:
+        """Returns the sample standard deviation of each slot, 0 for slots with less than two readings."""
+        variance = np.zeros_like(self.m2)
+        has_spread = self.count > 1
+        variance[has_spread] = self.m2[has_spread] / (self.count[has_spread] - 1)
+        return np.sqrt(variance)
 
 
 class LaserData:
@@ -8,29 +54,64 @@ class LaserData:
     def __init__(self, switch_positions: List[List[int]], switch_channel_index):
         self.switch_positions = switch_positions
         self.switch_channel = switch_channel_index
-        self._wavelengths = [[[] for _ in range(len(position_list))] for position_list in switch_positions]
-        self._powers = [[[] for _ in range(len(position_list))] for position_list in switch_positions]
+        self.slots = [position_slots(position_list) for position_list in switch_positions]
+        self._wavelengths = [RunningStatistics(len(position_list)) for position_list in switch_positions]
+        self._powers = [RunningStatistics(len(position_list)) for position_list in switch_positions]
+        self._dropouts = [np.zeros(len(position_list), dtype=np.int64) for position_list in switch_positions]
+        self._missing = [np.zeros(len(position_list), dtype=bool) for position_list in switch_positions]
 
     def add_wavelengths(self, channel: int, wavelengths: List[float], position: int):
-        if channel != self.switch_channel:
-            position = 0
-        self._add(channel, wavelengths, position, self._wavelengths)
+        """
+        Adds one scan's wavelengths, fbgs without a peak in the scan, or with a 0 nm. peak count as dropouts, and are
+        left out of the fbg's mean, and deviation.
+        """
+        start, end, values = self._slot_values(channel, wavelengths, position)
+        missing = np.ones(end - start, dtype=bool)
+        missing[:len(values)] = values == 0
+        self._dropouts[channel][start:end] += missing
+        self._missing[channel][start:end] = missing
+        self._wavelengths[channel].add(start, values, ~missing[:len(values)])
 
     def add_powers(self, channel: int, powers: List[float], position: int):
-        if channel != self.switch_channel:
-            position = 0
-        self._add(channel, powers, position, self._powers)
+        """Adds one scan's powers, the powers of the fbgs that dropped out of the scan's wavelengths are skipped."""
+        start, _, values = self._slot_values(channel, powers, position)
+        self._powers[channel].add(start, values, ~self._missing[channel][start:start + len(values)])
 
     def get_wavelengths(self) -> List[List[float]]:
-        return average(self._wavelengths)
+        return [statistics.mean.tolist() for statistics in self._wavelengths]
 
     def get_powers(self) -> List[List[float]]:
-        return average(self._powers)
-
-    def _add(self, channel: int, elements_to_add: List[float], position: int, elements: List[List[List[float]]]):
-        start = self.switch_positions[channel].index(position)
-        for i, element in enumerate(elements_to_add):
-            try:
-                elements[channel][start + i].append(element)
-            except IndexError:
-                pass
+        return [statistics.mean.tolist() for statistics in self._powers]
+
+    def get_wavelength_deviations(self) -> List[List[float]]:
+        return [statistics.std().tolist() for statistics in self._wavelengths]
+
+    def get_power_deviations(self) -> List[List[float]]:
+        return [statistics.std().tolist() for statistics in self._powers]
+
+    def get_dropouts(self) -> List[List[int]]:
+        return [dropouts.tolist() for dropouts in self._dropouts]
+
+    def _slot_values(self, channel: int, elements_to_add: List[float], position: int) -> Tuple[int, int, np.ndarray]:
+        """
+        Returns the range of the position's slots, and the readings that fit in them, readings past the last slot of
+        the position are dropped.
+        """
+        if channel != self.switch_channel:
+            position = 0
+        start, end = self.slots[channel][position]
+        return start, end, np.asarray(elements_to_add, dtype=np.float64)[:end - start]
+
+
+def position_slots(position_list: List[int]) -> Dict[int, Tuple[int, int]]:
+    """
+    Maps each switch position on a channel to the range of fbg slots it fills.
+
+    :param position_list: the switch position of each fbg on the channel
+    :returns: switch position mapped to the index of its first fbg, and the index after its last fbg
+    """
+    slots = {}  # type: Dict[int, Tuple[int, int]]
+    for i, position in enumerate(position_list):
+        start, end = slots.get(position, (i, i))
+        slots[position] = (start, end + 1)
+    return slots
@@ -4,21 +4,29 @@ Gets the amplitude and wavelength data using the Micron Optics SM125, and the Op
 import socket
 import time
 from queue import Queue
-from typing import List, Tuple
+from typing import List, Tuple, Dict, Optional, Sequence
 from uuid import UUID
 
 import numpy as np
 
+from fbgui.constants import SWITCH_SETTLE_FRAMES, SWITCH_SETTLE_TOLERANCE, SWITCH_SETTLE_TIMEOUT, \
+    SM125_STREAM_FRAME_TIMEOUT
 from fbgui.devices.optical_switch import OpticalSwitch
 from fbgui.devices.sm125_laser import SM125
-from fbgui.exceptions import ProgramStopped
+from fbgui.exceptions import ProgramStopped, StreamStopped
 from fbgui.laser_data import LaserData
 from fbgui.messages import MessageType, Message
+from fbgui.sm125_stream import SM125Stream
+from fbgui.timing import timed
+
+Scan = Tuple[Sequence[np.ndarray], Sequence[np.ndarray]]
 
 
 class LaserRecorder:
     def __init__(self, laser: SM125, switch: OpticalSwitch, switches: List[List[int]], num_pts: int,
-                 thread_id: UUID, thread_map: dict, main_queue: Queue):
+                 thread_id: UUID, thread_map: dict, main_queue: Queue, settle_frames: int=SWITCH_SETTLE_FRAMES,
+                 settle_tolerance: float=SWITCH_SETTLE_TOLERANCE, settle_timeout: float=SWITCH_SETTLE_TIMEOUT,
+                 stream: SM125Stream=None):
         """
         Returns the averaged wavelength, and power data collected from the SM125, and potentially using the
         Optical Switch. The data is collected num_pts amount of times and then averaged. The wavelengths and power
@@ -33,6 +41,10 @@ class LaserRecorder:
         :param thread_map: Dictionary mapping UUIDs to boolean values corresponding to whether or not the
                     thread with that UUID should be running
         :param main_queue: Queue used for writing log messages to
+        :param settle_frames: number of consecutive matching frames needed for the switched channel to be settled
+        :param settle_tolerance: maximum wavelength difference in nm. between matching frames
+        :param settle_timeout: maximum seconds to wait for the switched channel to settle
+        :param stream: if present, frames are read from the SM125 stream instead of querying the laser
         """
         self.laser = laser
         self.optical_switch = switch
@@ -41,45 +53,115 @@ class LaserRecorder:
         self.thread_id = thread_id
         self.thread_map = thread_map
         self.main_queue = main_queue
+        self.settle_frames = settle_frames
+        self.settle_tolerance = settle_tolerance
+        self.settle_timeout = settle_timeout
+        self.stream = stream
+        self.last_frame = stream.latest() if stream is not None else -1
+        self.switched_at = 0.
         lens = [len(x) for x in filter(lambda x: x != 0, switches)]
         self.switch_channel_index = lens.index(max(lens))
 
-    def get_wavelength_amplitude_data(self) -> Tuple[List[float], List[float]]:
+    @timed("laser_recorder.sweep")
+    def get_wavelength_amplitude_data(self) -> Tuple[List[float], List[float], List[float], List[int]]:
+        """
+        Returns the mean wavelength, and power of each fbg, along with the standard deviation of the wavelength in
+        pm., and the number of scans the fbg's peak was missing from, all computed from the same scans.
+        """
         if self.thread_map[self.thread_id]:
             try:
-                wavelengths, amplitudes = self.__get_data()
-                return list(np.hstack(wavelengths)), list(np.hstack(amplitudes))
+                wavelengths, amplitudes, deviations, dropouts = self.__get_data()
+                return np.hstack(wavelengths).tolist(), np.hstack(amplitudes).tolist(), \
+                    (np.hstack(deviations) * 1000).tolist(), np.hstack(dropouts).astype(int).tolist()
             except ProgramStopped:
                 pass
-        return [], []
+        return [], [], [], []
 
-    def __get_data(self) -> Tuple[List[List[float]], List[List[float]]]:
+    def __get_data(self) -> Tuple[List[List[float]], List[List[float]], List[List[float]], List[List[int]]]:
         """
         Get the data from the laser, and use the optical switch to configure the fbgs correctly.
 
-        :return: Matrix of wavelengths, Matrix of powers
+        :return: Matrix of wavelengths, Matrix of powers, Matrix of wavelength deviations, Matrix of dropouts
         """
         laser_data = LaserData(self.switch_positions, self.switch_channel_index)
         if len(self.switch_positions) == 0:
             self.record_wavelengths_and_amplitudes(laser_data, 0)
         switch_set = set(self.switch_positions[self.switch_channel_index])
+        compare_positions = len(switch_set - {0}) > 1
+        settle_times = {}  # type: Dict[int, Optional[float]]
         for switch_position in sorted(switch_set):
             try:
+                first_scan = None
                 if switch_position != 0:
-                    self.__switch_to(switch_position)
-                self.record_wavelengths_and_amplitudes(laser_data, switch_position)
+                    settle_times[switch_position], first_scan = self.__switch_to(switch_position, compare_positions)
+                self.record_wavelengths_and_amplitudes(laser_data, switch_position, first_scan)
             except socket.error:
                 self.main_queue.put(Message(MessageType.DEVELOPER, "Socket Error", "Error communicating with the "
                                                                                    "laser in dev_helper."))
-        return laser_data.get_wavelengths(), laser_data.get_powers()
+        if settle_times:
+            self.log_settle_times(settle_times)
+        return laser_data.get_wavelengths(), laser_data.get_powers(), laser_data.get_wavelength_deviations(), \
+            laser_data.get_dropouts()
+
+    @timed("laser_recorder.switch")
+    def __switch_to(self, position: int, compare_positions: bool) -> Tuple[Optional[float], Optional[Scan]]:
+        """
+        Sets the optical switch position, and polls the SM125 until the switched channel has the same peaks for
+        settle_frames consecutive frames, and the peaks differ from the ones seen before switching. A sweep with a
+        single switch position has no other position's peaks to tell the new ones apart from, and the switch stays
+        on that position between sweeps, so it is settled as soon as it is set.
 
-    def __switch_to(self, position: int):
+        :param position: the switch position to switch to
+        :param compare_positions: True if the sweep has more than one switch position
+        :returns: the seconds taken to settle, or None if the channel did not settle before the timeout, and the
+                  last settled scan to be used as the position's first reading, None if there is none
+        """
+        if not compare_positions:
+            self.optical_switch.set_channel(position)
+            self.switched_at = time.time()
+            return 0., None
+        previous_peaks = self.__get_switch_channel_peaks(self.__get_sm125_data())
+        start = time.monotonic()
         self.optical_switch.set_channel(position)
-        time.sleep(1.2)
+        self.switched_at = time.time()
+        frames = []  # type: List[np.ndarray]
+        while time.monotonic() - start < self.settle_timeout:
+            scan = self.__get_sm125_data()
+            frames.append(self.__get_switch_channel_peaks(scan))
+            frames = frames[-self.settle_frames:]
+            if len(frames) == self.settle_frames and not peaks_match(frames[0], previous_peaks, self.settle_tolerance)\
+                    and all(peaks_match(frames[0], frame, self.settle_tolerance) for frame in frames[1:]):
+                return time.monotonic() - start, scan
+        return None, None
+
+    def __get_switch_channel_peaks(self, scan: Scan) -> np.ndarray:
+        """Returns the wavelengths of the peaks on the switched channel in the scan."""
+        wavelengths, _ = scan
+        return wavelengths[self.switch_channel_index]
 
-    def record_wavelengths_and_amplitudes(self, laser_data: LaserData, switch_position: int):
+    def log_settle_times(self, settle_times: Dict[int, Optional[float]]):
+        """
+        Logs the settle time of each switch position in the sweep, used for tuning the settle timeout.
+
+        :param settle_times: switch position mapped to the seconds taken to settle, None if it timed out
+        """
+        times = ", ".join("{}: {}".format(position, "timed out" if seconds is None else "{:.2f}s".format(seconds))
+                          for position, seconds in sorted(settle_times.items()))
+        self.main_queue.put(Message(MessageType.DEVELOPER, "Switch Settle Times", times))
+
+    def record_wavelengths_and_amplitudes(self, laser_data: LaserData, switch_position: int, first_scan: Scan=None):
+        """
+        Adds number_of_readings scans of the SM125 at the switch position to the laser data.
+
+        :param laser_data: the data of the sweep
+        :param switch_position: the switch position the fbgs being read are on
+        :param first_scan: a scan already taken at the switch position, used as the first reading if given
+        """
         for reading_number in range(self.number_of_readings):
-            wavelengths, powers = self.__get_sm125_data()
+            if reading_number == 0 and first_scan is not None:
+                wavelengths, powers = first_scan
+            else:
+                wavelengths, powers = self.__get_sm125_data()
             for channel in range(4):
                 if len(self.switch_positions[channel]):
                     laser_data.add_wavelengths(channel, wavelengths[channel], switch_position)
@@ -87,7 +169,31 @@ class LaserRecorder:
 
     def __get_sm125_data(self):
         """Collect the data from the SM125, and add the data to the proper lists in all_waves, and all_amps."""
-        if self.thread_map[self.thread_id]:
-            use_positions = [bool(len(channel_positions)) for channel_positions in self.switch_positions]
-            return self.laser.get_data(use_positions)
+        use_positions = [bool(len(channel_positions)) for channel_positions in self.switch_positions]
+        if self.stream is None:
+            if self.thread_map[self.thread_id]:
+                return self.laser.get_data(use_positions)
+            raise ProgramStopped
+        while self.thread_map[self.thread_id]:
+            try:
+                frame = self.stream.next_frame(self.last_frame, use_positions, SM125_STREAM_FRAME_TIMEOUT,
+                                               self.switched_at)
+            except StreamStopped:
+                raise ProgramStopped
+            if frame is not None:
+                self.last_frame, wavelengths, powers = frame
+                return wavelengths, powers
         raise ProgramStopped
+
+
+def peaks_match(peaks: np.ndarray, other_peaks: np.ndarray, tolerance: float) -> bool:
+    """
+    Checks if two frames have the same number of peaks, and each wavelength is within the tolerance.
+
+    :param peaks: wavelengths of the first frame
+    :param other_peaks: wavelengths of the second frame
+    :param tolerance: maximum wavelength difference
+    :returns: True if the frames match, False otherwise
+    """
+    return len(peaks) == len(other_peaks) and bool(np.all(np.abs(np.asarray(peaks) - np.asarray(other_peaks))
+                                                          <= tolerance))
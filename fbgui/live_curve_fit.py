@@ -0,0 +1,261 @@
+"""
+Fits the calibration curves of the fbgs while a calibration run records its real points, and shows the fits on the
+calibration program's curve fit tab, so a bad grating can be seen before the run is exported.
+"""
+import threading
+import tkinter as tk
+from tkinter import ttk
+from typing import List, Optional, Sequence
+
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+from fbgui.constants import HEX_COLORS
+from fbgui.polynomial_fit import IncrementalPolynomialFit, PolynomialFit
+
+#: Milliseconds between refreshes of the curve fit tab
+UPDATE_INTERVAL = 5000
+#: Columns of the curve fit tab's table
+TABLE_HEADERS = ["FBG", "Order", "Coefficients", "R Squared", "RMS Residual (pm)", "Sensitivity (pm/K)",
+                 "Predicted Wavelength (nm)"]
+
+
+class CurveFitSnapshot(object):
+    """
+    The fits of the live curve fit at one time, the sensitivities, and predicted wavelengths are NaN if there is no
+    next target temperature. The statistics of fbgs with less than two points are NaN.
+
+    :ivar List[str] fbg_names: serial numbers of the fbgs, in the order of the columns
+    :ivar np.ndarray temperatures: temperatures of the real points in K
+    :ivar np.ndarray wavelengths: (point, fbg) wavelengths of the real points in nm, NaN where an fbg was left out
+    :ivar PolynomialFit fit: fit of each fbg's wavelengths against the temperatures
+    :ivar np.ndarray counts: number of points in each fbg's fit
+    :ivar np.ndarray fitted: True for each fbg with at least two points
+    :ivar np.ndarray r_squared: coefficient of determination of each fbg's fit
+    :ivar np.ndarray rms_residuals: root mean square residual of each fbg's fit in pm
+    :ivar Optional[float] next_temperature: the next target temperature in K, None if it is not known
+    :ivar np.ndarray sensitivities: slope of each fbg's fit at the next target temperature in pm/K
+    :ivar np.ndarray predicted_wavelengths: wavelength of each fbg's fit at the next target temperature in nm
+    """
+
+    def __init__(self, fbg_names: List[str], temperatures: np.ndarray, wavelengths: np.ndarray, fit: PolynomialFit,
+                 counts: np.ndarray, total_sums_of_squares: np.ndarray, next_temperature: Optional[float]):
+        self.fbg_names = fbg_names
+        self.temperatures = temperatures
+        self.wavelengths = wavelengths
+        self.fit = fit
+        self.counts = counts
+        self.fitted = counts >= 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.r_squared = np.where(total_sums_of_squares > 0, 1 - fit.residuals / total_sums_of_squares, 1.)
+            self.rms_residuals = np.sqrt(fit.residuals / counts) * 1000
+        self.next_temperature = next_temperature
+        self.sensitivities = np.full(len(fbg_names), np.nan)
+        self.predicted_wavelengths = np.full(len(fbg_names), np.nan)
+        if next_temperature is not None:
+            self.sensitivities = fit.evaluate_derivatives([next_temperature])[0] * 1000
+            self.predicted_wavelengths = fit.evaluate([next_temperature])[0]
+        for statistics in (self.r_squared, self.rms_residuals, self.sensitivities, self.predicted_wavelengths):
+            statistics[~self.fitted] = np.nan
+
+    def first_wavelengths(self) -> np.ndarray:
+        """Returns each fbg's first wavelength in the fit, NaN for fbgs without points."""
+        finite = np.isfinite(self.wavelengths)
+        return np.where(finite.any(axis=0), self.wavelengths[finite.argmax(axis=0), np.arange(len(self.fbg_names))],
+                        np.nan)
+
+
+class LiveCurveFit(object):
+    """
+    Wavelength vs. temperature fits of the fbgs of a calibration run, updated with each real calibration point. The
+    program thread adds the points, and the curve fit tab takes snapshots of the fits on the Tk main loop.
+
+    :ivar List[str] fbg_names: serial numbers of the fbgs, in the order of each point's wavelengths
+    :ivar IncrementalPolynomialFit fits: the cached normal equations of the fits
+    :ivar List[float] temperatures: temperatures of the real points in K
+    :ivar List[np.ndarray] wavelengths: wavelengths of the fbgs at each real point in nm, NaN where an fbg was left
+                                        out of the point
+    :ivar Optional[float] next_temperature: the next target temperature in K, None if it is not known
+    :ivar int revision: incremented whenever a point is added, or the fit is reset
+    """
+
+    def __init__(self, fbg_names: List[str]=None):
+        """
+        :param fbg_names: serial numbers of the fbgs
+        """
+        self.lock = threading.Lock()
+        self.revision = 0
+        self.reset(fbg_names or [])
+
+    def reset(self, fbg_names: List[str]):
+        """
+        Removes all of the points, used when a run is started, or resumed.
+
+        :param fbg_names: serial numbers of the fbgs of the run
+        """
+        with self.lock:
+            self.fbg_names = list(fbg_names)
+            self.fits = IncrementalPolynomialFit(len(self.fbg_names))
+            self.temperatures = []  # type: List[float]
+            self.wavelengths = []  # type: List[np.ndarray]
+            self.next_temperature = None  # type: Optional[float]
+            self.revision += 1
+
+    def add_point(self, temperature: float, wavelengths: Sequence[float], next_temperature: float=None,
+                  dropouts: Sequence[int]=None):
+        """
+        Adds a real calibration point to the fits. Each fbg whose wavelength is 0 nm, not finite, or that dropped out
+        of any of the point's scans is left out of its fit, the other fbgs' fits still get the point. Points with the
+        wrong number of wavelengths, or a temperature that is not finite are skipped.
+
+        :param temperature: temperature of the point in K
+        :param wavelengths: wavelength of each fbg in nm
+        :param next_temperature: the next target temperature in K, None to keep the last one
+        :param dropouts: number of scans each fbg's peak was missing from, None if not known
+        """
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        with self.lock:
+            if next_temperature is not None:
+                self.next_temperature = next_temperature
+            if len(wavelengths) != len(self.fbg_names) or not np.isfinite(temperature):
+                return
+            mask = np.isfinite(wavelengths) & (wavelengths != 0)
+            if dropouts is not None and len(dropouts) == len(mask):
+                mask &= np.asarray(dropouts) == 0
+            if not mask.any():
+                return
+            self.fits.add(temperature, wavelengths, mask)
+            self.temperatures.append(float(temperature))
+            self.wavelengths.append(np.where(mask, wavelengths, np.nan))
+            self.revision += 1
+
+    def add_points(self, temperatures: Sequence[float], wavelengths: np.ndarray, dropouts: np.ndarray=None):
+        """
+        Adds the real calibration points already recorded for a run.
+
+        :param temperatures: temperature of each point in K
+        :param wavelengths: (point, fbg) wavelengths in nm
+        :param dropouts: (point, fbg) number of scans each fbg's peak was missing from, None if not known
+        """
+        for i, (temperature, point_wavelengths) in enumerate(zip(temperatures, wavelengths)):
+            self.add_point(temperature, point_wavelengths, dropouts=None if dropouts is None else dropouts[i])
+
+    def snapshot(self) -> Optional[CurveFitSnapshot]:
+        """
+        Solves the fits.
+
+        :returns: the current fits, None if there are less than two points
+        """
+        with self.lock:
+            if len(self.temperatures) < 2 or not self.fbg_names:
+                return None
+            return CurveFitSnapshot(list(self.fbg_names), np.array(self.temperatures), np.array(self.wavelengths),
+                                    self.fits.solve(), self.fits.counts.copy(), self.fits.total_sums_of_squares(),
+                                    self.next_temperature)
+
+
+class CurveFitView(ttk.Frame):
+    """
+    Curve fit tab of the calibration program, graphs each fbg's real points, fit, and residuals, and lists the fits'
+    coefficients, goodness of fit, and predictions at the next target temperature.
+
+    :ivar LiveCurveFit live_fit: the fits shown
+    :ivar Figure figure: figure of the fits, and residuals graphs
+    :ivar FigureCanvasTkAgg canvas: canvas of the figure
+    :ivar ttk.Treeview tree: table of the fits
+    :ivar int revision: revision of the live fit last shown
+    """
+
+    def __init__(self, master: ttk.Frame, live_fit: LiveCurveFit):
+        """
+        :param master: frame of the curve fit tab
+        :param live_fit: the fits to show
+        """
+        super().__init__(master)
+        self.live_fit = live_fit
+        self.revision = None  # type: Optional[int]
+        self.figure = Figure(figsize=(5, 5), dpi=100)
+        self.fit_axis = self.figure.add_subplot(211)
+        self.residual_axis = self.figure.add_subplot(212, sharex=self.fit_axis)
+        self.canvas = FigureCanvasTkAgg(self.figure, self)
+        self.canvas.draw()
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(self, columns=TABLE_HEADERS, show="headings", height=8)
+        for header in TABLE_HEADERS:
+            self.tree.heading(header, text=header)
+            self.tree.column(header, width=300 if header == "Coefficients" else 120, anchor="center")
+        self.tree.pack(side=tk.BOTTOM, fill=tk.X)
+        self.refresh()
+
+    def refresh(self):
+        """Redraws the graphs, and the table if a point has been added since the last refresh."""
+        if self.live_fit.revision != self.revision:
+            self.revision = self.live_fit.revision
+            snapshot = self.live_fit.snapshot()
+            self.draw_graphs(snapshot)
+            self.fill_table(snapshot)
+        self.after(UPDATE_INTERVAL, self.refresh)
+
+    def draw_graphs(self, snapshot: Optional[CurveFitSnapshot]):
+        """
+        Graphs each fbg's change in wavelength from its first point, and its fit above, and the residuals of its
+        points from the fit below.
+
+        :param snapshot: the fits to graph, None to clear the graphs
+        """
+        self.fit_axis.cla()
+        self.residual_axis.cla()
+        self.fit_axis.set_title("Calibration Curve Fits", fontsize=12)
+        self.fit_axis.set_ylabel("{} Wavelength (pm)".format(u"\u0394"))
+        self.residual_axis.set_ylabel("Residual (pm)")
+        self.residual_axis.set_xlabel("Temperature (K)")
+        if snapshot is not None:
+            temperatures = snapshot.temperatures
+            curve_temperatures = np.linspace(temperatures.min(), temperatures.max(), 100)
+            if snapshot.next_temperature is not None:
+                curve_temperatures = np.linspace(min(temperatures.min(), snapshot.next_temperature),
+                                                 max(temperatures.max(), snapshot.next_temperature), 100)
+            first_wavelengths = snapshot.first_wavelengths()
+            curves = (snapshot.fit.evaluate(curve_temperatures) - first_wavelengths) * 1000
+            residuals = (snapshot.wavelengths - snapshot.fit.evaluate(temperatures)) * 1000
+            deltas = (snapshot.wavelengths - first_wavelengths) * 1000
+            predictions = (snapshot.predicted_wavelengths - first_wavelengths) * 1000
+            for i, fbg_name in enumerate(snapshot.fbg_names):
+                color = HEX_COLORS[i % len(HEX_COLORS)]
+                self.fit_axis.scatter(temperatures, deltas[:, i], color=color, s=20)
+                if not snapshot.fitted[i]:
+                    continue
+                self.fit_axis.plot(curve_temperatures, curves[:, i], color=color, label=fbg_name)
+                self.residual_axis.scatter(temperatures, residuals[:, i], color=color, s=20)
+                if snapshot.next_temperature is not None:
+                    self.fit_axis.scatter([snapshot.next_temperature], [predictions[i]], color=color, marker="x", s=60)
+            self.residual_axis.axhline(0, color="black", linewidth=1)
+            legend = self.fit_axis.legend(loc="upper left", fontsize=8, ncol=int(len(snapshot.fbg_names) / 8 + 1))
+            for text in legend.get_texts():
+                text.set_color("black")
+        self.canvas.draw_idle()
+
+    def fill_table(self, snapshot: Optional[CurveFitSnapshot]):
+        """
+        Lists each fbg's fit, the coefficients are highest power first, as on the excel file's curve fit sheet.
+
+        :param snapshot: the fits to list, None to clear the table
+        """
+        self.tree.delete(*self.tree.get_children())
+        if snapshot is None:
+            return
+        for i, fbg_name in enumerate(snapshot.fbg_names):
+            if not snapshot.fitted[i]:
+                self.tree.insert("", "end", values=[fbg_name] + [""] * (len(TABLE_HEADERS) - 1))
+                continue
+            coefficients = ", ".join("{:.6g}".format(c) for c in reversed(snapshot.fit.column_coefficients(i)))
+            self.tree.insert("", "end", values=[fbg_name, int(snapshot.fit.orders[i]), coefficients,
+                                                _format(snapshot.r_squared[i], "{:.6f}"),
+                                                _format(snapshot.rms_residuals[i], "{:.3f}"),
+                                                _format(snapshot.sensitivities[i], "{:.4f}"),
+                                                _format(snapshot.predicted_wavelengths[i], "{:.5f}")])
+
+
+def _format(value: float, format_string: str) -> str:
+    return format_string.format(value) if np.isfinite(value) else ""
@@ -1,5 +1,6 @@
 """Module contains the main entry point for the Kyton UI."""
 import configparser
+import multiprocessing
 import os
 import socket
 import sys
@@ -14,10 +15,13 @@ import matplotlib
 import visa
 
 from fbgui import create_excel_table, constants, reset_config, messages, install, ui_helper as uh
+from fbgui.device_manager import DeviceManager
+from fbgui.export_pool import ExportPool
 from fbgui.devices.optical_switch import OpticalSwitch
 from fbgui.devices.oven import Oven
 from fbgui.devices.sm125_laser import SM125
 from fbgui.devices.temperature_controller import TemperatureController
+from fbgui.timing import timings
 
 matplotlib.use("TkAgg")
 
@@ -29,6 +33,7 @@ class Application(tk.Tk):
     :ivar configparser.ConfigParser conf_parser: ConfigParser to read, and set device settings
     :ivar visa.ResourceManager manager: PyVisa ResourceManager used for communicating with GPIB instruments
     :ivar Queue main_queue: Queue used for listening for logging messages to write to the log_view
+    :ivar ExportPool export_pool: worker processes the excel exports are run in
     :ivar Dict[UUID: bool] thread_map: Map of thread UUIDs to booleans for whether or not to stop the thread
     :ivar List[UUID] open_threads: List of UUIDs of the currently open data collection threads
     :ivar List[UUID] graph_threads: List of UUIDs of the currently open graph threads
@@ -41,6 +46,7 @@ class Application(tk.Tk):
     :ivar devices.SM125 laser: Laser wrapper used for communicating with the Laser, None if not connected to the laser
     :ivar devices.OpticalSwitch switch: Switch wrapper used for communicating with the Optical Switch, None if not
                                    connected to the optical switch
+    :ivar DeviceManager device_manager: keeps the device connections open for the length of a program run
     :ivar bool is_full_screen: True if the program is in full screen, False otherwise
     :ivar tkinter.IntVar controller_location: tkinter variable for the temperature controller location input field
     :ivar tkinter.IntVar oven_location: tkinter variable for the oven location input field
@@ -80,6 +86,7 @@ class Application(tk.Tk):
                 raise RuntimeError("NIVisa not installed.")
 
         self.main_queue = Queue()
+        self.export_pool = ExportPool(self.main_queue)
         self.thread_map = {}  # type: Dict[UUID, bool]
         self.open_threads = []  # type: List[UUID]
         self.graph_threads = []  # type: List[UUID]
@@ -89,6 +96,7 @@ class Application(tk.Tk):
         self.oven = None  # type: Optional[Oven]
         self.laser = None  # type: Optional[SM125]
         self.switch = None  # type: Optional[OpticalSwitch]
+        self.device_manager = DeviceManager(self)
         self.is_full_screen = False
         self.excel_table = None  # type: create_excel_table.ExcelTable
 
@@ -112,9 +120,11 @@ class Application(tk.Tk):
         self.bake_program = None  # type: BakingProgram
         self.calibration_program = None   # type: CalProgram
         self.check_queue()
+        self.after(int(constants.TIMING_SUMMARY_INTERVAL * 1000), self.post_timing_summary)
 
     def check_queue(self):
         """Check the queue every second for a Message object to write to the log view."""
+        self.export_pool.poll()
         while True:
             try:
                 msg = self.main_queue.get(timeout=0.1)  # type: messages.Message
@@ -125,6 +135,13 @@ class Application(tk.Tk):
 
         self.after(1000, self.check_queue)
 
+    def post_timing_summary(self):
+        """Posts the percentiles of the timed stages to the log view as a developer message, periodically."""
+        summary = timings.summary_text()
+        if summary:
+            self.main_queue.put(messages.Message(messages.MessageType.DEVELOPER, "Timing Summary", summary))
+        self.after(int(constants.TIMING_SUMMARY_INTERVAL * 1000), self.post_timing_summary)
+
     def toggle_full(self, _=None):
         """Toggles full screen on and off."""
         self.is_full_screen = not self.is_full_screen
@@ -199,7 +216,7 @@ class Application(tk.Tk):
         self.log_view = messages.LogView(hframe)
         self.log_view.pack(expand=True, fill=tk.BOTH, side=tk.LEFT, anchor=tk.W, padx=25, pady=50)
 
-        self.excel_table = create_excel_table.ExcelTable(hframe, self.main_queue)
+        self.excel_table = create_excel_table.ExcelTable(hframe, self.main_queue, self.export_pool)
         self.excel_table.pack(anchor=tk.E, expand=True, side=tk.LEFT, padx=25)
 
     def conn_dev(self, dev: str, connect: bool=True, try_once: bool=False, thread_id: UUID=None):
@@ -319,6 +336,7 @@ class Application(tk.Tk):
                     self.laser.close()
                 if self.manager is not None:
                     self.manager.close()
+                self.export_pool.shutdown()
                 for tid in self.open_threads:
                     self.thread_map[tid] = False
                 for gid in self.graph_threads:
@@ -333,6 +351,7 @@ class Application(tk.Tk):
                 self.thread_map[gid] = False
             if self.manager is not None:
                 self.manager.close()
+            self.export_pool.shutdown()
             self.destroy()
 
     def setup_window(self):
@@ -348,6 +367,8 @@ class Application(tk.Tk):
 
 
 if __name__ == "__main__":
+    # Export worker processes of the frozen executable start here
+    multiprocessing.freeze_support()
     # Need to defer import to here to avoid circular imports
     from fbgui.baking_program import BakingProgram
     from fbgui.cal_program import CalProgram
@@ -9,6 +9,7 @@ from tkinter.font import Font
 import tkinter as tk
 from typing import Optional, Dict
 from fbgui.constants import LOG_BACKGROUND_COLOR
+from fbgui.timing import timings
 
 #: Amount of time in between messages to enable the filtering
 FILTER_TIME = 300.
@@ -210,6 +211,9 @@ class LogView(ttk.Frame):
             msgs_sorted = sort_messages(msgs)
             for t, (text, tag) in msgs_sorted:
                 f.write(text)
+            summary = timings.summary_text()
+            if summary:
+                f.write("\nTiming Summary\n{}\n".format(summary))
 
     def clear(self):
         """Clear the log view scrolled text."""
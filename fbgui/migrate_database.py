@@ -0,0 +1,232 @@
+"""
+Migrates the program tables of the wide format, one table named cal<N> or baking<N> per run with two columns per fbg,
+to the long format points, fbgs, and readings tables, and builds the rollups of baking runs recorded without them.
+
+Run with ``python -m fbgui.migrate_database [database path]``, the migration is also run on startup. The database
+file is copied to a .bak file next to it, such as program_data.db.bak, before the first table is migrated.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+from typing import List, Tuple
+
+from fbgui.constants import DB_PATH, CREATE_READINGS_SCHEMA, BAKING
+from fbgui.database_controller import create_rollup_rows
+from fbgui.sql import connect, validate_table_name
+
+#: Number of wide format rows read, and inserted at a time
+MIGRATION_CHUNK_SIZE = 1000
+
+WAVELENGTH_SUFFIX = " Wavelength (nm.)"
+POWER_SUFFIX = " Power (dBm.)"
+DEVIATION_SUFFIX = " Std. Dev. (pm.)"
+DROPOUTS_SUFFIX = " Dropouts"
+
+#: Indexes of earlier versions of the schema that none of the queries use
+OLD_INDEXES = ("readings_run_fbg_ts",)
+
+INSERT_POINT_READING = "INSERT INTO readings(run_id, point_id, ts, fbg_id, wavelength, power, std_dev, dropouts) " \
+                       "VALUES (?,?,?,?,?,?,?,?);"
+
+
+def migrate(db_path: str=DB_PATH) -> List[str]:
+    """
+    Migrates all of the wide format program tables in the database.
+
+    :param db_path: path to the sqlite database file
+    :returns: names of the migrated tables
+    """
+    connection = connect(db_path)
+    try:
+        return migrate_connection(connection)
+    finally:
+        connection.close()
+
+
+def migrate_connection(connection: sqlite3.Connection, back_up_database: bool=True) -> List[str]:
+    """
+    Creates the long format tables if they do not exist, and migrates every run in the map that still has a wide
+    format table. Each table is copied, and dropped in its own transaction, so an interrupted migration resumes with
+    the remaining tables, a table that fails to migrate is logged, and left for the next migration. The rollups are
+    then built for the baking runs that have points, but no rollups.
+
+    :param connection: connection to the program database
+    :param back_up_database: if True the database file is copied to a .bak file next to it before the first table
+                             is migrated, unless the backup already exists
+    :returns: names of the migrated tables
+    """
+    cursor = connection.cursor()
+    add_point_ids(cursor)
+    drop_old_rollups(cursor)
+    drop_old_indexes(cursor)
+    connection.commit()
+    for command in CREATE_READINGS_SCHEMA:
+        cursor.execute(command)
+    try:
+        cursor.execute("SELECT ID, ProgType FROM map;")
+        runs = cursor.fetchall()
+    except sqlite3.OperationalError:
+        return []
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table';")
+    table_names = {row[0] for row in cursor.fetchall()}
+
+    migrated = []
+    wide_tables = [(run_id, "{}{}".format(str(program_type).lower(), run_id)) for run_id, program_type in runs]
+    wide_tables = [(run_id, table_name) for run_id, table_name in wide_tables if table_name in table_names]
+    if wide_tables and back_up_database:
+        back_up(connection)
+    for run_id, table_name in wide_tables:
+        try:
+            migrate_table(cursor, run_id, table_name)
+            connection.commit()
+        except (sqlite3.Error, ValueError, KeyError) as error:
+            connection.rollback()
+            log_error("Could not migrate {}, it is left in the wide format: {}".format(table_name, error))
+            continue
+        migrated.append(table_name)
+
+    cursor.execute("SELECT ID FROM map WHERE ProgType = ? AND EXISTS (SELECT 1 FROM points WHERE run_id = map.ID) "
+                   "AND NOT EXISTS (SELECT 1 FROM point_rollups WHERE run_id = map.ID);", (BAKING.lower(),))
+    for (run_id,) in cursor.fetchall():
+        try:
+            build_rollups(cursor, run_id)
+            connection.commit()
+        except sqlite3.Error as error:
+            connection.rollback()
+            log_error("Could not build the rollups of run {}: {}".format(run_id, error))
+    return migrated
+
+
+def add_point_ids(cursor: sqlite3.Cursor):
+    """
+    Adds the point_id column to a readings table created before it existed, and fills it in with the ID of the
+    run's first point recorded at the reading's time, the old readings were only matched to their points by time.
+
+    :param cursor: cursor of the connection, the caller commits
+    """
+    cursor.execute("PRAGMA table_info(readings);")
+    columns = [row[1] for row in cursor.fetchall()]
+    if not columns or "point_id" in columns:
+        return
+    cursor.execute("ALTER TABLE readings ADD COLUMN point_id INTEGER;")
+    cursor.execute("CREATE INDEX IF NOT EXISTS points_run_ts ON points (run_id, ts);")
+    cursor.execute("UPDATE readings SET point_id = (SELECT MIN(ID) FROM points WHERE points.run_id = readings.run_id "
+                   "AND points.ts = readings.ts);")
+
+
+def drop_old_rollups(cursor: sqlite3.Cursor):
+    """
+    Drops the rollup tables created without the minimum, and maximum columns, the rollups are then rebuilt with them
+    from the points, and readings.
+
+    :param cursor: cursor of the connection, the caller commits
+    """
+    cursor.execute("PRAGMA table_info(point_rollups);")
+    columns = [row[1] for row in cursor.fetchall()]
+    if columns and "temperature_min" not in columns:
+        cursor.execute("DROP TABLE point_rollups;")
+        cursor.execute("DROP TABLE IF EXISTS reading_rollups;")
+
+
+def drop_old_indexes(cursor: sqlite3.Cursor):
+    """
+    Drops the indexes of earlier versions of the schema, so the readings inserts do not keep them up to date.
+
+    :param cursor: cursor of the connection, the caller commits
+    """
+    for index_name in OLD_INDEXES:
+        cursor.execute("DROP INDEX IF EXISTS {};".format(validate_table_name(index_name)))
+
+
+def back_up(connection: sqlite3.Connection):
+    """
+    Copies the database file to a .bak file next to it, unless the backup already exists, so the backup is of the
+    database before any table was migrated. The write ahead log is checkpointed first, so the copy holds all of the
+    committed data.
+
+    :param connection: connection to the program database
+    """
+    db_path = [row[2] for row in connection.execute("PRAGMA database_list;") if row[1] == "main"][0]
+    backup_path = db_path + ".bak"
+    if not db_path or os.path.exists(backup_path):
+        return
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    shutil.copyfile(db_path, backup_path)
+
+
+def log_error(message: str):
+    """Writes a migration error to standard error, the migration runs before the program log exists."""
+    print(message, file=sys.stderr)
+
+
+def migrate_table(cursor: sqlite3.Cursor, run_id: int, table_name: str, chunk_size: int=MIGRATION_CHUNK_SIZE):
+    """
+    Copies the rows of a wide format table into the points, fbgs, and readings tables, and drops the table. The rows
+    are streamed chunk_size at a time. Statistics columns missing from tables recorded before they existed are
+    migrated as 0s.
+
+    :param cursor: cursor of the connection, the caller commits
+    :param run_id: map ID of the run the table belongs to
+    :param table_name: name of the wide format table
+    :param chunk_size: number of rows read, and inserted at a time
+    """
+    validate_table_name(table_name)
+    rows = cursor.connection.cursor()
+    rows.execute("SELECT * FROM {} ORDER BY ID;".format(table_name))
+    columns = [description[0] for description in rows.description]
+    fbg_names = [column[:-len(WAVELENGTH_SUFFIX)] for column in columns if column.endswith(WAVELENGTH_SUFFIX)]
+
+    cursor.executemany("INSERT OR IGNORE INTO fbgs(run_id, name) VALUES (?, ?);",
+                       [(run_id, fbg_name) for fbg_name in fbg_names])
+    cursor.execute("SELECT name, ID FROM fbgs WHERE run_id = ?;", (run_id,))
+    fbg_ids = dict(cursor.fetchall())
+
+    chunk = rows.fetchmany(chunk_size)
+    while chunk:
+        readings = []  # type: List[Tuple]
+        for row in chunk:
+            values = dict(zip(columns, row))
+            timestamp = values["Date Time"]
+            real_point = values.get("Real Point")
+            if real_point is not None:
+                real_point = int(str(real_point) in ("True", "1"))
+            cursor.execute("INSERT INTO points(run_id, ts, temperature, drift_rate, real_point, cycle_num) "
+                           "VALUES (?,?,?,?,?,?);", (run_id, timestamp, values["Mean Temperature (K)"],
+                                                     values.get("Drift Rate"), real_point, values.get("Cycle Num")))
+            point_id = cursor.lastrowid
+            for fbg_name in fbg_names:
+                readings.append((run_id, point_id, timestamp, fbg_ids[fbg_name], values[fbg_name + WAVELENGTH_SUFFIX],
+                                 values[fbg_name + POWER_SUFFIX], values.get(fbg_name + DEVIATION_SUFFIX, 0.),
+                                 values.get(fbg_name + DROPOUTS_SUFFIX, 0)))
+        cursor.executemany(INSERT_POINT_READING, readings)
+        chunk = rows.fetchmany(chunk_size)
+    rows.close()
+    cursor.execute("DROP TABLE {};".format(table_name))
+
+
+def build_rollups(cursor: sqlite3.Cursor, run_id: int):
+    """
+    Builds all of the rollup buckets of a run from its points, and readings, replacing any existing buckets.
+
+    :param cursor: cursor of the connection, the caller commits
+    :param run_id: map ID of the run
+    """
+    for statement, parameters in create_rollup_rows(run_id, 0., float("inf")):
+        cursor.execute(statement, parameters)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrates the wide format program tables to the readings table.")
+    parser.add_argument("db_path", nargs="?", default=DB_PATH, help="path to the program database")
+    args = parser.parse_args()
+    migrated = migrate(args.db_path)
+    if migrated:
+        print("Migrated {}.".format(", ".join(migrated)))
+    else:
+        print("No tables to migrate.")
+
+
+if __name__ == "__main__":
+    main()
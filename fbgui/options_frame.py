@@ -104,7 +104,7 @@ class OptionsPanel(ttk.Frame):
             reset_config.reset_config(rewrite_program=True)
             mbox.showerror("Internal error", "Please restart the program.")
 
-    def check_config(self, db_controller) -> bool:
+    def check_config(self) -> bool:
         """
         Checks to make sure all of the input fields are filled in properly, and of the right types.
 
@@ -113,7 +113,6 @@ class OptionsPanel(ttk.Frame):
         type.
         **
 
-        :param db_controller fbgui.DatabaseController
         :return True if properly configured, False otherwise
         """
         try:
@@ -143,12 +142,6 @@ class OptionsPanel(ttk.Frame):
             if len(fbg_names) != len(set(fbg_names)):
                 mbox.showerror("Invalid configuration", "Multiple FBGs have the same name.")
                 return False
-            stored_fbg_names = db_controller.get_fbg_list()
-            if len(stored_fbg_names) > 0 and set(fbg_names) != set(stored_fbg_names):
-                mbox.showerror("Invalid configuration",
-                               "The fbg names have changed since the last time the program was run, "
-                               "please start the program with a new file name.")
-                return False
         except (ValueError, tk.TclError):
             mbox.showerror("Invalid configuration",
                            "Please check to make sure the configuration settings are numeric.")
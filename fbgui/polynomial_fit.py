@@ -0,0 +1,235 @@
+"""
+Least squares polynomial fits of many columns of y values against the same x values, the fbgs of a run are fit
+together with one lstsq per order on the columns of a 2-D right hand side.
+
+Coefficients are lowest power first, as in numpy.polynomial.polynomial, the spreadsheet lists them reversed.
+"""
+import threading
+from typing import List, Sequence
+
+import numpy as np
+import numpy.polynomial.polynomial as poly
+
+from fbgui.constants import CURVE_FIT_MAX_ORDER, CURVE_FIT_TOLERANCE
+
+
+class PolynomialFit(object):
+    """
+    Polynomial fits of the columns of y values, a column's coefficients above its order are 0.
+
+    :ivar np.ndarray coefficients: (column, power) coefficients of the fits, lowest power first
+    :ivar np.ndarray orders: order of each column's fit
+    :ivar np.ndarray residuals: sum of the squared residuals of each column's fit
+    """
+
+    def __init__(self, coefficients: np.ndarray, orders: np.ndarray, residuals: np.ndarray):
+        self.coefficients = coefficients
+        self.orders = orders
+        self.residuals = residuals
+
+    @property
+    def derivatives(self) -> np.ndarray:
+        """(column, power) coefficients of the fits' derivatives, lowest power first."""
+        return poly.polyder(self.coefficients, axis=1)
+
+    def evaluate(self, x_values: np.ndarray) -> np.ndarray:
+        """
+        Evaluates every fit at the x values.
+
+        :param x_values: values to evaluate the fits at
+        :returns: (x value, column) values of the fits
+        """
+        return _evaluate(x_values, self.coefficients)
+
+    def evaluate_derivatives(self, x_values: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the derivative of every fit at the x values.
+
+        :param x_values: values to evaluate the derivatives at
+        :returns: (x value, column) values of the derivatives
+        """
+        return _evaluate(x_values, self.derivatives)
+
+    def column_coefficients(self, column: int) -> List[float]:
+        """Returns the order + 1 coefficients of a column's fit, lowest power first."""
+        return self.coefficients[column, :self.orders[column] + 1].tolist()
+
+    def column_derivative(self, column: int) -> List[float]:
+        """Returns the order coefficients of the derivative of a column's fit, lowest power first."""
+        return self.derivatives[column, :max(self.orders[column], 1)].tolist()
+
+
+def fit(x_values: np.ndarray, y_values: np.ndarray, order: int) -> PolynomialFit:
+    """
+    Fits every column of y values with a polynomial of the order, with one least squares solve. The columns of the
+    Vandermonde matrix are scaled to unit length before the solve, as in numpy.polynomial.polynomial.polyfit.
+
+    :param x_values: the x values shared by the columns
+    :param y_values: (x value, column) y values, or one column of y values
+    :param order: order of the polynomials
+    :returns: the fits of the columns
+    """
+    x_values = np.asarray(x_values, dtype=float)
+    y_values = _as_columns(y_values)
+    vandermonde = poly.polyvander(x_values, order)
+    scale = np.sqrt(np.square(vandermonde).sum(axis=0))
+    scale[scale == 0] = 1
+    coefficients = np.zeros((y_values.shape[1], order + 1))
+    if y_values.shape[1]:
+        solution = np.linalg.lstsq(vandermonde / scale, y_values, rcond=len(x_values) * np.finfo(float).eps)[0]
+        coefficients = solution.T / scale
+    residuals = np.square(np.dot(vandermonde, coefficients.T) - y_values).sum(axis=0)
+    return PolynomialFit(coefficients, np.full(y_values.shape[1], order, dtype=int), residuals)
+
+
+def fit_lowest_order(x_values: np.ndarray, y_values: np.ndarray, max_order: int=CURVE_FIT_MAX_ORDER,
+                     tolerance: float=CURVE_FIT_TOLERANCE) -> PolynomialFit:
+    """
+    Fits every column of y values with the lowest order polynomial, from 1 up to max order, whose summed squared
+    error is at most the tolerance, columns that are not within the tolerance are fit with max order. Each order is
+    solved once for all of the columns still above the tolerance.
+
+    :param x_values: the x values shared by the columns
+    :param y_values: (x value, column) y values
+    :param max_order: highest order fit
+    :param tolerance: summed squared error at which a fit is kept
+    :returns: the fits of the columns, coefficients are padded with 0s up to max order
+    """
+    y_values = _as_columns(y_values)
+    number_of_columns = y_values.shape[1]
+    coefficients = np.zeros((number_of_columns, max_order + 1))
+    orders = np.full(number_of_columns, max_order, dtype=int)
+    residuals = np.zeros(number_of_columns)
+    remaining = np.arange(number_of_columns)
+    for order in range(1, max_order + 1):
+        if not len(remaining):
+            break
+        order_fit = fit(x_values, y_values[:, remaining], order)
+        done = (order_fit.residuals <= tolerance) | (order == max_order)
+        columns = remaining[done]
+        coefficients[columns, :order + 1] = order_fit.coefficients[done]
+        orders[columns] = order
+        residuals[columns] = order_fit.residuals[done]
+        remaining = remaining[~done]
+    return PolynomialFit(coefficients, orders, residuals)
+
+
+class IncrementalPolynomialFit(object):
+    """
+    Least squares polynomial fits of the columns of y values, updated one point at a time from cached normal
+    equations, so a fit costs the same however many points have been added. The sums are kept per column, so a point
+    can leave out the columns it has no y value for. The x values are shifted by the first x value, and divided by x
+    scale, and each column's y values are offset by its first y value, so the cached sums stay well conditioned.
+    Points are added, and fits solved under a lock, so they can be on different threads.
+
+    :ivar int max_order: highest order fit
+    :ivar float tolerance: summed squared error at which a lower order fit is kept
+    :ivar float x_scale: the shifted x values are divided by this, about the range of the x values
+    :ivar int count: number of points added
+    :ivar np.ndarray counts: number of points added to each column
+    """
+
+    def __init__(self, number_of_columns: int, max_order: int=CURVE_FIT_MAX_ORDER,
+                 tolerance: float=CURVE_FIT_TOLERANCE, x_scale: float=100.):
+        """
+        :param number_of_columns: number of y values in each point
+        :param max_order: highest order fit
+        :param tolerance: summed squared error at which a lower order fit is kept
+        :param x_scale: the shifted x values are divided by this, about the range of the x values
+        """
+        self.max_order = max_order
+        self.tolerance = tolerance
+        self.x_scale = x_scale
+        self.count = 0
+        self.counts = np.zeros(number_of_columns, dtype=int)
+        self.x_offset = 0.
+        self.y_offsets = np.zeros(number_of_columns)
+        self.x_power_sums = np.zeros((2 * max_order + 1, number_of_columns))
+        self.xy_sums = np.zeros((max_order + 1, number_of_columns))
+        self.y_sums = np.zeros(number_of_columns)
+        self.y_square_sums = np.zeros(number_of_columns)
+        self.lock = threading.Lock()
+
+    def add(self, x_value: float, y_values: Sequence[float], mask: Sequence[bool]=None):
+        """
+        Adds a point to the cached sums.
+
+        :param x_value: x value of the point
+        :param y_values: y value of each column at the x value
+        :param mask: True for each column the point is added to, the point is added to every column if None
+        """
+        y_values = np.asarray(y_values, dtype=float)
+        mask = np.ones(len(y_values), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        with self.lock:
+            if not self.count:
+                self.x_offset = float(x_value)
+            first = mask & (self.counts == 0)
+            self.y_offsets[first] = y_values[first]
+            x_powers = ((x_value - self.x_offset) / self.x_scale) ** np.arange(len(self.x_power_sums))
+            y_values = np.where(mask, y_values - self.y_offsets, 0.)
+            self.x_power_sums[:, mask] += x_powers[:, np.newaxis]
+            self.xy_sums[:, mask] += np.outer(x_powers[:self.max_order + 1], y_values[mask])
+            self.y_sums += y_values
+            self.y_square_sums += np.square(y_values)
+            self.counts += mask
+            self.count += 1
+
+    def solve(self) -> PolynomialFit:
+        """
+        Fits every column with the lowest order polynomial whose summed squared error is at most the tolerance, as
+        fit_lowest_order does. Each column's normal equations are solved with a pseudo inverse, so a column with
+        fewer points than coefficients gets the minimum norm fit.
+
+        :returns: the fits of the columns, in the unshifted x, and y values
+        """
+        with self.lock:
+            number_of_columns = len(self.y_sums)
+            coefficients = np.zeros((number_of_columns, self.max_order + 1))
+            orders = np.full(number_of_columns, self.max_order, dtype=int)
+            residuals = np.zeros(number_of_columns)
+            remaining = np.arange(number_of_columns)
+            for order in range(1, self.max_order + 1):
+                if not len(remaining):
+                    break
+                size = order + 1
+                # (column, size, size) normal matrices, and (column, size) right hand sides
+                normal_matrices = self.x_power_sums[np.add.outer(np.arange(size), np.arange(size))][:, :, remaining]
+                normal_matrices = normal_matrices.transpose(2, 0, 1)
+                xy_sums = self.xy_sums[:size, remaining].T
+                solution = np.matmul(np.linalg.pinv(normal_matrices, size * np.finfo(float).eps),
+                                     xy_sums[:, :, np.newaxis])[:, :, 0]
+                order_residuals = self.y_square_sums[remaining] - 2 * np.sum(solution * xy_sums, axis=1) + \
+                    np.sum(solution * np.matmul(normal_matrices, solution[:, :, np.newaxis])[:, :, 0], axis=1)
+                order_residuals = np.maximum(order_residuals, 0)
+                done = (order_residuals <= self.tolerance) | (order == self.max_order)
+                columns = remaining[done]
+                coefficients[columns, :size] = np.dot(solution[done], self._unshift_matrix(order).T)
+                orders[columns] = order
+                residuals[columns] = order_residuals[done]
+                remaining = remaining[~done]
+            coefficients[:, 0] += self.y_offsets
+            return PolynomialFit(coefficients, orders, residuals)
+
+    def total_sums_of_squares(self) -> np.ndarray:
+        """Returns the summed squared difference of each column's y values from their mean, 0 for empty columns."""
+        with self.lock:
+            counts = np.maximum(self.counts, 1)
+            return self.y_square_sums - np.square(self.y_sums) / counts
+
+    def _unshift_matrix(self, order: int) -> np.ndarray:
+        # Column k holds the coefficients of ((x - x_offset) / x_scale)^k in powers of x
+        matrix = np.zeros((order + 1, order + 1))
+        for power in range(order + 1):
+            shifted_power = poly.polypow([-self.x_offset / self.x_scale, 1. / self.x_scale], power)
+            matrix[:len(shifted_power), power] = shifted_power
+        return matrix
+
+
+def _as_columns(y_values: np.ndarray) -> np.ndarray:
+    y_values = np.asarray(y_values, dtype=float)
+    return y_values[:, np.newaxis] if y_values.ndim == 1 else y_values
+
+
+def _evaluate(x_values: np.ndarray, coefficients: np.ndarray) -> np.ndarray:
+    x_values = np.asarray(x_values, dtype=float)
+    return np.dot(poly.polyvander(x_values, coefficients.shape[1] - 1), coefficients.T)
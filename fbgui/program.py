@@ -10,6 +10,7 @@ import sqlite3
 import tkinter as tk
 import time
 import uuid
+from contextlib import ExitStack
 from threading import Thread
 from tkinter import ttk, messagebox as mbox
 from typing import List, Tuple
@@ -21,15 +22,18 @@ from matplotlib.figure import Figure
 
 from fbgui import graphing, ui_helper, options_frame, helpers, reset_config
 from fbgui.constants import PROG_CONFIG_PATH, CONFIG_IMG_PATH, GRAPH_PATH, FILE_PATH, DB_PATH, DEV_CONFIG_PATH, \
-    CAL, BAKING, LASER, SWITCH, TEMP, OVEN, REAL_POINT_HEADER, TEMPERATURE_HEADER
+    CAL, BAKING, LASER, SWITCH, TEMP, OVEN, REAL_POINT_HEADER, TEMPERATURE_HEADER, SM125_STREAMING
 from fbgui.database_controller import DatabaseController
 from fbgui.datatable import DataTable
-from fbgui.excel_file_controller import ExcelFileController
+from fbgui.devices.async_devices import AsyncRunner
+from fbgui.devices.oven import Oven
 from fbgui.exceptions import ProgramStopped
 from fbgui.graph_toolbar import Toolbar
 from fbgui.laser_recorder import LaserRecorder
 from fbgui.main_program import Application
 from fbgui.messages import MessageType, Message
+from fbgui.sm125_stream import SM125Stream
+from fbgui.sql import reader
 
 MPL_PLOT_NUM = 230
 
@@ -99,6 +103,8 @@ class Program(ttk.Notebook):
         self.table = None  # type: DataTable
         self.graph_helper = None  # type: graphing.Graphing
         self.database_controller = None  # type: DatabaseController
+        self.laser_stream = None  # type: SM125Stream
+        self.async_runner = None  # type: AsyncRunner
 
         # Needed to avoid garbage collection
         self.config_photo = ImageTk.PhotoImage(Image.open(CONFIG_IMG_PATH))
@@ -132,13 +138,24 @@ class Program(ttk.Notebook):
         return
 
     def create_excel(self):
-        """Creates excel file, in a new thread."""
+        """
+        Creates excel file, in an export worker process. The export is queued from the database writer's thread
+        once the recorded points are committed, so the Tk thread does not wait for the commit.
+        """
+        file_name = self.options.file_name.get()
+        snums = self.snums
         bake_sensitivity = self.options.get_bake_sensitivity()
         extra_points = self.options.get_extra_point_temperatures()
-        excel_controller = ExcelFileController(self.options.file_name.get(), self.snums,
-                                               self.master.main_queue, self.program_type.prog_id,
+
+        def submit():
+            try:
+                self.master.export_pool.submit(file_name, snums, self.program_type.prog_id,
                                                bake_sensitivity=bake_sensitivity, extra_point_temperatures=extra_points)
-        Thread(target=excel_controller.create_excel).start()
+            except (OSError, RuntimeError) as e:
+                self.master.main_queue.put(Message(MessageType.ERROR, "Excel Export",
+                                                   "Could not queue the export: {}".format(e)))
+
+        self.database_controller.request_flush(submit)
 
     def setup_tabs(self):
         """Setup the configuration, graphing, and table tabs."""
@@ -191,21 +208,16 @@ class Program(ttk.Notebook):
         :return: True if the file is valid, False otherwise
         """
         valid = True
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
         name = helpers.get_file_name(self.options.file_name.get())
-        try:
-            cur.execute("SELECT ID, ProgName, ProgType from map")
-            rows = cur.fetchall()
-            names = [row[1] for row in rows]
-            types = [row[2] for row in rows]
-            idx = names.index(name)
-            if types[idx] != self.program_type.prog_id.lower():
-                valid = False
-        except ValueError:
-            pass
-        except sqlite3.OperationalError:
-            pass
+        with reader(DB_PATH) as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT ProgType FROM map WHERE ProgName = ? ORDER BY ID LIMIT 1;", (name,))
+                rows = cursor.fetchall()
+                if len(rows) and rows[0][0] != self.program_type.prog_id.lower():
+                    valid = False
+            except sqlite3.OperationalError:
+                pass
 
         if not os.path.isdir(os.path.split(self.options.file_name.get())[0]):
             dirname = os.path.split(self.options.file_name.get())[0]
@@ -272,11 +284,7 @@ class Program(ttk.Notebook):
         self.start_btn.configure(state=tk.DISABLED)
         self.start_btn.configure(text="Pause")
 
-        extra_points = self.options.get_extra_point_temperatures()
-        controller = self.database_controller.new_instance(self.options.file_name.get(), self.snums,
-                                                           bake_sensitivity=self.options.get_bake_sensitivity(),
-                                                           extra_point_temperatures=extra_points)
-        can_start = self.check_device_config() and self.options.check_config(controller)
+        can_start = self.check_device_config() and self.options.check_config()
         if can_start:
             if self.master.running:
                 if self.master.running_prog != self.program_type.prog_id:
@@ -357,6 +365,10 @@ class Program(ttk.Notebook):
                                            .format(self.program_type.prog_id), title=None))
         start_time = time.time()
         if self.connect_devices(thread_id):
+            if SM125_STREAMING:
+                self.laser_stream = SM125Stream(self.master.device_manager, thread_id, self.master.thread_map,
+                                                main_queue=self.master.main_queue)
+                self.laser_stream.start()
             try:
                 self.program_loop(thread_id)
             except ProgramStopped:
@@ -369,18 +381,7 @@ class Program(ttk.Notebook):
 
     def disconnect_devices(self):
         """Disconnect all the devices, and set them to None."""
-        if self.master.oven is not None:
-            self.master.oven.close()
-            self.master.oven = None
-        if self.master.laser is not None:
-            self.master.laser.close()
-            self.master.laser = None
-        if self.master.temp_controller is not None:
-            self.master.temp_controller.close()
-            self.master.temp_controller = None
-        if self.master.switch is not None:
-            self.master.switch.close()
-            self.master.switch = None
+        self.master.device_manager.close_all()
 
     def connect_devices(self, thread_id: uuid.UUID) -> bool:
         """
@@ -414,7 +415,6 @@ class Program(ttk.Notebook):
         if self.master.thread_map[thread_id] and self.need_oven == (self.master.oven is not None) and\
                 (self.master.switch is not None) == need_switch and self.master.laser is not None and \
                 self.master.temp_controller is not None:
-            self.disconnect_devices()
             self.master.running = True
             return True
         return False
@@ -437,31 +437,8 @@ class Program(ttk.Notebook):
                 temp = self.options.set_temp.get()
             try:
                 if self.need_oven:
-                    self.master.conn_dev(OVEN, try_once=not force_connect, thread_id=thread_id)
-                    try:
-                        self.master.oven.set_temp(temp)
-                    except visa.VisaIOError:
-                        self.master.main_queue.put(Message(MessageType.WARNING, "Connection Issue",
-                                                           "Failed to set temperature of oven to {}".format(temp)))
-                    try:
-                        self.master.oven.heater_off()
-                        self.master.oven.cooling_off()
-                    except visa.VisaIOError:
-                        self.master.main_queue.put(Message(MessageType.WARNING, "Connection Issue",
-                                                           "Failed to turn off oven cooling and heating."))
-
-                    if heat and not cooling:
-                        try:
-                            self.master.oven.heater_on()
-                        except visa.VisaIOError:
-                            self.master.main_queue.put(Message(MessageType.WARNING, "Connection Issue",
-                                                               "Failed to turn oven heater on."))
-                    if cooling and self.options.cooling.get():
-                        try:
-                            self.master.oven.cooling_on()
-                        except visa.VisaIOError:
-                            self.master.main_queue.put(Message(MessageType.WARNING, "Connection Issue",
-                                                               "Failed to turn oven cooling on."))
+                    with self.master.device_manager.session(OVEN, thread_id, try_once=not force_connect) as oven:
+                        self.write_oven_settings(oven, temp, heat, cooling)
                 temp_set = True
             except (AttributeError, visa.VisaIOError):
                 if not force_connect:
@@ -472,6 +449,48 @@ class Program(ttk.Notebook):
                     self.master.main_queue.put(Message(MessageType.WARNING, "Device Connection Issue",
                                                        "Failed to set the oven temperature to {} C.".format(temp)))
 
+    def write_oven_settings(self, oven: Oven, temp: float, heat: bool, cooling: bool):
+        """
+        Writes the set point, heater, and cooling settings to the oven, the oven connection is closed if any of
+        the writes fail so it is reconnected on next use.
+
+        :param oven: the connected oven
+        :param temp: temp to set the oven to
+        :param heat: If True turn on the heater
+        :param cooling: If True turn on the oven cooling
+        """
+        failed = False
+        try:
+            oven.set_temp(temp)
+        except visa.VisaIOError:
+            failed = True
+            self.master.main_queue.put(Message(MessageType.WARNING, "Connection Issue",
+                                               "Failed to set temperature of oven to {}".format(temp)))
+        try:
+            oven.heater_off()
+            oven.cooling_off()
+        except visa.VisaIOError:
+            failed = True
+            self.master.main_queue.put(Message(MessageType.WARNING, "Connection Issue",
+                                               "Failed to turn off oven cooling and heating."))
+
+        if heat and not cooling:
+            try:
+                oven.heater_on()
+            except visa.VisaIOError:
+                failed = True
+                self.master.main_queue.put(Message(MessageType.WARNING, "Connection Issue",
+                                                   "Failed to turn oven heater on."))
+        if cooling and self.options.cooling.get():
+            try:
+                oven.cooling_on()
+            except visa.VisaIOError:
+                failed = True
+                self.master.main_queue.put(Message(MessageType.WARNING, "Connection Issue",
+                                                   "Failed to turn oven cooling on."))
+        if failed:
+            self.master.device_manager.invalidate(OVEN)
+
     def save_config_info(self):
         """Write the options, and devices configuration to the prog_config and devices config respectively."""
         self.conf_parser.set(self.program_type.prog_id, "num_scans", str(self.options.num_pts.get()))
@@ -537,15 +556,22 @@ class Program(ttk.Notebook):
 
     def pause_program(self):
         """Pauses the program, and stops the running thread."""
-        self.disconnect_devices()
         for tid in self.master.open_threads:
             self.master.thread_map[tid] = False
         self.master.open_threads.clear()
+        self.master.running = False
+        async_runner = self.async_runner
+        if async_runner is not None:
+            async_runner.stop()
+        if self.laser_stream is not None:
+            self.laser_stream.stop()
+            self.laser_stream = None
+        self.disconnect_devices()
+        self.database_controller.request_flush()
         self.start_btn.configure(text=self.program_type.start_title)
         self.start_btn.configure(state=tk.NORMAL)
         ui_helper.unlock_widgets(self.options)
         ui_helper.unlock_main_widgets(self.master.device_frame)
-        self.master.running = False
         self.master.running_prog = None
         self.conf_parser.set(BAKING, "running", "false")
         self.conf_parser.set(CAL, "running", "false")
@@ -561,20 +587,26 @@ class Program(ttk.Notebook):
                                            "Failed to collect power and wavelength data from the laser and the "
                                            "switch. Trying to collect data again."))
 
-    def get_wave_amp_data(self, thread_id: uuid.UUID) -> Tuple[List[float], List[float]]:
+    def get_wave_amp_data(self, thread_id: uuid.UUID) -> Tuple[List[float], List[float], List[float], List[int]]:
         """
         Use the dev_helper module to get the wavelength and power data from the SM125.
 
         :param thread_id: UUID of the thread the code is currently running in
-        :return: wavelength readings, power readings
+        :return: wavelength readings, power readings, wavelength standard deviations in pm., number of scans each
+                 fbg's peak was missing from
         """
+        devices = self.master.device_manager
         while True:
             try:
-                if sum(len(switch) for switch in self.switches):
-                    self.master.conn_dev(SWITCH, thread_id=thread_id)
-                self.master.conn_dev(LASER, thread_id=thread_id)
-                return LaserRecorder(self.master.laser, self.master.switch, self.switches, self.options.num_pts.get(),
-                                     thread_id, self.master.thread_map, self.master.main_queue)\
-                    .get_wavelength_amplitude_data()
+                with ExitStack() as stack:
+                    switch = None
+                    if sum(len(positions) for positions in self.switches):
+                        switch = stack.enter_context(devices.session(SWITCH, thread_id))
+                    laser = None
+                    if self.laser_stream is None:
+                        laser = stack.enter_context(devices.session(LASER, thread_id))
+                    return LaserRecorder(laser, switch, self.switches, self.options.num_pts.get(),
+                                         thread_id, self.master.thread_map, self.master.main_queue,
+                                         stream=self.laser_stream).get_wavelength_amplitude_data()
             except (AttributeError, visa.VisaIOError, socket.error):
                 self.temp_controller_error()
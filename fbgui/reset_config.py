@@ -4,6 +4,7 @@ import sqlite3
 from typing import IO
 
 import fbgui.constants as constants
+from fbgui.migrate_database import migrate_connection
 
 
 def reset_config(rewrite_dev=False, rewrite_program=False):
@@ -28,6 +29,7 @@ def reset_config(rewrite_dev=False, rewrite_program=False):
     for i in range(2):
         add_column_to_map(cur, "ExtraPoint{}Temperature".format(i+1), "REAL")
 
+    migrate_connection(conn)
     conn.close()
 
     if rewrite_dev or not os.path.isfile(constants.DEV_CONFIG_PATH):
@@ -0,0 +1,12 @@
+"""
+Simulated SM125, optical switch, Delta oven, and LSC temperature controller, used for developing, and benchmarking
+without the instruments.
+
+The socket devices are TCP servers speaking the instruments' protocols, so the normal device classes connect to
+them unchanged, the GPIB devices are served by a resource manager that can be passed to the Oven, and
+TemperatureController classes in place of the pyvisa resource manager. All of the devices share one SimulatedBench,
+so the oven's settings drive the temperature, and the temperature, and switch position drive the SM125 peaks.
+"""
+from fbgui.simulator.bench import SimulatedBench, SimulatedFBG
+from fbgui.simulator.gpib import SimulatedResourceManager, SimulatedInstrument
+from fbgui.simulator.servers import SM125Server, OpticalSwitchServer
@@ -0,0 +1,42 @@
+"""
+Runs the simulated SM125, and optical switch servers until interrupted, for pointing the program's device settings
+at a dev machine.
+
+Run from the main project directory with:
+    python -m fbgui.simulator --sm125-port 50000 --switch-port 50001 --positions 0 1,2,2 "" ""
+"""
+import argparse
+import time
+
+from fbgui.simulator import SimulatedBench, SM125Server, OpticalSwitchServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated SM125, and optical switch servers.")
+    parser.add_argument("--sm125-port", type=int, default=0)
+    parser.add_argument("--switch-port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=.05, help="seconds taken to answer each SM125 scan")
+    parser.add_argument("--jitter", type=float, default=.01, help="maximum seconds the latency varies by")
+    parser.add_argument("--dropout", type=float, default=0., help="probability of a peak missing from a scan")
+    parser.add_argument("--positions", nargs=4, default=["0", "", "", ""],
+                        help="comma separated switch position of each fbg, for each of the 4 channels")
+    args = parser.parse_args()
+
+    switch_positions = [[int(position) for position in channel.split(",") if position] for channel in args.positions]
+    bench = SimulatedBench.create(switch_positions, dropout_probability=args.dropout)
+    sm125_server = SM125Server(bench, args.sm125_port, args.latency, args.jitter)
+    switch_server = OpticalSwitchServer(bench, args.switch_port)
+    sm125_server.start()
+    switch_server.start()
+    print("SM125 listening on {}:{}".format(*sm125_server.address))
+    print("Optical switch listening on {}:{}".format(*switch_server.address))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sm125_server.stop()
+        switch_server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Shared physical state of the simulated instruments."""
+import math
+import threading
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+#: Kelvin offset of Celsius temperatures, the oven set point is in Celsius
+KELVIN_OFFSET = 273.15
+
+
+class SimulatedFBG(object):
+    """
+    A grating connected to the SM125.
+
+    :ivar int channel: SM125 channel index the grating is on
+    :ivar int position: optical switch position the grating is on, 0 if it is not behind the switch
+    :ivar float wavelength: peak wavelength in nm. at the reference temperature
+    :ivar float amplitude: peak amplitude in dBm.
+    :ivar float sensitivity: wavelength change in nm. per Kelvin
+    """
+
+    def __init__(self, channel: int, position: int, wavelength: float, amplitude: float=-10.,
+                 sensitivity: float=.01):
+        self.channel = channel
+        self.position = position
+        self.wavelength = wavelength
+        self.amplitude = amplitude
+        self.sensitivity = sensitivity
+
+
+class SimulatedBench(object):
+    """
+    Temperature, oven, and switch state shared by the simulated instruments. The temperature approaches the oven
+    set point exponentially while the heater, or cooling is pushing towards it, and relaxes towards ambient
+    otherwise.
+
+    :ivar List[SimulatedFBG] fbgs: gratings connected to the SM125
+    :ivar float temperature: current temperature in Kelvin
+    :ivar float ambient: ambient temperature in Kelvin
+    :ivar float reference_temperature: temperature in Kelvin the fbg wavelengths are specified at
+    :ivar float set_point: oven set point in Kelvin
+    :ivar bool heater: True if the oven heater is on
+    :ivar bool cooling: True if the oven cooling is on
+    :ivar float time_constant: seconds for the oven to close 63% of the gap to its set point
+    :ivar float ambient_time_constant: seconds to close 63% of the gap to ambient while the oven is idle
+    :ivar float time_scale: simulated seconds per real second, used for speeding up baking, and calibration runs
+    :ivar float wavelength_noise: standard deviation of the wavelength noise in nm.
+    :ivar float amplitude_noise: standard deviation of the amplitude noise in dBm.
+    :ivar float dropout_probability: probability of a peak missing from a scan
+    :ivar float switch_settle_time: seconds after a switch command before the SM125 sees the new position
+    """
+
+    def __init__(self, fbgs: List[SimulatedFBG], temperature: float=298.15, time_constant: float=600.,
+                 ambient_time_constant: float=3600., time_scale: float=1., wavelength_noise: float=.0005,
+                 amplitude_noise: float=.05, dropout_probability: float=0., switch_settle_time: float=.3,
+                 seed: int=None):
+        self.fbgs = fbgs
+        self.temperature = temperature
+        self.ambient = temperature
+        self.reference_temperature = temperature
+        self.set_point = temperature
+        self.heater = False
+        self.cooling = False
+        self.time_constant = time_constant
+        self.ambient_time_constant = ambient_time_constant
+        self.time_scale = time_scale
+        self.wavelength_noise = wavelength_noise
+        self.amplitude_noise = amplitude_noise
+        self.dropout_probability = dropout_probability
+        self.switch_settle_time = switch_settle_time
+        self.random = np.random.RandomState(seed)
+        self.lock = threading.Lock()
+        self.last_update = time.monotonic()
+        self.switch_position = 0
+        self.next_switch_position = 0
+        self.switch_time = 0.
+
+    @classmethod
+    def create(cls, switch_positions: List[List[int]], first_wavelength: float=1530., spacing: float=4., **kwargs) \
+            -> "SimulatedBench":
+        """
+        Creates a bench with one grating for each switch position entry, in the format of Program.switches.
+
+        :param switch_positions: 2D list with one list for each SM125 channel containing the switch position of each
+                                 fbg on the channel
+        :param first_wavelength: wavelength in nm. of the first fbg on each switch position
+        :param spacing: nm. between the fbgs seen at the same time on a channel
+        :param kwargs: SimulatedBench keyword arguments
+        """
+        fbgs = []
+        for channel, positions in enumerate(switch_positions):
+            seen = {}
+            for position in positions:
+                index = seen.get(position, 0)
+                seen[position] = index + 1
+                fbgs.append(SimulatedFBG(channel, position, first_wavelength + spacing * index))
+        return cls(fbgs, **kwargs)
+
+    def update(self):
+        """Advances the temperature to the current time, must be called with the lock held."""
+        now = time.monotonic()
+        elapsed = (now - self.last_update) * self.time_scale
+        self.last_update = now
+        if (self.heater and self.set_point > self.temperature) or (self.cooling and self.set_point < self.temperature):
+            target, time_constant = self.set_point, self.time_constant
+        else:
+            target, time_constant = self.ambient, self.ambient_time_constant
+        self.temperature += (target - self.temperature) * (1 - math.exp(-elapsed / time_constant))
+        if now - self.switch_time >= self.switch_settle_time:
+            self.switch_position = self.next_switch_position
+
+    def get_temperature(self) -> float:
+        """Returns the current temperature in Kelvin."""
+        with self.lock:
+            self.update()
+            return self.temperature
+
+    def set_oven(self, set_point: float=None, heater: bool=None, cooling: bool=None):
+        """
+        Updates the oven settings, settings left as None are not changed.
+
+        :param set_point: oven set point in Celsius
+        :param heater: True to turn the heater on, False to turn it off
+        :param cooling: True to turn the cooling on, False to turn it off
+        """
+        with self.lock:
+            self.update()
+            if set_point is not None:
+                self.set_point = set_point + KELVIN_OFFSET
+            if heater is not None:
+                self.heater = heater
+            if cooling is not None:
+                self.cooling = cooling
+
+    def set_switch_position(self, position: int):
+        """
+        Starts switching to the position, the SM125 sees the new position after the switch settle time.
+
+        :param position: optical switch position
+        """
+        with self.lock:
+            self.update()
+            self.next_switch_position = position
+            self.switch_time = time.monotonic()
+
+    def scan(self) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Returns one SM125 scan of the gratings visible at the current switch position.
+
+        :returns: wavelengths in nm. of each channel, amplitudes in dBm. of each channel
+        """
+        with self.lock:
+            self.update()
+            wavelengths, amplitudes = [], []
+            for channel in range(4):
+                fbgs = [fbg for fbg in self.fbgs if fbg.channel == channel and fbg.position in
+                        (0, self.switch_position)]
+                fbgs = [fbg for fbg in fbgs if self.random.random_sample() >= self.dropout_probability]
+                channel_wavelengths = np.array([fbg.wavelength + fbg.sensitivity *
+                                                (self.temperature - self.reference_temperature) for fbg in fbgs])
+                channel_amplitudes = np.array([fbg.amplitude for fbg in fbgs])
+                wavelengths.append(channel_wavelengths + self.random.normal(0, self.wavelength_noise, len(fbgs)))
+                amplitudes.append(channel_amplitudes + self.random.normal(0, self.amplitude_noise, len(fbgs)))
+            return wavelengths, amplitudes
@@ -0,0 +1,81 @@
+"""Simulated pyvisa resource manager serving the Delta oven, and the LSC temperature controller."""
+import random
+import time
+from typing import List, Tuple
+
+from fbgui.simulator.bench import SimulatedBench
+
+
+class SimulatedInstrument(object):
+    """
+    Simulated GPIB instrument, answers the commands used by the Oven, and TemperatureController classes.
+
+    :ivar SimulatedBench bench: shared state of the simulated instruments
+    :ivar str location: GPIB location of the instrument
+    :ivar float latency: mean seconds taken to answer a query
+    :ivar float jitter: maximum seconds the latency varies by
+    """
+
+    def __init__(self, bench: SimulatedBench, location: str, latency: float, jitter: float):
+        self.bench = bench
+        self.location = location
+        self.latency = latency
+        self.jitter = jitter
+
+    def query(self, message: str) -> str:
+        """
+        Answers a query, after the simulated bus latency.
+
+        :param message: the command to send
+        :returns: the instrument's response
+        :raises ValueError: If the command is not supported
+        """
+        time.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+        command = message.strip()
+        if command == "KRDG? B":
+            return "{:+.3f}".format(self.bench.get_temperature())
+        if command.startswith("S "):
+            self.bench.set_oven(set_point=float(command[2:]))
+        elif command in ("H ON", "H OFF"):
+            self.bench.set_oven(heater=command == "H ON")
+        elif command in ("C ON", "C OFF"):
+            self.bench.set_oven(cooling=command == "C ON")
+        else:
+            raise ValueError("Unsupported command {}.".format(command))
+        return command
+
+    def close(self):
+        """Closes the resource."""
+        pass
+
+
+class SimulatedResourceManager(object):
+    """
+    Stands in for the pyvisa resource manager passed to the Oven, and TemperatureController classes.
+
+    :ivar SimulatedBench bench: shared state of the simulated instruments
+    :ivar List[str] locations: GPIB locations of the simulated instruments
+    :ivar float latency: mean seconds taken to answer a query
+    :ivar float jitter: maximum seconds the latency varies by
+    """
+
+    def __init__(self, bench: SimulatedBench, locations: Tuple[str, ...]=("GPIB0::1::INSTR", "GPIB0::12::INSTR"),
+                 latency: float=.02, jitter: float=.005):
+        self.bench = bench
+        self.locations = list(locations)  # type: List[str]
+        self.latency = latency
+        self.jitter = jitter
+
+    def list_resources(self) -> Tuple[str, ...]:
+        return tuple(self.locations)
+
+    def open_resource(self, location: str, **_) -> SimulatedInstrument:
+        """
+        Opens a simulated instrument, the pyvisa keyword arguments are accepted, and ignored.
+
+        :param location: GPIB location of the instrument
+        :raises ValueError: If nothing is simulated at the location
+        """
+        if location not in self.locations:
+            raise ValueError("No simulated instrument at {}.".format(location))
+        return SimulatedInstrument(self.bench, location, self.latency, self.jitter)
@@ -0,0 +1,122 @@
+"""TCP servers speaking the SM125, and optical switch protocols."""
+import random
+import re
+import socketserver
+import struct
+import threading
+import time
+from typing import Tuple
+
+import numpy as np
+
+from fbgui.devices.sm125_laser import WAVELENGTH_MULTIPLIER, AMPLITUDE_MULTIPLIER, LENGTH_PREFIX_SIZE, \
+    CHANNEL_LENGTHS_OFFSET, VALUES_OFFSET
+from fbgui.simulator.bench import SimulatedBench
+
+GET_PEAKS_AND_LEVELS = b'#GET_PEAKS_AND_LEVELS'
+#: Seconds between checks for a shutdown request by the serving thread
+SHUTDOWN_POLL_INTERVAL = .05
+SWITCH_COMMAND = re.compile(rb"<OSW(\d+)_OUT_(\d+)>")
+
+
+def create_peaks_and_levels_response(wavelengths, amplitudes) -> bytes:
+    """
+    Encodes a scan as a GET_PEAKS_AND_LEVELS response, including the length prefix.
+
+    :param wavelengths: wavelengths in nm. of each channel
+    :param amplitudes: amplitudes in dBm. of each channel
+    :returns: the length prefixed response
+    """
+    counts = [len(channel) for channel in wavelengths]
+    raw_wavelengths = np.round(np.hstack(wavelengths) * WAVELENGTH_MULTIPLIER).astype('<i4')
+    raw_amplitudes = np.round(np.hstack(amplitudes) * AMPLITUDE_MULTIPLIER).astype('<i2')
+    body = bytes(CHANNEL_LENGTHS_OFFSET) + struct.pack("<4H", *counts)
+    body += bytes(VALUES_OFFSET - len(body)) + raw_wavelengths.tobytes() + raw_amplitudes.tobytes()
+    return "{:0{}d}".format(len(body), LENGTH_PREFIX_SIZE).encode() + body
+
+
+class SimulatorServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded TCP server run on a background thread, listening on localhost.
+
+    :ivar SimulatedBench bench: shared state of the simulated instruments
+    :ivar float latency: mean seconds taken to answer a command
+    :ivar float jitter: maximum seconds the latency varies by
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, bench: SimulatedBench, handler, port: int=0, latency: float=0., jitter: float=0.):
+        super().__init__(("127.0.0.1", port), handler)
+        self.bench = bench
+        self.latency = latency
+        self.jitter = jitter
+        self.thread = None  # type: threading.Thread
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Returns the address, and port the server is listening on."""
+        return self.server_address
+
+    def start(self):
+        """Starts serving on a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, args=(SHUTDOWN_POLL_INTERVAL,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops serving, and closes the listening socket."""
+        self.shutdown()
+        self.server_close()
+
+    def delay(self):
+        """Sleeps for the simulated latency."""
+        time.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+
+
+class SM125Handler(socketserver.BaseRequestHandler):
+    """Answers every GET_PEAKS_AND_LEVELS command with a scan of the bench."""
+
+    def handle(self):
+        pending = b""
+        while True:
+            data = self.request.recv(1024)
+            if not data:
+                return
+            pending += data
+            while GET_PEAKS_AND_LEVELS in pending:
+                pending = pending[pending.index(GET_PEAKS_AND_LEVELS) + len(GET_PEAKS_AND_LEVELS):]
+                self.server.delay()
+                self.request.sendall(create_peaks_and_levels_response(*self.server.bench.scan()))
+
+
+class OpticalSwitchHandler(socketserver.BaseRequestHandler):
+    """Sets the bench's switch position for every <OSWxx_OUT_yy> command, the switch does not reply."""
+
+    def handle(self):
+        pending = b""
+        while True:
+            data = self.request.recv(1024)
+            if not data:
+                return
+            pending += data
+            match = SWITCH_COMMAND.search(pending)
+            while match is not None:
+                pending = pending[match.end():]
+                self.server.delay()
+                self.server.bench.set_switch_position(int(match.group(2)))
+                match = SWITCH_COMMAND.search(pending)
+
+
+class SM125Server(SimulatorServer):
+    """Simulated SM125, latency is the time taken to answer each scan."""
+
+    def __init__(self, bench: SimulatedBench, port: int=0, latency: float=.05, jitter: float=.01):
+        super().__init__(bench, SM125Handler, port, latency, jitter)
+
+
+class OpticalSwitchServer(SimulatorServer):
+    """Simulated optical switch, latency is the time taken to accept each command."""
+
+    def __init__(self, bench: SimulatedBench, port: int=0, latency: float=.01, jitter: float=0.):
+        super().__init__(bench, OpticalSwitchHandler, port, latency, jitter)
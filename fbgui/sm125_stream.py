@@ -0,0 +1,194 @@
+"""Streams SM125 frames on a dedicated acquisition thread into a fixed size ring buffer."""
+import socket
+import threading
+import time
+from queue import Queue
+from typing import List, Tuple, Optional
+from uuid import UUID
+
+import numpy as np
+
+from fbgui.constants import LASER, SM125_STREAM_CAPACITY, SM125_STREAM_MAX_PEAKS
+from fbgui.devices.sm125_laser import NUMBER_OF_CHANNELS
+from fbgui.exceptions import StreamStopped
+from fbgui.messages import Message, MessageType
+
+#: Peaks are requested on every channel, the channels a reader does not use are masked when it reads a frame
+ALL_CHANNELS = [True] * NUMBER_OF_CHANNELS
+#: Seconds to wait before polling again after the laser could not be read
+RETRY_DELAY = .5
+
+Frame = Tuple[int, List[np.ndarray], List[np.ndarray]]
+
+
+class SM125Stream(object):
+    """
+    Polls the SM125 as fast as it answers on a dedicated thread, and stores the timestamped frames in preallocated
+    numpy ring buffers, so readers are decoupled from the SM125 round trip time.
+
+    Frame number n is stored in row n % capacity of the buffers, once the buffers are full the oldest frame is
+    overwritten.
+
+    :ivar DeviceManager devices: device manager used for acquiring the laser for each poll
+    :ivar UUID thread_id: UUID of the program thread the stream belongs to
+    :ivar dict thread_map: UUID mapped to whether or not the thread with that UUID should be running
+    :ivar np.ndarray times: (capacity,) time each frame's query was sent, readers use it to skip the frames
+                            polled before the optical switch changed
+    :ivar np.ndarray counts: (capacity, channels) number of peaks on each channel of each frame
+    :ivar np.ndarray wavelengths: (capacity, channels, max_peaks) wavelengths of each frame, padded with 0s
+    :ivar np.ndarray amplitudes: (capacity, channels, max_peaks) amplitudes of each frame, padded with 0s
+    :ivar int sequence: number of frames written so far
+    :ivar Optional[Exception] error: the exception that stopped the acquisition thread, None if it has not failed
+    """
+
+    def __init__(self, devices, thread_id: UUID, thread_map: dict, capacity: int=SM125_STREAM_CAPACITY,
+                 max_peaks: int=SM125_STREAM_MAX_PEAKS, main_queue: Queue=None):
+        """
+        Creates the stream, and allocates the ring buffers, the acquisition thread is started with start.
+
+        :param devices: device manager used for acquiring the laser for each poll
+        :param thread_id: UUID of the program thread the stream belongs to
+        :param thread_map: UUID mapped to whether or not the thread with that UUID should be running
+        :param capacity: number of frames held in the ring buffers
+        :param max_peaks: maximum number of peaks stored per channel, extra peaks are dropped
+        :param main_queue: Queue the error that stops the acquisition thread is logged to
+        """
+        self.devices = devices
+        self.main_queue = main_queue
+        self.thread_id = thread_id
+        self.thread_map = thread_map
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.counts = np.zeros((capacity, NUMBER_OF_CHANNELS), dtype=np.int64)
+        self.wavelengths = np.zeros((capacity, NUMBER_OF_CHANNELS, max_peaks))
+        self.amplitudes = np.zeros((capacity, NUMBER_OF_CHANNELS, max_peaks))
+        self.sequence = 0
+        self.running = False
+        self.error = None  # type: Optional[Exception]
+        self.condition = threading.Condition()
+        self.thread = None  # type: threading.Thread
+
+    def start(self):
+        """Starts the acquisition thread."""
+        self.running = True
+        self.thread = threading.Thread(target=self._acquire_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float=None):
+        """
+        Stops the acquisition thread, and wakes up any waiting readers. The thread exits after its current poll, it
+        is only joined if a timeout is given, so the Tk thread is never blocked on the laser.
+
+        :param timeout: maximum seconds to wait for the acquisition thread to exit, None to not wait
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if timeout is not None and self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def add_frame(self, timestamp: float, wavelengths: List[np.ndarray], amplitudes: List[np.ndarray]):
+        """
+        Writes a frame into the next row of the ring buffers, and wakes up waiting readers.
+
+        :param timestamp: time the frame's query was sent
+        :param wavelengths: wavelengths of each channel
+        :param amplitudes: amplitudes of each channel
+        """
+        max_peaks = self.wavelengths.shape[2]
+        with self.condition:
+            row = self.sequence % self.capacity
+            self.times[row] = timestamp
+            self.wavelengths[row] = 0
+            self.amplitudes[row] = 0
+            for channel, (channel_wavelengths, channel_amplitudes) in enumerate(zip(wavelengths, amplitudes)):
+                count = min(len(channel_wavelengths), max_peaks)
+                self.counts[row, channel] = count
+                self.wavelengths[row, channel, :count] = channel_wavelengths[:count]
+                self.amplitudes[row, channel, :count] = channel_amplitudes[:count]
+            self.sequence += 1
+            self.condition.notify_all()
+
+    def next_frame(self, after: int, use_positions: List[bool], timeout: float, since: float=0.) -> Optional[Frame]:
+        """
+        Returns the first frame after frame number after whose query was sent at or after since, waiting for it to
+        be acquired if needed. Frames that have already been overwritten are skipped.
+
+        :param after: number of the last frame read, -1 to read the oldest frame in the buffers
+        :param use_positions: list of 4 values, True if expecting data on that channel, False otherwise
+        :param timeout: maximum seconds to wait for the frame
+        :param since: time the frame's query must be sent at or after, such as the time the optical switch was set,
+                      so frames polled before the switch changed are skipped
+        :returns: the frame number, wavelengths of each channel, amplitudes of each channel in the same format as
+                  SM125.get_data, or None if the timeout elapsed
+        :raises StreamStopped: if the stream stopped before the frame was acquired
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self._first_frame(after, since) is not None or not self.running,
+                                           timeout):
+                return None
+            number = self._first_frame(after, since)
+            if number is None:
+                raise StreamStopped(self.error)
+            row = number % self.capacity
+            wavelengths, amplitudes = [], []
+            for channel, use_position in enumerate(use_positions):
+                count = self.counts[row, channel]
+                if use_position and count:
+                    wavelengths.append(self.wavelengths[row, channel, :count].copy())
+                    amplitudes.append(self.amplitudes[row, channel, :count].copy())
+                else:
+                    wavelengths.append(np.zeros(1))
+                    amplitudes.append(np.zeros(1))
+            return number, wavelengths, amplitudes
+
+    def latest(self) -> int:
+        """Returns the number of the newest frame, -1 if no frames have been acquired."""
+        with self.condition:
+            return self.sequence - 1
+
+    def window(self, seconds: float, since: float=0.) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns copies of the frames acquired in the last seconds seconds, oldest first, used by live views.
+
+        :param seconds: length of the window
+        :param since: time the frames' queries must be sent at or after, such as the time the optical switch was set
+        :returns: times of shape (frames,), peak counts of shape (frames, channels), wavelengths, and amplitudes of
+                  shape (frames, channels, max_peaks)
+        """
+        with self.condition:
+            size = min(self.sequence, self.capacity)
+            rows = np.arange(self.sequence - size, self.sequence) % self.capacity
+            rows = rows[self.times[rows] >= max(time.time() - seconds, since)]
+            return self.times[rows], self.counts[rows], self.wavelengths[rows], self.amplitudes[rows]
+
+    def _first_frame(self, after: int, since: float) -> Optional[int]:
+        """Returns the number of the first frame in the buffers after after, sent at or after since, if there is one."""
+        number = max(after + 1, self.sequence - self.capacity)
+        while number < self.sequence and self.times[number % self.capacity] < since:
+            number += 1
+        return number if number < self.sequence else None
+
+    def _acquire_loop(self):
+        """
+        Polls the SM125 until the stream is stopped, or the program thread stops. An unexpected error stops the
+        stream, and is logged, readers waiting for a frame are woken up either way.
+        """
+        try:
+            while self.running and self.thread_map[self.thread_id]:
+                try:
+                    with self.devices.session(LASER, self.thread_id) as laser:
+                        timestamp = time.time()
+                        wavelengths, amplitudes = laser.get_data(ALL_CHANNELS)
+                    self.add_frame(timestamp, wavelengths, amplitudes)
+                except (AttributeError, socket.error):
+                    time.sleep(RETRY_DELAY)
+        except Exception as e:
+            self.error = e
+            if self.main_queue is not None:
+                self.main_queue.put(Message(MessageType.ERROR, "SM125 Stream",
+                                            "Stopped streaming from the SM125: {}".format(e)))
+        finally:
+            with self.condition:
+                self.running = False
+                self.condition.notify_all()
@@ -0,0 +1,110 @@
+"""Helpers for running parameterized sql statements against the program database."""
+import atexit
+import functools
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+from fbgui.constants import STATEMENT_CACHE_SIZE
+
+#: Names that can be used as a table name in a statement, table names cannot be parameters
+TABLE_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_readers = threading.local()
+#: Reader connection of each thread, so the connections of finished threads can be closed
+_reader_connections = {}  # type: Dict[threading.Thread, sqlite3.Connection]
+_reader_lock = threading.Lock()
+
+
+def validate_table_name(table_name: str) -> str:
+    """
+    Checks that a table name formatted into a statement cannot change the statement.
+
+    :param table_name: name of the table
+    :returns: the table name
+    :raises ValueError: If the name is not made of only letters, digits, and underscores
+    """
+    if not TABLE_NAME_PATTERN.match(table_name):
+        raise ValueError("Invalid table name {!r}.".format(table_name))
+    return table_name
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def in_statement(statement: str, count: int) -> str:
+    """
+    Formats the statement's {} with count comma separated parameters, for an IN list. The statements are cached, so
+    the same string is passed to sqlite, and its prepared statement is reused.
+
+    :param statement: statement with one {} in an IN list
+    :param count: number of parameters in the IN list
+    :returns: the parameterized statement
+    """
+    return statement.format(",".join("?" * count))
+
+
+def connect(db_path: str, check_same_thread: bool=True) -> sqlite3.Connection:
+    """
+    Opens a connection that keeps up to STATEMENT_CACHE_SIZE prepared statements.
+
+    :param db_path: path to the sqlite database file
+    :param check_same_thread: False if the connection is used by threads other than the one that opened it
+    """
+    return sqlite3.connect(db_path, check_same_thread=check_same_thread, cached_statements=STATEMENT_CACHE_SIZE)
+
+
+@contextmanager
+def reader(db_path: str):
+    """
+    Context manager for reading the database on the calling thread's connection, the connection is kept open
+    between uses, so its prepared statements are reused. Any read transaction is ended on exit, and the connections
+    of threads that have finished are closed, so they do not hold up the WAL checkpoints.
+
+    :param db_path: path to the sqlite database file
+    """
+    close_finished_readers()
+    if getattr(_readers, "db_path", None) != db_path:
+        close_reader()
+        # The connection may be closed by another thread once this one finishes
+        _readers.connection = connect(db_path, check_same_thread=False)
+        _readers.db_path = db_path
+        with _reader_lock:
+            _reader_connections[threading.current_thread()] = _readers.connection
+    connection = _readers.connection
+    try:
+        yield connection
+    finally:
+        connection.rollback()
+
+
+def close_reader():
+    """Closes the calling thread's reader connection, if it has one, the next read opens a new connection."""
+    connection = getattr(_readers, "connection", None)
+    if connection is None:
+        return
+    with _reader_lock:
+        _reader_connections.pop(threading.current_thread(), None)
+    _readers.connection = None
+    _readers.db_path = None
+    connection.close()
+
+
+def close_finished_readers():
+    """Closes the reader connections of the threads that have finished."""
+    with _reader_lock:
+        finished = [thread for thread in _reader_connections if not thread.is_alive()]
+        connections = [_reader_connections.pop(thread) for thread in finished]
+    for connection in connections:
+        connection.close()
+
+
+def _close_readers():
+    with _reader_lock:
+        connections = list(_reader_connections.values())
+        _reader_connections.clear()
+    for connection in connections:
+        connection.close()
+
+
+atexit.register(_close_readers)
@@ -0,0 +1,96 @@
+"""Samples the temperature on a background thread while the optical sweep runs on the program thread."""
+import threading
+import time
+from typing import Callable, List, Tuple, Optional
+
+import numpy as np
+
+from fbgui.constants import TEMP_SAMPLE_INTERVAL
+
+
+class TemperatureSampler(object):
+    """
+    Context manager that reads the temperature repeatedly on a background thread for as long as the context is
+    open, one reading is taken on entry, and one after the context exits, so the samples span the whole window.
+
+    :ivar Callable[[], float] read_temperature: function returning one temperature reading
+    :ivar float interval: seconds between readings
+    :ivar List[Tuple[float, float]] samples: (time, temperature) readings, the time is the middle of the query
+    """
+
+    def __init__(self, read_temperature: Callable[[], float], interval: float=TEMP_SAMPLE_INTERVAL):
+        """
+        Creates the sampler, the background thread is started when the context is entered.
+
+        :param read_temperature: function returning one temperature reading
+        :param interval: seconds between readings
+        """
+        self.read_temperature = read_temperature
+        self.interval = interval
+        self.samples = []  # type: List[Tuple[float, float]]
+        self.error = None  # type: Optional[BaseException]
+        self.stop_event = threading.Event()
+        self.thread = None  # type: threading.Thread
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop_event.set()
+        self.thread.join()
+        if exc_type is None and self.error is not None:
+            raise self.error
+        return False
+
+    def average(self, start: float, end: float) -> float:
+        """
+        Returns the time weighted average temperature between start and end.
+
+        :param start: start time of the window
+        :param end: end time of the window
+        :returns: the average temperature over the window
+        :raises RuntimeError: If no temperature readings were taken
+        """
+        if not self.samples:
+            raise RuntimeError("No temperature readings were taken.")
+        times, temperatures = zip(*self.samples)
+        return time_weighted_average(np.array(times), np.array(temperatures), start, end)
+
+    def _sample_loop(self):
+        """Background loop that takes readings until the context exits, and then one final reading."""
+        try:
+            while True:
+                self._sample()
+                if self.stop_event.wait(self.interval):
+                    break
+            self._sample()
+        except BaseException as error:
+            self.error = error
+
+    def _sample(self):
+        """Takes one reading, timestamped at the middle of the query."""
+        start = time.time()
+        temperature = float(self.read_temperature())
+        self.samples.append(((start + time.time()) / 2., temperature))
+
+
+def time_weighted_average(times: np.ndarray, values: np.ndarray, start: float, end: float) -> float:
+    """
+    Integrates the linearly interpolated values between start and end with the trapezoidal rule, and divides by the
+    length of the window. Values outside of the sampled times are held at the first, or last sample.
+
+    :param times: sorted sample times
+    :param values: sample values
+    :param start: start time of the window
+    :param end: end time of the window
+    :returns: the time weighted average of the values over the window, the mean of the values if the window is empty
+    """
+    if end <= start or len(values) == 1:
+        return float(np.mean(values))
+    inside = (times > start) & (times < end)
+    window_times = np.concatenate(([start], times[inside], [end]))
+    window_values = np.interp(window_times, times, values)
+    areas = np.diff(window_times) * (window_values[1:] + window_values[:-1]) / 2.
+    return float(areas.sum() / (end - start))
@@ -0,0 +1,117 @@
+"""Lightweight timing of the acquisition, recording, and graphing hot paths, with rolling percentiles per stage."""
+import collections
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Deque
+
+import numpy as np
+
+from fbgui.constants import TIMING_WINDOW
+
+#: Percentiles reported for each stage
+PERCENTILES = (50, 90, 99)
+
+
+class StageTimings(object):
+    """
+    Keeps the most recent durations of each named stage, measured with the monotonic clock.
+
+    :ivar int window: number of most recent durations kept for each stage
+    :ivar Dict[str, Deque[float]] durations: stage name mapped to its most recent durations in seconds
+    """
+
+    def __init__(self, window: int=TIMING_WINDOW):
+        """
+        Creates an empty set of timings.
+
+        :param window: number of most recent durations kept for each stage
+        """
+        self.window = window
+        self.durations = {}  # type: Dict[str, Deque[float]]
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        """
+        Adds a duration to the stage's rolling window.
+
+        :param stage: name of the stage
+        :param seconds: duration of one run of the stage
+        """
+        with self.lock:
+            if stage not in self.durations:
+                self.durations[stage] = collections.deque(maxlen=self.window)
+            self.durations[stage].append(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        """
+        Context manager that records the time spent inside it, including when an exception is raised.
+
+        :param stage: name of the stage
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(stage, time.monotonic() - start)
+
+    def timed(self, stage: str) -> Callable:
+        """
+        Decorator that records the duration of every call to the decorated function.
+
+        :param stage: name of the stage
+        """
+        def _timed(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def _wrapper(*args, **kwargs):
+                with self.time(stage):
+                    return func(*args, **kwargs)
+            return _wrapper
+        return _timed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the statistics of each stage's rolling window.
+
+        :returns: stage name mapped to the number of durations, the percentiles, and the maximum in milliseconds
+        """
+        with self.lock:
+            durations = {stage: np.array(values) * 1000 for stage, values in self.durations.items() if len(values)}
+        summary = {}
+        for stage, values in durations.items():
+            stage_summary = {"count": len(values), "max": float(values.max())}
+            for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                stage_summary["p{}".format(percentile)] = float(value)
+            summary[stage] = stage_summary
+        return summary
+
+    def summary_text(self) -> str:
+        """Returns the summary formatted with one line per stage, or an empty string if nothing was timed."""
+        lines = []
+        for stage, stage_summary in sorted(self.summary().items()):
+            percentiles = " ".join("p{}={:.1f}ms".format(percentile, stage_summary["p{}".format(percentile)])
+                                   for percentile in PERCENTILES)
+            lines.append("{}: n={} {} max={:.1f}ms".format(stage, stage_summary["count"], percentiles,
+                                                          stage_summary["max"]))
+        return "\n".join(lines)
+
+    def clear(self):
+        """Removes all of the recorded durations."""
+        with self.lock:
+            self.durations.clear()
+
+
+#: Timings shared by the whole program
+timings = StageTimings()
+
+
+def timed(stage: str) -> Callable:
+    """Decorator that records the duration of every call to the decorated function in the shared timings."""
+    return timings.timed(stage)
+
+
+def time_stage(stage: str):
+    """Context manager that records the time spent inside it in the shared timings."""
+    return timings.time(stage)
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from fbgui.async_recorder import record_point, is_unswitched
+from fbgui.devices.async_devices import AsyncSM125, AsyncTemperatureController, AsyncRunner
+from fbgui.exceptions import ProgramStopped
+from test.test_sm125_parse import create_response, USE_POSITIONS, EXPECTED_WAVELENGTHS
+
+
+class FakeTemperatureController(object):
+
+    def get_temp_k(self):
+        time.sleep(.05)
+        return 300.5
+
+
+class TestAsyncDevices(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_concurrent_scan_and_temperature(self):
+        response = create_response()
+
+        async def handle(reader, writer):
+            while True:
+                try:
+                    await reader.readexactly(len(b'#GET_PEAKS_AND_LEVELS'))
+                except asyncio.IncompleteReadError:
+                    writer.close()
+                    break
+                writer.write("{:010d}".format(len(response)).encode() + response)
+
+        async def scan_and_read():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            laser = await AsyncSM125.connect("127.0.0.1", port)
+            temperature_controller = AsyncTemperatureController(FakeTemperatureController())
+            try:
+                return await asyncio.gather(asyncio.wait_for(laser.get_data(USE_POSITIONS), 2),
+                                            asyncio.wait_for(temperature_controller.get_temp_k(), 2))
+            finally:
+                laser.close()
+                server.close()
+                await server.wait_closed()
+                await asyncio.sleep(.01)
+
+        (wavelengths, _), temperature = self.loop.run_until_complete(scan_and_read())
+        self.assertEqual([list(channel) for channel in wavelengths], EXPECTED_WAVELENGTHS)
+        self.assertEqual(temperature, 300.5)
+
+    def test_stop_cancels_task(self):
+        thread_map = {"id": True}
+        runner = AsyncRunner("id", thread_map, self.loop)
+
+        def stop():
+            thread_map["id"] = False
+            runner.stop()
+
+        threading.Timer(.05, stop).start()
+        start = time.monotonic()
+        with self.assertRaises(ProgramStopped):
+            runner.run(asyncio.sleep(10))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIsNone(runner.task)
+        with self.assertRaises(ProgramStopped):
+            runner.run(asyncio.sleep(10))
+
+    def test_record_point(self):
+        class FakeLaser(object):
+            async def get_data(self, use_positions):
+                await asyncio.sleep(.01)
+                empty = np.zeros(1)
+                return [np.array([1540., 1550.]), empty, empty, empty], [np.array([-10., -11.]), empty, empty, empty]
+
+        switches = [[0, 0], [], [], []]
+        self.assertTrue(is_unswitched(switches))
+        self.assertFalse(is_unswitched([[0, 1], [], [], []]))
+        runner = AsyncRunner("id", {"id": True}, self.loop)
+        curr_time, temperature, wavelengths, powers, deviations, dropouts = runner.run(
+            record_point(FakeLaser(), AsyncTemperatureController(FakeTemperatureController()), switches, 3,
+                         interval=.01))
+        self.assertEqual(temperature, 300.5)
+        self.assertEqual(wavelengths, [1540., 1550.])
+        self.assertEqual(powers, [-10., -11.])
+        self.assertEqual(deviations, [0., 0.])
+        self.assertEqual(dropouts, [0, 0])
+
+    def test_record_point_times_out(self):
+        class HangingLaser(object):
+            async def get_data(self, use_positions):
+                await asyncio.sleep(10)
+
+        runner = AsyncRunner("id", {"id": True}, self.loop)
+        start = time.monotonic()
+        with self.assertRaises(asyncio.TimeoutError):
+            runner.run(record_point(HangingLaser(), AsyncTemperatureController(FakeTemperatureController()),
+                                    [[0, 0], [], [], []], 3, interval=.01, timeout=.1))
+        self.assertLess(time.monotonic() - start, 1)
+
+if __name__ == '__main__':
+    unittest.main()
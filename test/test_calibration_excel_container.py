@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from fbgui.calibration_excel_container import CalibrationExcelContainer, get_means_at_temperatures
+
+
+def create_real_points(cycle_lengths):
+    rows = []
+    for cycle_num, length in enumerate(cycle_lengths, 1):
+        for i in range(length):
+            temperature = 300. + 10 * i + cycle_num
+            rows.append({"Mean Temperature (K)": temperature, "Cycle Num": cycle_num,
+                         "a Wavelength (nm.)": 1550. + temperature / 100, "a Power (dBm.)": -10. - cycle_num})
+    return pd.DataFrame(rows, columns=["Mean Temperature (K)", "a Wavelength (nm.)", "a Power (dBm.)", "Cycle Num"])
+
+
+class TestCalibrationExcelContainer(unittest.TestCase):
+
+    def test_get_means_at_temperatures(self):
+        values = np.array([[1., 10.], [2., 20.], [3., 30.], [5., 50.], [7., 70.]])
+        np.testing.assert_allclose(get_means_at_temperatures(values, 2), [[11 / 3, 110 / 3], [3.5, 35.]])
+        self.assertEqual(len(get_means_at_temperatures(values, 0)), 0)
+
+    def test_columns(self):
+        container = CalibrationExcelContainer(create_real_points([3, 3]), [1, 2])
+        data_frame = container.get_data_frame()
+        columns = data_frame.columns.tolist()
+        self.assertEqual(columns[:7], ["Temperature (K) Cycle 1", "a Wavelength (nm.) Cycle 1",
+                                       "a Δ Wavelength (pm) Cycle 1", "Temperature (K) Cycle 2",
+                                       "a Wavelength (nm.) Cycle 2", "a Δ Wavelength (pm) Cycle 2",
+                                       "Mean Temperature (K)"])
+        self.assertEqual(columns[-1], "Master Temperatures (K)")
+        self.assertEqual(container.mean_temperature_column, 7)
+        self.assertEqual(container.master_temperature_column, len(columns))
+        self.assertEqual(columns[container.mean_wavelength_indexes[0]], "a Mean Wavelength (nm)")
+        self.assertEqual([columns[i] for i in container.deviation_power_indexes],
+                         ["Cycle 1 a Power Deviation (db)", "Cycle 2 a Power Deviation (db)"])
+        self.assertEqual(columns[container.sensitivity_wavelength_indexes[0]], "a Wavelength Sensitivity (pm/K)")
+
+        np.testing.assert_allclose(data_frame["Mean Temperature (K)"], [301.5, 311.5, 321.5])
+        np.testing.assert_allclose(data_frame["a Δ Wavelength (pm) Cycle 2"], [0., 100., 200.])
+        np.testing.assert_allclose(data_frame["Cycle 2 a Power Deviation (db)"], [-.5, -.5, -.5])
+        np.testing.assert_allclose(data_frame["a Wavelength Sensitivity (pm/K)"], [10., 10., 10.])
+        self.assertEqual(data_frame["Master Temperatures (K)"].tolist(), [301, 311, 321])
+        np.testing.assert_allclose(container.wavelength_mean_coefficients[0][0], [.01, 1550.], atol=1e-9)
+
+    def test_uneven_cycles(self):
+        container = CalibrationExcelContainer(create_real_points([3, 2, 4]), [1, 2, 3])
+        data_frame = container.get_data_frame()
+        self.assertEqual(len(data_frame.index), 3)
+        self.assertEqual(data_frame["Temperature (K) Cycle 2"].tolist(), [302., 312., 0.])
+        self.assertEqual(data_frame["Temperature (K) Cycle 3"].tolist(), [303., 313., 323.])
+        np.testing.assert_allclose(data_frame["Mean Temperature (K)"], [302.25, 312.25, 322.])
+        self.assertEqual(data_frame["Temperature (K) Cycle 3 "].tolist(), [301., 311., 321.])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Appending a program table to a DataCollectionBuffer in chunks gives the same collection as DataCollection.create
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from fbgui.data_container import DataCollection, DataCollectionBuffer
+
+FBG_NAMES = ["FBG1", "FBG2", "FBG3"]
+NUMBER_OF_ROWS = 50
+
+
+def create_data_frame() -> pd.DataFrame:
+    random = np.random.RandomState(0)
+    data = {"ID": np.arange(1, NUMBER_OF_ROWS + 1),
+            "Date Time": 1500000000. + 60. * np.arange(NUMBER_OF_ROWS)}
+    for i, fbg_name in enumerate(FBG_NAMES):
+        data["{} Wavelength (nm.)".format(fbg_name)] = 1530. + 10 * i + random.normal(0, .01, NUMBER_OF_ROWS)
+        data["{} Power (dBm.)".format(fbg_name)] = -10. + random.normal(0, .1, NUMBER_OF_ROWS)
+    data["Mean Temperature (K)"] = 300. + random.normal(0, .1, NUMBER_OF_ROWS)
+    data["Drift Rate"] = random.normal(10, 1, NUMBER_OF_ROWS)
+    columns = ["ID", "Date Time"]
+    for fbg_name in FBG_NAMES:
+        columns += ["{} Wavelength (nm.)".format(fbg_name), "{} Power (dBm.)".format(fbg_name)]
+    columns += ["Mean Temperature (K)", "Drift Rate"]
+    return pd.DataFrame(data, columns=columns)
+
+
+class TestDataCollectionBuffer(unittest.TestCase):
+
+    def test_chunks_match_create(self):
+        df = create_data_frame()
+        data_buffer = DataCollectionBuffer(True, capacity=4)
+        for start in range(0, NUMBER_OF_ROWS, 7):
+            data_buffer.append(df[start:start + 7].reset_index(drop=True))
+        snapshot = data_buffer.snapshot()
+
+        expected = DataCollection()
+        expected.create(True, df.drop("ID", axis=1), FBG_NAMES)
+        for name in DataCollectionBuffer.ROW_ATTRIBUTES + DataCollectionBuffer.FBG_ATTRIBUTES:
+            np.testing.assert_allclose(np.array(getattr(snapshot, name), dtype=float),
+                                       np.array(getattr(expected, name), dtype=float), err_msg=name)
+        self.assertEqual(data_buffer.last_id, NUMBER_OF_ROWS)
+
+    def test_fbg_added_part_way(self):
+        df = create_data_frame()
+        df.loc[:19, "FBG3 Wavelength (nm.)"] = np.nan
+        df.loc[:19, "FBG3 Power (dBm.)"] = np.nan
+        data_buffer = DataCollectionBuffer(False, capacity=4)
+        for start in range(0, NUMBER_OF_ROWS, 7):
+            data_buffer.append(df[start:start + 7].reset_index(drop=True))
+        snapshot = data_buffer.snapshot()
+
+        expected = DataCollection()
+        expected.create(False, df.drop(["ID", "Drift Rate"], axis=1), FBG_NAMES)
+        for data_collection in snapshot, expected:
+            self.assertTrue(np.isfinite(data_collection.mean_delta_wavelengths_pm).all())
+            self.assertTrue(np.isfinite(data_collection.mean_delta_powers).all())
+            self.assertEqual(data_collection.delta_wavelengths_pm[2, 20], 0)
+            np.testing.assert_allclose(data_collection.mean_delta_wavelengths_pm[:20],
+                                       data_collection.delta_wavelengths_pm[:2, :20].mean(axis=0))
+        for name in DataCollectionBuffer.FBG_ATTRIBUTES + ["mean_delta_wavelengths_pm", "mean_delta_powers"]:
+            np.testing.assert_allclose(np.array(getattr(snapshot, name), dtype=float),
+                                       np.array(getattr(expected, name), dtype=float), err_msg=name)
+
+    def test_snapshot_unchanged_by_append(self):
+        df = create_data_frame()
+        data_buffer = DataCollectionBuffer(False, capacity=4)
+        data_buffer.append(df[:3])
+        snapshot = data_buffer.snapshot()
+        times = np.array(snapshot.times)
+        data_buffer.append(df[3:].reset_index(drop=True))
+        np.testing.assert_array_equal(snapshot.times, times)
+        self.assertEqual(len(data_buffer.snapshot().times), NUMBER_OF_ROWS)
+
+    def test_empty_snapshot(self):
+        with self.assertRaises(RuntimeError):
+            DataCollectionBuffer(False).snapshot()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from fbgui.database_writer import DatabaseWriter, LAST_ROW_ID
+from fbgui.exceptions import RowsDropped
+
+INSERT = "INSERT INTO points VALUES (?);"
+INSERT_POINT = "INSERT INTO points(value) VALUES (?);"
+INSERT_READING = "INSERT INTO readings(value, point_id) VALUES (?, ?);"
+
+
+class TestDatabaseWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "program_data.db")
+        self.writer = DatabaseWriter(self.path, batch_size=100, flush_interval=60, max_retries=3)
+
+    def tearDown(self):
+        self.writer.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_failed_flush_is_retried(self):
+        self.writer.write(INSERT, [1])
+        self.writer.write(INSERT, [2])
+        with self.assertRaises(sqlite3.OperationalError):
+            self.writer.flush()
+        self.assertEqual(len(self.writer.pending), 2)
+        self.assertEqual(self.writer.pending_writes, 2)
+        self.writer.write(INSERT, [3])
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE points (value INTEGER);")
+        connection.close()
+        with self.writer.cursor() as cursor:
+            cursor.execute("SELECT value FROM points;")
+            self.assertEqual([row[0] for row in cursor.fetchall()], [1, 2, 3])
+        self.assertEqual(self.writer.failures, 0)
+
+    def test_rows_dropped_after_retries(self):
+        self.writer.write(INSERT, [1])
+        for _ in range(2):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.writer.flush()
+        with self.assertRaises(RowsDropped):
+            self.writer.flush()
+        self.assertEqual(self.writer.pending, [])
+
+    def test_last_row_id(self):
+        with self.writer.cursor() as cursor:
+            cursor.execute("CREATE TABLE points (ID INTEGER PRIMARY KEY AUTOINCREMENT, value INTEGER);")
+            cursor.execute("CREATE TABLE readings (value INTEGER, point_id INTEGER);")
+            cursor.execute("INSERT INTO points(ID, value) VALUES (10, 0);")
+        self.writer.write_many([(INSERT_POINT, [1]), (INSERT_READING, [1, LAST_ROW_ID]),
+                                (INSERT_READING, [2, LAST_ROW_ID])])
+        self.writer.write_many([(INSERT_POINT, [2])])
+        self.writer.write_many([(INSERT_POINT, [3]), (INSERT_READING, [3, LAST_ROW_ID])])
+        with self.writer.cursor() as cursor:
+            cursor.execute("SELECT value, point_id FROM readings;")
+            self.assertEqual(cursor.fetchall(), [(1, 11), (2, 11), (3, 13)])
+
+    def test_request_flush(self):
+        errors = []
+        flushed = threading.Event()
+
+        def callback(error):
+            errors.append(error)
+            flushed.set()
+
+        self.writer.write(INSERT, [1])
+        self.writer.request_flush(callback)
+        self.assertTrue(flushed.wait(5))
+        self.assertIsInstance(errors[0], sqlite3.OperationalError)
+
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE points (value INTEGER);")
+        connection.commit()
+        flushed.clear()
+        self.writer.request_flush(callback)
+        self.assertTrue(flushed.wait(5))
+        self.assertIsNone(errors[1])
+        self.assertEqual(connection.execute("SELECT value FROM points;").fetchall(), [(1,)])
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from fbgui.constants import HEX_COLORS
+from fbgui.excel_file_controller import hex_to_rgb
+from fbgui.excel_writer import ExcelWorkbook, BufferedSheet, DATA_STYLE, RED_STYLE, DATE_TIME_STYLE, FBG_STYLE
+
+
+class TestExcelWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "export.xlsx")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_data_sheet_streams_chunks(self):
+        workbook = ExcelWorkbook(["a", "b"])
+        sheet = workbook.create_data_sheet("Data", {"Date Time": DATE_TIME_STYLE})
+        columns = ["Date Time", "a Wavelength (nm.)", "b Wavelength (nm.)", "Mean Temperature (K)", "Cycle Num"]
+        for start in (0, 2):
+            sheet.append(pd.DataFrame([["t{}".format(start + i), 1550. + i, np.nan, 300., 1] for i in range(2)],
+                                      columns=columns))
+        sheet.add_filters()
+        workbook.save(self.path)
+
+        worksheet = openpyxl.load_workbook(self.path)["Data"]
+        rows = [[cell.value for cell in row] for row in worksheet.iter_rows()]
+        self.assertEqual(rows[0], columns)
+        self.assertEqual(rows[3], ["t2", 1550, None, 300, 1])
+        self.assertEqual(sheet.num_rows, 4)
+        self.assertEqual(worksheet.auto_filter.ref, "A1:E5")
+        self.assertEqual([cell.style for cell in worksheet[2]],
+                         [DATE_TIME_STYLE, FBG_STYLE.format(0), FBG_STYLE.format(1), RED_STYLE, DATA_STYLE])
+
+    def test_more_fbgs_than_colors(self):
+        fbg_names = ["fbg{:02d}".format(i) for i in range(64)]
+        workbook = ExcelWorkbook(fbg_names)
+        self.assertEqual(workbook.column_style("fbg63 Wavelength (nm.)", {}), FBG_STYLE.format(63 % len(HEX_COLORS)))
+        self.assertEqual(len(hex_to_rgb(63)), 3)
+
+    def test_buffered_sheet(self):
+        buffered_sheet = BufferedSheet()
+        buffered_sheet.append(["name"])
+        buffered_sheet.merge_cells("A1:E1")
+        buffered_sheet.column_dimensions["F"].width = 20
+        buffered_sheet.append([1, 2])
+        workbook = ExcelWorkbook([])
+        buffered_sheet.write(workbook.create_sheet("Curve Fit"))
+        workbook.save(self.path)
+
+        worksheet = openpyxl.load_workbook(self.path)["Curve Fit"]
+        self.assertEqual(worksheet["B2"].value, 2)
+        self.assertEqual(worksheet.column_dimensions["F"].width, 20)
+        self.assertIn("A1:E1", [str(cell_range) for cell_range in worksheet.merged_cells.ranges])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import queue
+import threading
+import unittest
+from concurrent.futures import Future
+
+from fbgui.constants import BAKING
+from fbgui.exceptions import ExportCancelled
+from fbgui.export_pool import ExportPool, ExportProgress, ExportJob
+
+
+class TestExportProgress(unittest.TestCase):
+
+    def test_posts_new_stages(self):
+        progress_queue = queue.Queue()
+        progress = ExportProgress("run", progress_queue, threading.Event())
+        for stage in ("query", "query", "style"):
+            progress(stage)
+        messages = [progress_queue.get_nowait().msg for _ in range(progress_queue.qsize())]
+        self.assertEqual(messages, ["Excel Export - Creating run: query.\n", "Excel Export - Creating run: style.\n"])
+
+    def test_cancel(self):
+        cancel_event = threading.Event()
+        progress = ExportProgress("run", queue.Queue(), cancel_event)
+        progress("query")
+        cancel_event.set()
+        with self.assertRaises(ExportCancelled):
+            progress("query")
+
+
+class TestExportPool(unittest.TestCase):
+
+    def setUp(self):
+        self.main_queue = queue.Queue()
+        self.pool = ExportPool(self.main_queue)
+        self.pool.progress_queue = queue.Queue()
+
+    def add_job(self, file_path: str) -> Future:
+        future = Future()
+        self.pool.jobs[future] = ExportJob(file_path, ["a"], BAKING)
+        self.pool.cancel_events[future] = threading.Event()
+        return future
+
+    def messages(self):
+        return [self.main_queue.get_nowait().msg for _ in range(self.main_queue.qsize())]
+
+    def test_poll_reports_finished_exports(self):
+        self.pool.progress_queue.put("progress")
+        self.add_job("done.xlsx").set_result(None)
+        self.add_job("cancelled.xlsx").set_exception(ExportCancelled())
+        running = self.add_job("running.xlsx")
+        self.pool.poll()
+        self.assertEqual(self.main_queue.get_nowait(), "progress")
+        self.assertEqual(self.messages(), ["Excel Export - Created done.\n", "Excel Export - Cancelled cancelled.\n"])
+        self.assertEqual(list(self.pool.jobs), [running])
+
+    def test_cancel_sets_event(self):
+        future = self.add_job("running.xlsx")
+        future.set_running_or_notify_cancel()
+        self.pool.cancel_all()
+        self.assertTrue(self.pool.cancel_events[future].is_set())
+
+    def test_run_is_not_exported_twice(self):
+        self.add_job("running.xlsx")
+        self.assertIsNone(self.pool.submit("running.xlsx", ["a"], BAKING))
+        self.assertEqual(self.messages(), ["Excel Export - running is already being created.\n"])
+
+
+if __name__ == '__main__':
+    unittest.main()
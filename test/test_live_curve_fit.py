@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+
+from fbgui.live_curve_fit import LiveCurveFit
+
+
+class TestLiveCurveFit(unittest.TestCase):
+
+    def setUp(self):
+        self.live_fit = LiveCurveFit(["a", "b"])
+
+    def add_cycle(self):
+        for temperature in (233.15, 273.15, 313.15, 353.15):
+            self.live_fit.add_point(temperature, [1550. + .01 * temperature, 1530. + .012 * temperature],
+                                    next_temperature=393.15)
+
+    def test_needs_two_points(self):
+        self.assertIsNone(self.live_fit.snapshot())
+        self.live_fit.add_point(300., [1553., 1533.6])
+        self.assertIsNone(self.live_fit.snapshot())
+
+    def test_snapshot(self):
+        self.add_cycle()
+        snapshot = self.live_fit.snapshot()
+        self.assertEqual(snapshot.fit.orders.tolist(), [1, 1])
+        np.testing.assert_allclose(snapshot.sensitivities, [10., 12.])
+        np.testing.assert_allclose(snapshot.predicted_wavelengths, [1553.9315, 1534.7178])
+        np.testing.assert_allclose(snapshot.r_squared, [1., 1.])
+        np.testing.assert_allclose(snapshot.rms_residuals, [0., 0.], atol=1e-6)
+
+    def test_skips_incomplete_points(self):
+        self.add_cycle()
+        revision = self.live_fit.revision
+        self.live_fit.add_point(300., [1553.])
+        self.live_fit.add_point(300., [float("nan"), 0.])
+        self.live_fit.add_point(300., [1553., 1533.6], dropouts=[2, 1])
+        self.assertEqual(self.live_fit.revision, revision)
+        self.assertEqual(len(self.live_fit.snapshot().temperatures), 4)
+
+    def test_leaves_out_dropped_out_fbgs(self):
+        self.add_cycle()
+        self.live_fit.add_point(393.15, [1553.9315, 0.])
+        self.live_fit.add_point(433.15, [1554.3315, 1535.], dropouts=[0, 3])
+        snapshot = self.live_fit.snapshot()
+        self.assertEqual(snapshot.counts.tolist(), [6, 4])
+        self.assertTrue(np.isnan(snapshot.wavelengths[4:, 1]).all())
+        np.testing.assert_allclose(snapshot.sensitivities, [10., 12.])
+        np.testing.assert_allclose(snapshot.rms_residuals, [0., 0.], atol=1e-6)
+
+    def test_fbg_without_points(self):
+        self.live_fit.add_points([300., 310.], np.array([[1553., 0.], [1553.1, 0.]]))
+        snapshot = self.live_fit.snapshot()
+        self.assertEqual(snapshot.fitted.tolist(), [True, False])
+        np.testing.assert_allclose(snapshot.fit.column_derivative(0), [.01])
+        self.assertTrue(np.isnan(snapshot.r_squared[1]))
+        self.assertTrue(np.isnan(snapshot.first_wavelengths()[1]))
+
+    def test_reset(self):
+        self.add_cycle()
+        self.live_fit.reset(["a"])
+        self.assertIsNone(self.live_fit.snapshot())
+        self.assertIsNone(self.live_fit.next_temperature)
+        self.live_fit.add_points([300., 310.], np.array([[1553.], [1553.1]]))
+        np.testing.assert_allclose(self.live_fit.snapshot().fit.column_derivative(0), [.01])
+
+
+if __name__ == '__main__':
+    unittest.main()
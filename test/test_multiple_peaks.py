@@ -8,9 +8,11 @@ Channel 1 | Channel 2 | Channel 3 | Channel 4
 Averaging two data collections together
 """
 
-from fbgui.laser_data import LaserData
+from fbgui.laser_data import LaserData, RunningStatistics
 import unittest
 
+import numpy as np
+
 
 EXPECTED = [[11, 16], [21, 31, 36, 41], [], [51, 56]]
 
@@ -88,6 +90,33 @@ class TestMultiplePeaks(unittest.TestCase):
         wavelengths = laser_data.get_wavelengths()
         self.assertEqual(wavelengths, EXPECTED)
 
+    def test_dropouts(self):
+        laser_data = LaserData([[0, 0, 0]], 0)
+        laser_data.add_wavelengths(0, [1540., 1550., 1560.], 0)
+        laser_data.add_wavelengths(0, [1542., 1552.], 0)
+        laser_data.add_wavelengths(0, [0.], 0)
+        self.assertEqual(laser_data.get_dropouts(), [[1, 1, 2]])
+        self.assertEqual(laser_data.get_wavelength_deviations()[0][2], 0)
+        np.testing.assert_allclose(laser_data.get_wavelengths()[0], [1541., 1551., 1560.])
+        np.testing.assert_allclose(laser_data.get_wavelength_deviations()[0][0], np.std([1540., 1542.], ddof=1))
+
+    def test_dropout_powers(self):
+        laser_data = LaserData([[0, 0]], 0)
+        for wavelengths, powers in [([1540., 1550.], [-10., -20.]), ([0., 1552.], [0., -22.])]:
+            laser_data.add_wavelengths(0, wavelengths, 0)
+            laser_data.add_powers(0, powers, 0)
+        self.assertEqual(laser_data.get_powers(), [[-10., -21.]])
+
+    def test_running_statistics(self):
+        readings = np.random.RandomState(0).normal(1550., .01, (50, 3))
+        statistics = RunningStatistics(4)
+        for reading in readings:
+            statistics.add(1, reading)
+        np.testing.assert_allclose(statistics.mean[1:], readings.mean(axis=0))
+        np.testing.assert_allclose(statistics.std()[1:], readings.std(axis=0, ddof=1))
+        self.assertEqual(statistics.mean[0], 0)
+        self.assertEqual(statistics.std()[0], 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+import numpy.polynomial.polynomial as poly
+
+from fbgui import polynomial_fit
+
+
+class TestPolynomialFit(unittest.TestCase):
+
+    def setUp(self):
+        self.x_values = np.array([300., 310., 320., 330., 340., 350.])
+        self.y_values = np.column_stack([1550. + .01 * self.x_values,
+                                         1550. + .01 * self.x_values + 1e-5 * (self.x_values - 300.)**2,
+                                         np.sin(self.x_values / 10.)])
+
+    def test_fit_matches_polyfit(self):
+        line_fit = polynomial_fit.fit(self.x_values, self.y_values, 1)
+        for i in range(self.y_values.shape[1]):
+            coefficients = poly.polyfit(self.x_values, self.y_values[:, i], 1)
+            np.testing.assert_allclose(line_fit.coefficients[i], coefficients, rtol=1e-10)
+            residual = np.sum((poly.polyval(self.x_values, coefficients) - self.y_values[:, i])**2)
+            self.assertAlmostEqual(line_fit.residuals[i], residual)
+
+    def test_fit_lowest_order(self):
+        curve_fit = polynomial_fit.fit_lowest_order(self.x_values, self.y_values)
+        self.assertEqual(curve_fit.orders.tolist(), [1, 2, 3])
+        self.assertEqual(len(curve_fit.column_coefficients(0)), 2)
+        self.assertEqual(len(curve_fit.column_derivative(1)), 2)
+        np.testing.assert_allclose(curve_fit.column_derivative(0), [.01], rtol=1e-8)
+        cubic = poly.polyfit(self.x_values, self.y_values[:, 2], 3)
+        np.testing.assert_allclose(curve_fit.column_coefficients(2), cubic, rtol=1e-8)
+
+    def test_evaluate(self):
+        curve_fit = polynomial_fit.fit_lowest_order(self.x_values, self.y_values[:, :2])
+        np.testing.assert_allclose(curve_fit.evaluate(self.x_values), self.y_values[:, :2], atol=1e-8)
+        np.testing.assert_allclose(curve_fit.evaluate_derivatives([300., 350.]),
+                                   [[.01, .01], [.01, .011]], atol=1e-8)
+
+    def test_incremental_fit_matches_fit_lowest_order(self):
+        incremental_fit = polynomial_fit.IncrementalPolynomialFit(self.y_values.shape[1])
+        for x_value, y_values in zip(self.x_values, self.y_values):
+            incremental_fit.add(x_value, y_values)
+        curve_fit = polynomial_fit.fit_lowest_order(self.x_values, self.y_values)
+        solved_fit = incremental_fit.solve()
+        self.assertEqual(solved_fit.orders.tolist(), curve_fit.orders.tolist())
+        np.testing.assert_allclose(solved_fit.residuals, curve_fit.residuals, atol=1e-9)
+        np.testing.assert_allclose(solved_fit.evaluate(self.x_values), curve_fit.evaluate(self.x_values), atol=1e-9)
+        total_sums_of_squares = np.square(self.y_values - self.y_values.mean(axis=0)).sum(axis=0)
+        np.testing.assert_allclose(incremental_fit.total_sums_of_squares(), total_sums_of_squares)
+
+    def test_incremental_fit_mask(self):
+        mask = np.ones(self.y_values.shape, dtype=bool)
+        mask[[1, 4], 0] = False
+        mask[0, 1] = False
+        incremental_fit = polynomial_fit.IncrementalPolynomialFit(self.y_values.shape[1])
+        for x_value, y_values, point_mask in zip(self.x_values, np.where(mask, self.y_values, 0.), mask):
+            incremental_fit.add(x_value, y_values, point_mask)
+        self.assertEqual(incremental_fit.counts.tolist(), [4, 5, 6])
+        solved_fit = incremental_fit.solve()
+        for i in range(self.y_values.shape[1]):
+            column_fit = polynomial_fit.fit_lowest_order(self.x_values[mask[:, i]], self.y_values[mask[:, i], i])
+            self.assertEqual(solved_fit.orders[i], column_fit.orders[0])
+            np.testing.assert_allclose(solved_fit.evaluate(self.x_values)[:, i],
+                                       column_fit.evaluate(self.x_values)[:, 0], atol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
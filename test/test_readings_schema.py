@@ -0,0 +1,249 @@
+import os
+import queue
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from fbgui import database_controller, database_writer, migrate_database
+from fbgui.data_container import DataCollection
+from fbgui.constants import BAKING, CAL, CREATE_MAP_TABLE, MIN_TEMPERATURE_HEADER, MAX_TEMPERATURE_HEADER, \
+    MIN_WAVELENGTH_HEADER, MAX_WAVELENGTH_HEADER
+
+
+class TestReadingsSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "program_data.db")
+        self.writer = database_writer.DatabaseWriter(self.path)
+        self.patches = [mock.patch.object(database_controller, "DB_PATH", self.path),
+                        mock.patch.object(database_writer, "_writer", self.writer)]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        self.writer.close()
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def controller(self, fbg_names, function_type=BAKING):
+        return database_controller.DatabaseController(os.path.join(self.directory, "run.xlsx"), fbg_names,
+                                                      queue.Queue(), function_type)
+
+    def test_baking_round_trip(self):
+        controller = self.controller(["a", "b"])
+        controller.record_baking_point(10., 300., [1550., 1551.], [-10., -11.], [.5, .7], [0, 2])
+        controller.record_baking_point(20., 301., [1550.1, 1551.1], [-10.1, -11.1])
+        controller.flush()
+        df = controller.to_data_frame()
+        self.assertEqual(list(df.columns), ["Date Time", "a Wavelength (nm.)", "a Power (dBm.)", "b Wavelength (nm.)",
+                                            "b Power (dBm.)", "Mean Temperature (K)", "a Std. Dev. (pm.)",
+                                            "a Dropouts", "b Std. Dev. (pm.)", "b Dropouts"])
+        np.testing.assert_allclose(df["b Wavelength (nm.)"], [1551., 1551.1])
+        np.testing.assert_allclose(df["b Dropouts"], [2, 0])
+        self.assertEqual(list(controller.get_new_rows(1)["Date Time"]), [20.])
+
+    def test_request_flush(self):
+        controller = self.controller(["a"])
+        controller.record_baking_point(10., 300., [1550.], [-10.])
+        flushed = threading.Event()
+        controller.request_flush(flushed.set)
+        self.assertTrue(flushed.wait(5))
+        np.testing.assert_allclose(controller.to_data_frame()["a Wavelength (nm.)"], [1550.])
+        self.assertTrue(controller.main_queue.empty())
+
+    def test_points_with_the_same_time(self):
+        controller = self.controller(["a"])
+        controller.record_baking_point(10., 300., [1550.], [-10.])
+        controller.record_baking_point(10., 301., [1551.], [-11.])
+        controller.flush()
+        df = controller.to_data_frame()
+        np.testing.assert_allclose(df["a Wavelength (nm.)"], [1550., 1551.])
+        np.testing.assert_allclose(df["Mean Temperature (K)"], [300., 301.])
+
+    def test_duplicate_readings_skipped(self):
+        controller = self.controller(["a"])
+        controller.record_baking_point(10., 300., [1550.], [-10.])
+        controller.record_baking_point(20., 301., [1551.], [-11.])
+        controller.flush()
+        with self.writer.cursor() as cursor:
+            cursor.execute("INSERT INTO readings SELECT * FROM readings WHERE ts = 10.;")
+        df = controller.to_data_frame()
+        np.testing.assert_allclose(df["a Wavelength (nm.)"], [1550., 1551.])
+
+    def test_add_point_ids(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute(CREATE_MAP_TABLE)
+        connection.execute("CREATE TABLE points (ID INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, run_id INTEGER NOT "
+                           "NULL, ts REAL NOT NULL, temperature REAL NOT NULL, drift_rate REAL, real_point INTEGER, "
+                           "cycle_num INTEGER)")
+        connection.execute("CREATE TABLE readings (run_id INTEGER NOT NULL, ts REAL NOT NULL, fbg_id INTEGER NOT "
+                           "NULL, wavelength REAL NOT NULL, power REAL NOT NULL, std_dev REAL NOT NULL DEFAULT 0, "
+                           "dropouts INTEGER NOT NULL DEFAULT 0)")
+        connection.executemany("INSERT INTO points(run_id, ts, temperature) VALUES (?, ?, 300.)", [(1, 5.), (1, 6.)])
+        connection.executemany("INSERT INTO readings(run_id, ts, fbg_id, wavelength, power) VALUES (1, ?, 1, ?, -10.)",
+                               [(5., 1550.), (6., 1551.)])
+        connection.execute("CREATE INDEX readings_run_fbg_ts ON readings (run_id, fbg_id, ts)")
+        connection.commit()
+        migrate_database.migrate_connection(connection)
+        self.assertEqual(connection.execute("SELECT point_id FROM readings ORDER BY ts;").fetchall(), [(1,), (2,)])
+        self.assertEqual(connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND "
+                                            "tbl_name = 'readings' ORDER BY name;").fetchall(),
+                         [("readings_run_point",), ("readings_run_ts",)])
+        connection.close()
+
+    def test_calibration_cycles(self):
+        controller = self.controller(["a"], CAL)
+        for cycle_num in (1, 2):
+            controller.record_calibration_point(float(cycle_num), 300., [1550.], [-10.], .1, True, cycle_num)
+        controller.flush()
+        df = controller.to_data_frame()
+        self.assertEqual(list(df["Real Point"]), ["True", "True"])
+        self.assertEqual(controller.get_cycle_nums(), [1, 2])
+        controller.delete_partial_cycles([2])
+        self.assertEqual(controller.get_cycle_nums(), [1])
+
+    def test_iter_data_frames(self):
+        controller = self.controller(["a", "b"], CAL)
+        for i in range(5):
+            controller.record_calibration_point(float(i), 300. + i, [1550. + i, 1551.], [-10., -11.], .1, i % 2 == 0, 1)
+        controller.flush()
+        chunks = list(controller.iter_data_frames(2))
+        self.assertEqual([len(chunk.index) for chunk in chunks], [2, 2, 1])
+        df = pd.concat(chunks, ignore_index=True)
+        self.assertTrue(df.equals(controller.to_data_frame()))
+
+    def test_fbg_added_between_runs(self):
+        self.controller(["a"]).record_baking_point(10., 300., [1550.], [-10.])
+        controller = self.controller(["a", "b"])
+        controller.record_baking_point(20., 300., [1550., 1560.], [-10., -12.])
+        controller.flush()
+        df = controller.to_data_frame()
+        self.assertEqual(len(df.index), 2)
+        self.assertTrue(np.isnan(df["b Wavelength (nm.)"][0]))
+        self.assertEqual(df["b Wavelength (nm.)"][1], 1560.)
+        self.assertEqual(controller.get_fbg_list(), ["a", "b"])
+
+    def test_migrate_wide_table(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute(CREATE_MAP_TABLE)
+        connection.execute("INSERT INTO map(ProgName, ProgType, FilePath, Snums) VALUES ('run', 'cal', '', 'a')")
+        connection.execute("CREATE TABLE cal1 (ID INTEGER NOT NULL PRIMARY KEY, 'Date Time' REAL NOT NULL, "
+                           "'a Wavelength (nm.)' REAL NOT NULL, 'a Power (dBm.)' REAL NOT NULL, "
+                           "'Mean Temperature (K)' REAL NOT NULL, 'Drift Rate' REAL NOT NULL, "
+                           "'Real Point' INTEGER NOT NULL, 'Cycle Num' INTEGER NOT NULL)")
+        connection.execute("INSERT INTO cal1 VALUES (1, 5., 1550., -10., 300., .2, 'True', 1)")
+        connection.execute("INSERT INTO cal1 VALUES (2, 6., 1551., -11., 310., .3, 'False', 1)")
+        connection.commit()
+        self.assertEqual(migrate_database.migrate_connection(connection), ["cal1"])
+        self.assertEqual(migrate_database.migrate_connection(connection), [])
+        connection.close()
+
+        df = self.controller(["a"], CAL).to_data_frame()
+        self.assertEqual(list(df["Real Point"]), ["True", "False"])
+        np.testing.assert_allclose(df["a Wavelength (nm.)"], [1550., 1551.])
+        np.testing.assert_allclose(df["a Std. Dev. (pm.)"], [0., 0.])
+        self.assertTrue(os.path.isfile(self.path + ".bak"))
+
+    def test_migrate_skips_failed_table(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute(CREATE_MAP_TABLE)
+        connection.execute("INSERT INTO map(ProgName, ProgType, FilePath, Snums) VALUES ('bad', 'cal', '', 'a')")
+        connection.execute("INSERT INTO map(ProgName, ProgType, FilePath, Snums) VALUES ('run', 'baking', '', 'a')")
+        connection.execute("CREATE TABLE cal1 (ID INTEGER NOT NULL PRIMARY KEY, 'a Wavelength (nm.)' REAL NOT NULL)")
+        connection.execute("INSERT INTO cal1 VALUES (1, 1550.)")
+        connection.execute("CREATE TABLE baking2 (ID INTEGER NOT NULL PRIMARY KEY, 'Date Time' REAL NOT NULL, "
+                           "'a Wavelength (nm.)' REAL NOT NULL, 'a Power (dBm.)' REAL NOT NULL, "
+                           "'Mean Temperature (K)' REAL NOT NULL)")
+        connection.executemany("INSERT INTO baking2 VALUES (?, ?, 1550., -10., 300.)", [(i, i * 10.) for i in range(5)])
+        connection.commit()
+        with mock.patch.object(migrate_database, "log_error") as log_error:
+            self.assertEqual(migrate_database.migrate_connection(connection), ["baking2"])
+        log_error.assert_called_once()
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM cal1;").fetchone()[0], 1)
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM points;").fetchone()[0], 5)
+        connection.close()
+
+    def test_rollups(self):
+        controller = self.controller(["a"])
+        for timestamp, wavelength in ((0., 1550.), (30., 1552.), (70., 1554.), (3700., 1556.)):
+            controller.record_baking_point(timestamp, 300. + timestamp / 100, [wavelength], [-10.])
+        controller.flush()
+        minutes = controller.get_rollup_rows(60)
+        np.testing.assert_allclose(minutes["ID"], [0., 60., 3660.])
+        np.testing.assert_allclose(minutes["Date Time"], [15., 70., 3700.])
+        np.testing.assert_allclose(minutes["a Wavelength (nm.)"], [1551., 1554., 1556.])
+        np.testing.assert_allclose(minutes[MIN_WAVELENGTH_HEADER.format("a")], [1550., 1554., 1556.])
+        np.testing.assert_allclose(minutes[MAX_WAVELENGTH_HEADER.format("a")], [1552., 1554., 1556.])
+        np.testing.assert_allclose(minutes[MAX_TEMPERATURE_HEADER], [300.3, 300.7, 337.])
+        hours = controller.get_rollup_rows(3600)
+        np.testing.assert_allclose(hours["a Wavelength (nm.)"], [1552., 1556.])
+        np.testing.assert_allclose(hours[MIN_WAVELENGTH_HEADER.format("a")], [1550., 1556.])
+        np.testing.assert_allclose(hours[MAX_WAVELENGTH_HEADER.format("a")], [1554., 1556.])
+        np.testing.assert_allclose(hours[MIN_TEMPERATURE_HEADER], [300., 337.])
+        data_collection = DataCollection()
+        data_collection.create(False, minutes.drop("ID", axis=1), ["a"])
+        np.testing.assert_allclose(data_collection.wavelength_ranges, [[[1550., 1552.], [1554., 1554.],
+                                                                         [1556., 1556.]]])
+        np.testing.assert_allclose(data_collection.delta_wavelength_ranges_pm[0, 0], [-1000., 1000.])
+        self.assertEqual(data_collection.temp_ranges.shape, (3, 2))
+
+        connection = sqlite3.connect(self.path)
+        connection.execute("DELETE FROM point_rollups")
+        connection.execute("DELETE FROM reading_rollups")
+        connection.commit()
+        migrate_database.migrate_connection(connection)
+        connection.close()
+        self.assertTrue(controller.get_rollup_rows(60).equals(minutes))
+
+    def test_rollups_built_per_bucket(self):
+        controller = self.controller(["a"])
+        for timestamp, wavelength in ((0., 1550.), (30., 1552.), (70., 1554.)):
+            controller.record_baking_point(timestamp, 300., [wavelength], [-10.])
+        self.writer.flush()
+        np.testing.assert_allclose(controller.get_rollup_rows(60)["a Wavelength (nm.)"], [1551.])
+        resumed = self.controller(["a"])
+        resumed.record_baking_point(130., 300., [1556.], [-10.])
+        self.writer.flush()
+        self.assertEqual(resumed.rollup_start, 120.)
+        np.testing.assert_allclose(resumed.get_rollup_rows(60)["a Wavelength (nm.)"], [1551., 1554.])
+        np.testing.assert_allclose(resumed.get_rollup_rows(3600)["a Wavelength (nm.)"], [1552.])
+
+    def test_migrate_drops_old_rollups(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE point_rollups (run_id INTEGER NOT NULL, resolution INTEGER NOT NULL, "
+                           "bucket REAL NOT NULL, count INTEGER NOT NULL, ts_sum REAL NOT NULL, "
+                           "temperature_sum REAL NOT NULL, PRIMARY KEY (run_id, resolution, bucket))")
+        connection.commit()
+        controller = self.controller(["a"])
+        migrate_database.migrate_connection(connection)
+        for timestamp in (0., 70.):
+            controller.record_baking_point(timestamp, 300., [1550.], [-10.])
+        controller.flush()
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(point_rollups);")]
+        self.assertIn("temperature_min", columns)
+        np.testing.assert_allclose(controller.get_rollup_rows(60)["ID"], [0., 60.])
+        connection.close()
+
+    def test_rollup_resolution(self):
+        self.assertIsNone(database_controller.select_rollup_resolution(3600., 100))
+        self.assertEqual(database_controller.select_rollup_resolution(6000., 100), 60)
+        self.assertEqual(database_controller.select_rollup_resolution(100 * 86400., 100), 86400)
+        controller = self.controller(["a"])
+        controller.record_baking_point(0., 300., [1550.], [-10.])
+        controller.record_baking_point(6000., 300., [1550.], [-10.])
+        controller.flush()
+        self.assertEqual(controller.get_rollup_resolution(100), 60)
+        self.assertEqual(len(controller.to_data_frame(100).index), 2)
+        self.assertIsNone(self.controller(["a"], CAL).get_rollup_resolution(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import time
+import unittest
+from queue import Queue
+
+from fbgui.devices.optical_switch import OpticalSwitch
+from fbgui.devices.oven import Oven
+from fbgui.devices.sm125_laser import SM125
+from fbgui.devices.temperature_controller import TemperatureController
+from fbgui.laser_recorder import LaserRecorder
+from fbgui.simulator import SimulatedBench, SimulatedResourceManager, SM125Server, OpticalSwitchServer
+
+SWITCH_POSITIONS = [[0], [1, 2, 2], [], []]
+
+
+class TestSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.bench = SimulatedBench.create(SWITCH_POSITIONS, wavelength_noise=0, amplitude_noise=0,
+                                           switch_settle_time=.05, seed=0)
+        self.sm125_server = SM125Server(self.bench, latency=.001, jitter=0)
+        self.switch_server = OpticalSwitchServer(self.bench, latency=0)
+        self.sm125_server.start()
+        self.switch_server.start()
+        self.laser = SM125(*self.sm125_server.address)
+        self.switch = OpticalSwitch(*self.switch_server.address)
+
+    def tearDown(self):
+        self.laser.close()
+        self.switch.close()
+        self.sm125_server.stop()
+        self.switch_server.stop()
+
+    def test_recorder_reads_switched_gratings(self):
+        recorder = LaserRecorder(self.laser, self.switch, SWITCH_POSITIONS, 3, "id", {"id": True}, Queue())
+        wavelengths, powers, deviations, dropouts = recorder.get_wavelength_amplitude_data()
+        self.assertEqual(wavelengths, [1530., 1530., 1530., 1534.])
+        self.assertEqual(powers, [-10.] * 4)
+        self.assertEqual(dropouts, [0] * 4)
+
+    def test_oven_heats_bench(self):
+        self.bench.time_scale = 1000.
+        manager = SimulatedResourceManager(self.bench, latency=0, jitter=0)
+        oven_location, controller_location = manager.list_resources()
+        oven = Oven(oven_location, manager)
+        temperature_controller = TemperatureController(controller_location, manager)
+        start_temperature = temperature_controller.get_temp_k()
+        oven.set_temp(100)
+        oven.heater_on()
+        time.sleep(.2)
+        self.assertGreater(temperature_controller.get_temp_k(), start_temperature + 5)
+        self.assertGreater(self.laser.get_data([True] * 4)[0][0][0], 1530.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Channel 1 | Channel 2 | Channel 3 | Channel 4
+2 peaks     1 peak      0 peaks     3 peaks (not in use)
+
+Parsing a GET_PEAKS_AND_LEVELS response
+"""
+
+import socket
+import struct
+import threading
+import unittest
+
+from fbgui.devices.sm125_laser import parse_peaks_and_levels, SM125
+
+CHANNEL_LENGTHS = [2, 1, 0, 3]
+RAW_WAVELENGTHS = [15301234, 15409876, 15500001, 15600000, 15700000, 15800000]
+RAW_AMPLITUDES = [-1234, -2345, -3456, -100, -200, -300]
+USE_POSITIONS = [True, True, True, False]
+
+EXPECTED_WAVELENGTHS = [[1530.1234, 1540.9876], [1550.0001], [0.0], [0.0]]
+EXPECTED_AMPLITUDES = [[-12.34, -23.45], [-34.56], [0.0], [0.0]]
+
+
+def create_response() -> bytes:
+    response = b"\x00" * 12
+    response += struct.pack("<4H", *CHANNEL_LENGTHS)
+    response += b"\x00" * 12
+    response += struct.pack("<{}i".format(len(RAW_WAVELENGTHS)), *RAW_WAVELENGTHS)
+    response += struct.pack("<{}h".format(len(RAW_AMPLITUDES)), *RAW_AMPLITUDES)
+    return response
+
+
+class TestSM125Parse(unittest.TestCase):
+
+    def test_parse_peaks_and_levels(self):
+        wavelengths, amplitudes = parse_peaks_and_levels(create_response(), USE_POSITIONS)
+        self.assertEqual([list(channel) for channel in wavelengths], EXPECTED_WAVELENGTHS)
+        self.assertEqual([list(channel) for channel in amplitudes], EXPECTED_AMPLITUDES)
+
+    def test_parse_unused_channels(self):
+        wavelengths, amplitudes = parse_peaks_and_levels(create_response(), [False] * 4)
+        self.assertEqual([list(channel) for channel in wavelengths], [[0.0]] * 4)
+        self.assertEqual([list(channel) for channel in amplitudes], [[0.0]] * 4)
+
+    def test_recv_exact_short_reads(self):
+        response = create_response()
+        receiver, sender = socket.socketpair()
+
+        def send_in_chunks():
+            for i in range(0, len(response), 5):
+                sender.sendall(response[i:i + 5])
+
+        thread = threading.Thread(target=send_in_chunks)
+        thread.start()
+        buffer = bytearray(len(response) + 16)
+        view = SM125.recv_exact(receiver, buffer, len(response))
+        thread.join()
+        receiver.close()
+        sender.close()
+        self.assertEqual(bytes(view), response)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import time
+import unittest
+from contextlib import contextmanager
+from queue import Queue
+
+import numpy as np
+
+from fbgui.exceptions import StreamStopped
+from fbgui.laser_recorder import LaserRecorder
+from fbgui.sm125_stream import SM125Stream
+
+
+class FakeLaser(object):
+
+    def __init__(self):
+        self.scans = 0
+
+    def get_data(self, _):
+        time.sleep(.001)
+        self.scans += 1
+        empty = np.zeros(1)
+        return [np.array([1540., 1550.]) + self.scans * 1e-6, empty, empty, empty], \
+               [np.array([-10., -11.]), empty, empty, empty]
+
+
+class BrokenLaser(object):
+
+    def get_data(self, _):
+        raise ValueError("bad response")
+
+
+class StaleSwitch(object):
+    """Switch whose change is followed by a frame polled before the change, as if its query was in flight."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def set_channel(self, _):
+        self.stream.add_frame(time.time() - 1, [np.array([1500., 1510.])] + [np.zeros(1)] * 3,
+                              [np.array([-20., -21.])] + [np.zeros(1)] * 3)
+
+
+class FakeDevices(object):
+
+    def __init__(self, laser=None):
+        self.laser = laser or FakeLaser()
+
+    @contextmanager
+    def session(self, dev, thread_id=None, try_once=False):
+        yield self.laser
+
+
+class TestSM125Stream(unittest.TestCase):
+
+    def test_ring_buffer_wraps(self):
+        stream = SM125Stream(None, None, {}, capacity=4, max_peaks=2)
+        stream.running = True
+        for i in range(6):
+            stream.add_frame(time.time(), [np.array([1540. + i, 1550., 1560.]), np.zeros(0)] + [np.zeros(1)] * 2,
+                             [np.array([-10., -11., -12.]), np.zeros(0)] + [np.zeros(1)] * 2)
+        number, wavelengths, amplitudes = stream.next_frame(-1, [True, True, False, False], timeout=0)
+        self.assertEqual(number, 2)
+        np.testing.assert_array_equal(wavelengths[0], [1542., 1550.])
+        np.testing.assert_array_equal(wavelengths[1], [0.])
+        np.testing.assert_array_equal(amplitudes[2], [0.])
+        self.assertEqual(stream.next_frame(number, [True] * 4, timeout=0)[0], 3)
+        self.assertIsNone(stream.next_frame(5, [True] * 4, timeout=.01))
+
+    def test_next_frame_skips_frames_before_since(self):
+        stream = SM125Stream(None, None, {}, capacity=8, max_peaks=2)
+        stream.running = True
+        for timestamp in (1., 2., 4., 3., 5.):
+            stream.add_frame(timestamp, [np.array([1540. + timestamp])] + [np.zeros(1)] * 3,
+                             [np.array([-10.])] + [np.zeros(1)] * 3)
+        number, wavelengths, _ = stream.next_frame(-1, [True] * 4, timeout=0, since=3.5)
+        self.assertEqual(number, 2)
+        np.testing.assert_array_equal(wavelengths[0], [1544.])
+        self.assertEqual(stream.next_frame(number, [True] * 4, timeout=0, since=3.5)[0], 4)
+        self.assertIsNone(stream.next_frame(4, [True] * 4, timeout=.01, since=3.5))
+        stream.stop()
+        with self.assertRaises(StreamStopped):
+            stream.next_frame(3, [True] * 4, timeout=1, since=6.)
+
+    def test_window(self):
+        stream = SM125Stream(None, None, {}, capacity=4, max_peaks=2)
+        now = time.time()
+        for timestamp in (now - 10, now - 2, now - 1, now):
+            stream.add_frame(timestamp, [np.array([1540., 1550.])] + [np.zeros(1)] * 3,
+                             [np.array([-10., -11.])] + [np.zeros(1)] * 3)
+        times, counts, wavelengths, amplitudes = stream.window(5)
+        np.testing.assert_array_equal(times, [now - 2, now - 1, now])
+        np.testing.assert_array_equal(counts[:, 0], [2, 2, 2])
+        self.assertEqual(wavelengths.shape, (3, 4, 2))
+        self.assertEqual(amplitudes.shape, (3, 4, 2))
+        np.testing.assert_array_equal(stream.window(5, since=now - 1.5)[0], [now - 1, now])
+
+    def test_recorder_skips_frames_before_switch(self):
+        thread_map = {"id": True}
+        stream = SM125Stream(FakeDevices(), "id", thread_map)
+        stream.start()
+        try:
+            recorder = LaserRecorder(None, StaleSwitch(stream), [[1, 1], [], [], []], 10, "id", thread_map, Queue(),
+                                     stream=stream)
+            wavelengths, powers, _, _ = recorder.get_wavelength_amplitude_data()
+        finally:
+            stream.stop()
+        np.testing.assert_allclose(wavelengths, [1540., 1550.], atol=1e-3)
+        self.assertEqual(powers, [-10., -11.])
+
+    def test_recorder_reads_stream(self):
+        thread_map = {"id": True}
+        stream = SM125Stream(FakeDevices(), "id", thread_map)
+        stream.start()
+        try:
+            recorder = LaserRecorder(None, None, [[0, 0], [], [], []], 10, "id", thread_map, Queue(), stream=stream)
+            wavelengths, powers, deviations, dropouts = recorder.get_wavelength_amplitude_data()
+        finally:
+            stream.stop()
+        np.testing.assert_allclose(wavelengths, [1540., 1550.], atol=1e-3)
+        self.assertEqual(powers, [-10., -11.])
+        self.assertEqual(dropouts, [0, 0])
+        self.assertGreater(deviations[0], 0)
+
+    def test_error_stops_stream(self):
+        main_queue = Queue()
+        stream = SM125Stream(FakeDevices(BrokenLaser()), "id", {"id": True}, main_queue=main_queue)
+        stream.start()
+        stream.thread.join(1)
+        self.assertFalse(stream.running)
+        self.assertIsInstance(stream.error, ValueError)
+        self.assertFalse(main_queue.empty())
+        with self.assertRaises(StreamStopped):
+            stream.next_frame(-1, [True] * 4, timeout=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from fbgui import sql
+
+
+class TestSql(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "program_data.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_validate_table_name(self):
+        self.assertEqual(sql.validate_table_name("baking12"), "baking12")
+        for name in ("baking1; DROP TABLE map", "1cal", "cal 1", ""):
+            with self.assertRaises(ValueError):
+                sql.validate_table_name(name)
+
+    def test_in_statement(self):
+        statement = sql.in_statement("SELECT * FROM fbgs WHERE ID IN ({});", 3)
+        self.assertEqual(statement, "SELECT * FROM fbgs WHERE ID IN (?,?,?);")
+        self.assertIs(statement, sql.in_statement("SELECT * FROM fbgs WHERE ID IN ({});", 3))
+
+    def test_reader_reuses_connection(self):
+        with sql.reader(self.path) as connection:
+            connection.execute("CREATE TABLE map(ProgName TEXT);")
+            connection.execute("INSERT INTO map VALUES (?);", ("name",))
+            connection.commit()
+        with sql.reader(self.path) as second_connection:
+            self.assertIs(second_connection, connection)
+            self.assertFalse(second_connection.in_transaction)
+            self.assertEqual(second_connection.execute("SELECT ProgName FROM map;").fetchall(), [("name",)])
+
+    def test_finished_thread_reader_is_closed(self):
+        connections = []
+
+        def read():
+            with sql.reader(self.path) as thread_connection:
+                connections.append(thread_connection)
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+        with sql.reader(self.path):
+            pass
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connections[0].execute("SELECT 1;")
+
+    def test_close_reader(self):
+        with sql.reader(self.path) as connection:
+            pass
+        sql.close_reader()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1;")
+        with sql.reader(self.path) as second_connection:
+            self.assertIsNot(second_connection, connection)
+        sql.close_reader()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import time
+import unittest
+from queue import Queue
+
+import numpy as np
+
+from fbgui.laser_recorder import LaserRecorder, peaks_match
+
+SETTLE_SECONDS = .05
+
+
+class FakeSwitch(object):
+
+    def __init__(self):
+        self.position = 0
+        self.switch_time = 0.
+
+    def set_channel(self, channel: int):
+        self.position = channel
+        self.switch_time = time.monotonic()
+
+
+class FakeLaser(object):
+    """Reports the previous switch position's peaks until the switch has settled."""
+
+    def __init__(self, switch: FakeSwitch):
+        self.switch = switch
+        self.position = 0
+
+    def get_data(self, _):
+        time.sleep(.005)
+        if time.monotonic() - self.switch.switch_time > SETTLE_SECONDS:
+            self.position = self.switch.position
+        empty = np.zeros(1)
+        return [empty, np.array([1540. + self.position]), empty, empty], [empty, np.array([-10.]), empty, empty]
+
+
+class TestSwitchSettle(unittest.TestCase):
+
+    def test_peaks_match(self):
+        self.assertTrue(peaks_match(np.array([1540., 1550.]), np.array([1540.0005, 1550.]), .001))
+        self.assertFalse(peaks_match(np.array([1540., 1550.]), np.array([1540.01, 1550.]), .001))
+        self.assertFalse(peaks_match(np.array([1540.]), np.array([1540., 1550.]), .001))
+
+    def test_settles_before_timeout(self):
+        switch = FakeSwitch()
+        main_queue = Queue()
+        recorder = LaserRecorder(FakeLaser(switch), switch, [[], [1, 2], [], []], 2, "id", {"id": True}, main_queue,
+                                 settle_timeout=1.)
+        wavelengths, _, deviations, dropouts = recorder.get_wavelength_amplitude_data()
+        self.assertEqual(wavelengths, [1541., 1542.])
+        self.assertEqual(deviations, [0., 0.])
+        self.assertEqual(dropouts, [0, 0])
+        message = main_queue.get_nowait()
+        self.assertNotIn("timed out", message.msg)
+
+    def test_times_out_without_change(self):
+        switch = FakeSwitch()
+        laser = FakeLaser(switch)
+        switch.set_channel = lambda channel: None
+        main_queue = Queue()
+        recorder = LaserRecorder(laser, switch, [[], [1, 2], [], []], 1, "id", {"id": True}, main_queue,
+                                 settle_timeout=.1)
+        wavelengths, _, deviations, dropouts = recorder.get_wavelength_amplitude_data()
+        self.assertEqual(wavelengths, [1540., 1540.])
+        self.assertIn("1: timed out, 2: timed out", main_queue.get_nowait().msg)
+
+    def test_single_position_settles_immediately(self):
+        switch = FakeSwitch()
+        switch.set_channel(1)
+        laser = FakeLaser(switch)
+        laser.position = 1
+        main_queue = Queue()
+        recorder = LaserRecorder(laser, switch, [[], [1], [], []], 1, "id", {"id": True}, main_queue,
+                                 settle_timeout=1.)
+        start = time.monotonic()
+        wavelengths, _, deviations, dropouts = recorder.get_wavelength_amplitude_data()
+        self.assertLess(time.monotonic() - start, .5)
+        self.assertEqual(wavelengths, [1541.])
+        self.assertIn("1: 0.00s", main_queue.get_nowait().msg)
+
+if __name__ == '__main__':
+    unittest.main()
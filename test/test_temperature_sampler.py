@@ -0,0 +1,38 @@
+import itertools
+import unittest
+
+import numpy as np
+
+from fbgui.temperature_sampler import TemperatureSampler, time_weighted_average
+
+
+class TestTemperatureSampler(unittest.TestCase):
+
+    def test_linear_ramp_average(self):
+        times = np.array([0., 1., 2., 4.])
+        temps = 300. + times
+        self.assertAlmostEqual(time_weighted_average(times, temps, 0., 4.), 302.)
+        self.assertAlmostEqual(time_weighted_average(times, temps, 1.5, 3.5), 302.5)
+
+    def test_window_outside_samples_holds_edges(self):
+        times = np.array([1., 2.])
+        temps = np.array([300., 302.])
+        self.assertAlmostEqual(time_weighted_average(times, temps, 0., 3.), 301.)
+
+    def test_sampler_spans_context(self):
+        counter = itertools.count()
+        with TemperatureSampler(lambda: 300. + next(counter), interval=.01) as sampler:
+            pass
+        self.assertGreaterEqual(len(sampler.samples), 2)
+        self.assertEqual(sampler.samples[0][1], 300.)
+
+    def test_sampler_raises_read_error(self):
+        def read():
+            raise ValueError("read failed")
+        with self.assertRaises(ValueError):
+            with TemperatureSampler(read, interval=.01):
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
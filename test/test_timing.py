@@ -0,0 +1,40 @@
+import unittest
+
+from fbgui.timing import StageTimings
+
+
+class TestStageTimings(unittest.TestCase):
+
+    def test_window_keeps_latest(self):
+        timings = StageTimings(window=3)
+        for seconds in (.001, .002, .003, .004):
+            timings.record("stage", seconds)
+        summary = timings.summary()["stage"]
+        self.assertEqual(summary["count"], 3)
+        self.assertAlmostEqual(summary["p50"], 3.)
+        self.assertAlmostEqual(summary["max"], 4.)
+
+    def test_timed_records_on_error(self):
+        timings = StageTimings()
+
+        @timings.timed("failing")
+        def fail():
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual(timings.summary()["failing"]["count"], 1)
+
+    def test_summary_text(self):
+        timings = StageTimings()
+        self.assertEqual(timings.summary_text(), "")
+        with timings.time("b"):
+            pass
+        timings.record("a", .01)
+        lines = timings.summary_text().split("\n")
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("a: n=1 p50=10.0ms"))
+
+
+if __name__ == '__main__':
+    unittest.main()